@@ -0,0 +1,442 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from RedSimulada import RedSimulada
+from CodecMensajes import CodecMensajes
+from NetConfig import NetConfig
+from Flooding import topologia_por_jid
+from Metricas import REGISTRO, percentil
+from Trazas import AgregadorTrazas, texto_reporte
+from SimulacionDistribuida import (ALGORITMOS, ALGORITMOS_DIFUSION, SimulacionDistribuida, crear_algoritmo,
+                                   enlaces_cortados)
+
+
+# --- Generadores de topología ------------------------------------------------
+# Todos devuelven un topo_map al estilo de NetConfig ({'N0': ['N1', ...], ...})
+# con enlaces en ambos sentidos.
+
+def _nombres(n):
+    return [f"N{i}" for i in range(n)]
+
+def _enlazar(topo, a, b):
+    if b not in topo[a]:
+        topo[a].append(b)
+        topo[b].append(a)
+
+def topologia_anillo(n, semilla=None):
+    nodos = _nombres(n)
+    topo = {nodo: [] for nodo in nodos}
+    for i in range(n):
+        if n > 1 and i != (i + 1) % n:
+            _enlazar(topo, nodos[i], nodos[(i + 1) % n])
+    return topo
+
+def topologia_malla(n, semilla=None):
+    nodos = _nombres(n)
+    topo = {nodo: [] for nodo in nodos}
+    columnas = max(1, math.isqrt(n))
+    for i in range(n):
+        if (i + 1) % columnas and i + 1 < n:
+            _enlazar(topo, nodos[i], nodos[i + 1])
+        if i + columnas < n:
+            _enlazar(topo, nodos[i], nodos[i + columnas])
+    return topo
+
+def topologia_aleatoria(n, semilla=None, grado_medio=4):
+    # Árbol aleatorio para garantizar conectividad y luego aristas extra al azar
+    aleatorio = random.Random(semilla)
+    nodos = _nombres(n)
+    topo = {nodo: [] for nodo in nodos}
+    for i in range(1, n):
+        _enlazar(topo, nodos[i], nodos[aleatorio.randrange(i)])
+    extra = max(0, int(n * grado_medio / 2) - (n - 1))
+    intentos = 0
+    while extra and intentos < 10 * n * grado_medio:
+        intentos += 1
+        a, b = aleatorio.sample(nodos, 2) if n > 1 else (nodos[0], nodos[0])
+        if a != b and b not in topo[a]:
+            _enlazar(topo, a, b)
+            extra -= 1
+    return topo
+
+def topologia_libre_escala(n, semilla=None, m=2):
+    # Barabási-Albert: cada nodo nuevo se enlaza a m nodos con probabilidad
+    # proporcional a su grado
+    aleatorio = random.Random(semilla)
+    nodos = _nombres(n)
+    topo = {nodo: [] for nodo in nodos}
+    extremos = []
+    for i in range(1, n):
+        objetivos = set()
+        if i <= m:
+            objetivos.update(nodos[:i])
+        else:
+            while len(objetivos) < m:
+                objetivos.add(aleatorio.choice(extremos))
+        for objetivo in objetivos:
+            _enlazar(topo, nodos[i], objetivo)
+            extremos.extend((nodos[i], objetivo))
+    return topo
+
+def topologia_desde_config(n=None, semilla=None, config=None):
+    # Usa el topo_map de un NetConfig (por defecto el que trae el laboratorio);
+    # n se ignora porque el tamaño lo define la configuración
+    config = config or NetConfig()
+    topo = {nodo: [] for nodo in config.topo_map}
+    for nodo, vecinos in config.topo_map.items():
+        for vecino in vecinos:
+            topo.setdefault(vecino, [])
+            _enlazar(topo, nodo, vecino)
+    return topo
+
+TOPOLOGIAS = {
+    'ring': topologia_anillo,
+    'grid': topologia_malla,
+    'random': topologia_aleatoria,
+    'scale-free': topologia_libre_escala,
+    'netconfig': topologia_desde_config,
+}
+
+
+# --- Medición ----------------------------------------------------------------
+
+def _tamano_profundo(objeto, vistos, excluir):
+    if id(objeto) in vistos or id(objeto) in excluir:
+        return 0
+    vistos.add(id(objeto))
+    tamano = sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        for clave, valor in objeto.items():
+            tamano += _tamano_profundo(clave, vistos, excluir) + _tamano_profundo(valor, vistos, excluir)
+    elif isinstance(objeto, (list, tuple, set, frozenset)):
+        for valor in objeto:
+            tamano += _tamano_profundo(valor, vistos, excluir)
+    elif hasattr(objeto, '__dict__'):
+        tamano += _tamano_profundo(vars(objeto), vistos, excluir)
+    return tamano
+
+def tamano_estado(nodo, compartidos):
+    """
+    Bytes del estado propio de un nodo (tablas, caches, etc.), sin contar los
+    objetos compartidos por toda la red como el transporte o la configuración.
+    """
+    return _tamano_profundo(nodo, set(), {id(objeto) for objeto in compartidos})
+
+
+
+class _Escenario:
+    """
+    Un algoritmo corriendo sobre una topología dentro de una RedSimulada.
+    """
+
+    def __init__(self, algoritmo, topo, latencia, perdida, semilla, codec='json', internar=False,
+                 planificador=None, trazar=False):
+        self.algoritmo = algoritmo
+        self.red = RedSimulada(latencia_defecto=latencia, semilla=semilla)
+        self.nombres = {nodo: f"{nodo.lower()}@bench.local" for nodo in topo}
+        self.config = NetConfig(topo_map=topo, node_map=self.nombres)
+        # El codec no guarda estado, así que todos los nodos comparten uno
+        if internar:
+            self.codec = CodecMensajes.desde_config(self.config, modo=codec)
+        else:
+            self.codec = CodecMensajes(modo=codec)
+        self.nodos = {}
+        self.entregas = {}  # (destino, contenido) -> hora de llegada
+        self.trazas = AgregadorTrazas() if trazar and algoritmo == 'lsr' else None
+        # Topología por JID compartida por los modos de difusión que la necesitan
+        self.topologia = topologia_por_jid(self.config)
+
+        for nodo, jid in self.nombres.items():
+            transporte = self.red.agregar_nodo(jid, codec=self.codec)
+            if planificador is not None:
+                transporte.usar_planificador(**planificador)
+            instancia = crear_algoritmo(algoritmo, jid, transporte, self.config, self.topologia)
+            if algoritmo == 'lsr':
+                instancia.on_message = self._registrador(nodo)
+                if trazar:
+                    instancia.trace = True
+                    instancia.on_trace = self.trazas.agregar
+            elif algoritmo in ALGORITMOS_DIFUSION:
+                instancia.al_entregar = self._registrador(nodo)
+            self.nodos[nodo] = instancia
+
+        for nodo, vecinos in topo.items():
+            for vecino in vecinos:
+                if nodo < vecino:
+                    self.red.conectar(self.nombres[nodo], self.nombres[vecino], latencia, perdida)
+
+        self.compartidos = [self.red, self.config, self.topologia, self.codec] + [n.transport if algoritmo == 'lsr' else n.transporte
+                                                      for n in self.nodos.values()]
+
+    def _registrador(self, nodo):
+        def registrar(origen, contenido):
+            if isinstance(contenido, str) and contenido.startswith("bench:"):
+                self.entregas.setdefault((nodo, contenido), asyncio.get_running_loop().time())
+        return registrar
+
+    def memoria_por_nodo(self):
+        return [tamano_estado(nodo, self.compartidos) for nodo in self.nodos.values()]
+
+    def enviar_dato(self, origen, destino, contenido):
+        instancia = self.nodos[origen]
+        if self.algoritmo == 'lsr':
+            instancia.send_data(destino, contenido)
+        elif self.algoritmo in ALGORITMOS_DIFUSION:
+            instancia.difundir(contenido)
+        else:
+            return False
+        return True
+
+
+async def _medir(algoritmo, topologia, n, latencia, perdida, paquetes, silencio, semilla, codec, internar,
+                 planificador, trazar=False):
+    topo = TOPOLOGIAS[topologia](n, semilla=semilla)
+    escenario = _Escenario(algoritmo, topo, latencia, perdida, semilla, codec, internar, planificador, trazar)
+    red = escenario.red
+    loop = asyncio.get_running_loop()
+    memoria_pico = [0] * len(escenario.nodos)
+
+    def muestrear_memoria():
+        for i, tamano in enumerate(escenario.memoria_por_nodo()):
+            memoria_pico[i] = max(memoria_pico[i], tamano)
+
+    # Fase de control: hasta que la red queda en silencio
+    inicio = loop.time()
+    await red.iniciar()
+    if algoritmo in ALGORITMOS_DIFUSION:
+        # En flooding no hay estado que converger; se mide una difusión completa
+        next(iter(escenario.nodos.values())).difundir("bench:convergencia")
+    await red.esperar_inactividad(silencio)
+    convergencia = (red.ultima_entrega - inicio) if red.ultima_entrega is not None else 0.0
+    mensajes_control = red.mensajes_enviados
+    bytes_control = red.bytes_enviados
+    muestrear_memoria()
+
+    # Fase de datos: paquetes entre pares aleatorios de nodos
+    aleatorio = random.Random(semilla)
+    nodos = list(escenario.nodos)
+    latencias = []
+    enviados = 0
+    perdidos = 0
+    for i in range(paquetes if len(nodos) > 1 else 0):
+        origen, destino = aleatorio.sample(nodos, 2)
+        contenido = f"bench:{i}"
+        salida = loop.time()
+        if not escenario.enviar_dato(origen, destino, contenido):
+            break
+        enviados += 1
+        await red.esperar_inactividad(silencio)
+        llegada = escenario.entregas.get((destino, contenido))
+        if llegada is None:
+            perdidos += 1
+        else:
+            latencias.append(llegada - salida)
+    muestrear_memoria()
+
+    resultado = {
+        'algoritmo': algoritmo,
+        'topologia': topologia,
+        'nodos': len(topo),
+        'enlaces': sum(len(vecinos) for vecinos in topo.values()) // 2,
+        'convergencia_s': convergencia,
+        'mensajes_control': mensajes_control,
+        'bytes_control': bytes_control,
+        'mensajes_totales': red.mensajes_enviados,
+        'bytes_totales': red.bytes_enviados,
+        'mensajes_perdidos_red': red.mensajes_perdidos,
+        'memoria_nodo_max_bytes': max(memoria_pico) if memoria_pico else 0,
+        'memoria_nodo_media_bytes': sum(memoria_pico) / len(memoria_pico) if memoria_pico else 0,
+        'paquetes_enviados': enviados,
+        'paquetes_perdidos': perdidos,
+        # DVR no transporta datos, así que sus latencias quedan en None
+        'latencia_p50_s': percentil(latencias, 50),
+        'latencia_p95_s': percentil(latencias, 95),
+        'latencia_max_s': max(latencias) if latencias else None,
+    }
+    if escenario.trazas is not None:
+        resultado['trazas'] = escenario.trazas.reporte()
+    return resultado
+
+def _medir_distribuido(algoritmo, topologia, n, latencia, perdida, paquetes, silencio, semilla, codec, internar,
+                       planificador, procesos):
+    # Las mismas fases que _medir, con los nodos repartidos en varios procesos
+    topo = TOPOLOGIAS[topologia](n, semilla=semilla)
+    config = NetConfig(topo_map=topo, node_map={nodo: f"{nodo.lower()}@bench.local" for nodo in topo})
+    with SimulacionDistribuida(config, algoritmo, procesos, latencia, perdida, semilla, codec, internar,
+                               planificador) as simulacion:
+        inicio = time.monotonic()
+        simulacion.iniciar()
+        if algoritmo in ALGORITMOS_DIFUSION:
+            primero = next(iter(topo))
+            simulacion.enviar_datos([(primero, primero, "bench:convergencia")])
+        estados = simulacion.esperar_inactividad(silencio)
+        ultimas = [estado['ultima_entrega'] for estado in estados if estado['ultima_entrega'] is not None]
+        convergencia = max(ultimas) - inicio if ultimas else 0.0
+        control = simulacion.resultados()
+
+        aleatorio = random.Random(semilla)
+        nodos = list(topo)
+        salidas = {}
+        for i in range(paquetes if len(nodos) > 1 else 0):
+            origen, destino = aleatorio.sample(nodos, 2)
+            contenido = f"bench:{i}"
+            salidas[(destino, contenido)] = time.monotonic()
+            if not any(any(enviado) for enviado in simulacion.enviar_datos([(origen, destino, contenido)])):
+                salidas.clear()
+                break
+            simulacion.esperar_inactividad(silencio)
+        finales = simulacion.resultados()
+
+    entregas = {}
+    for resultado in finales:
+        entregas.update(resultado['entregas'])
+    latencias = [entregas[clave] - salida for clave, salida in salidas.items() if clave in entregas]
+    return {
+        'algoritmo': algoritmo,
+        'topologia': topologia,
+        'nodos': len(topo),
+        'enlaces': sum(len(vecinos) for vecinos in topo.values()) // 2,
+        'procesos': simulacion.procesos,
+        'enlaces_cortados': enlaces_cortados(config, simulacion.asignacion),
+        'convergencia_s': convergencia,
+        'mensajes_control': sum(resultado['mensajes_enviados'] for resultado in control),
+        'bytes_control': sum(resultado['bytes_enviados'] for resultado in control),
+        'mensajes_totales': sum(resultado['mensajes_enviados'] for resultado in finales),
+        'bytes_totales': sum(resultado['bytes_enviados'] for resultado in finales),
+        'mensajes_perdidos_red': sum(resultado['mensajes_perdidos'] for resultado in finales),
+        # El estado de cada nodo vive en otro proceso y no se mide
+        'memoria_nodo_max_bytes': None,
+        'memoria_nodo_media_bytes': None,
+        'paquetes_enviados': len(salidas),
+        'paquetes_perdidos': len(salidas) - len(latencias),
+        'latencia_p50_s': percentil(latencias, 50),
+        'latencia_p95_s': percentil(latencias, 95),
+        'latencia_max_s': max(latencias) if latencias else None,
+    }
+
+def ejecutar_benchmark(algoritmo, topologia, n, latencia=0.001, perdida=0.0, paquetes=20,
+                       silencio=0.05, semilla=0, codec='json', internar=False, planificador=None,
+                       silenciar=True, archivo_metricas=None, procesos=1, trazar=False):
+    """
+    Corre un escenario completo y devuelve sus métricas como diccionario.
+    planificador son las opciones de Transporte.usar_planificador (None = envío
+    directo). Con silenciar=True se descarta la salida por consola de los nodos, que de lo
+    contrario domina el tiempo de ejecución. Con archivo_metricas se vuelcan ahí las
+    métricas internas de los nodos (formato Prometheus) al terminar.
+
+    Con procesos > 1 la red se reparte entre varios procesos (ver
+    SimulacionDistribuida); las métricas internas y la memoria por nodo no se
+    miden en ese modo. Con trazar=True los paquetes de LSR registran cada salto
+    y el resultado incluye los percentiles por nodo y por enlace (solo con un proceso).
+    """
+    if procesos > 1:
+        reloj = time.perf_counter()
+        resultado = _medir_distribuido(algoritmo, topologia, n, latencia, perdida, paquetes, silencio, semilla,
+                                       codec, internar, planificador, procesos)
+        resultado['tiempo_real_s'] = time.perf_counter() - reloj
+        resultado['memoria_proceso_pico_bytes'] = None
+        return resultado
+
+    salida = io.StringIO() if silenciar else sys.stdout
+    REGISTRO.reiniciar()
+    tracemalloc.start()
+    reloj = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(salida):
+            resultado = asyncio.run(_medir(algoritmo, topologia, n, latencia, perdida, paquetes, silencio, semilla,
+                                           codec, internar, planificador, trazar))
+        resultado['tiempo_real_s'] = time.perf_counter() - reloj
+        resultado['memoria_proceso_pico_bytes'] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    if archivo_metricas:
+        REGISTRO.volcar(archivo_metricas)
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de algoritmos de ruteo sobre una red simulada.")
+    parser.add_argument('--algoritmos', nargs='+', default=['flooding', 'dvr', 'lsr'],
+                        choices=ALGORITMOS)
+    parser.add_argument('--topologias', nargs='+', default=['ring', 'grid', 'random', 'scale-free'],
+                        choices=sorted(TOPOLOGIAS))
+    parser.add_argument('--tamanos', nargs='+', type=int, default=[16, 64])
+    parser.add_argument('--latencia', type=float, default=0.001, help="Latencia por enlace en segundos")
+    parser.add_argument('--perdida', type=float, default=0.0, help="Probabilidad de pérdida por mensaje")
+    parser.add_argument('--paquetes', type=int, default=20, help="Paquetes de datos a medir por escenario")
+    parser.add_argument('--silencio', type=float, default=0.05,
+                        help="Segundos sin tráfico para considerar que la red convergió")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--codec', default='json', choices=['json', 'binario'],
+                        help="Formato de los mensajes en el cable")
+    parser.add_argument('--internar', action='store_true', help="Reemplazar nombres de nodo por ids cortos")
+    parser.add_argument('--agrupacion', type=float, default=None,
+                        help="Usar colas de salida que agrupan mensajes durante estos segundos")
+    parser.add_argument('--tasa-vecino', type=float, default=None,
+                        help="Límite de envíos por segundo hacia cada vecino (requiere --agrupacion)")
+    parser.add_argument('--etiqueta', default=None, help="Versión o commit al que corresponden los resultados")
+    parser.add_argument('--salida', default='bench_output.json')
+    parser.add_argument('--procesos', type=int, default=1,
+                        help="Repartir cada red entre estos procesos (uno por núcleo)")
+    parser.add_argument('--trazar', action='store_true',
+                        help="Registrar cada salto de los paquetes de LSR y mostrar los más lentos")
+    parser.add_argument('--metricas', default=None,
+                        help="Prefijo de los archivos .prom con las métricas internas de cada escenario")
+    args = parser.parse_args(argv)
+
+    planificador = None
+    if args.agrupacion is not None:
+        planificador = {'ventana_agrupacion': args.agrupacion, 'tasa_por_destino': args.tasa_vecino}
+
+    resultados = []
+    for topologia in args.topologias:
+        tamanos = [None] if topologia == 'netconfig' else args.tamanos
+        for n in tamanos:
+            for algoritmo in args.algoritmos:
+                archivo_metricas = None
+                if args.metricas:
+                    archivo_metricas = f"{args.metricas}-{algoritmo}-{topologia}-{n or 'config'}.prom"
+                resultado = ejecutar_benchmark(algoritmo, topologia, n, args.latencia, args.perdida,
+                                               args.paquetes, args.silencio, args.semilla, args.codec,
+                                               args.internar, planificador, archivo_metricas=archivo_metricas,
+                                               procesos=args.procesos, trazar=args.trazar)
+                resultados.append(resultado)
+                print(f"{algoritmo:9} {topologia:10} n={resultado['nodos']:<6} "
+                      f"convergencia={resultado['convergencia_s']:.3f}s "
+                      f"mensajes={resultado['mensajes_control']} bytes={resultado['bytes_control']}")
+                if 'trazas' in resultado:
+                    print(texto_reporte(resultado['trazas'], limite=5))
+
+    informe = {
+        'etiqueta': args.etiqueta,
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'parametros': {
+            'latencia': args.latencia,
+            'perdida': args.perdida,
+            'paquetes': args.paquetes,
+            'silencio': args.silencio,
+            'semilla': args.semilla,
+            'codec': args.codec,
+            'internar': args.internar,
+            'planificador': planificador,
+            'procesos': args.procesos,
+        },
+        'resultados': resultados,
+    }
+    with open(args.salida, 'w') as archivo:
+        json.dump(informe, archivo, indent=2)
+    print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
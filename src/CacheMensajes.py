@@ -0,0 +1,153 @@
+import hashlib
+import math
+import time
+from collections import OrderedDict
+
+
+class CacheDuplicados:
+    """
+    Conjunto acotado de ids de mensajes ya vistos, para descartar duplicados sin
+    que la memoria crezca con el tráfico.
+
+    En modo 'lru' guarda los ids exactos: como máximo `capacidad` entradas y cada
+    una expira si no se ve durante `ttl` segundos. En modo 'bloom' usa dos filtros
+    de Bloom que rotan (el actual y el anterior), con memoria fija y una tasa de
+    falsos positivos de a lo sumo `tasa_falsos_positivos`; un falso positivo hace
+    que un mensaje nuevo se descarte como duplicado.
+    """
+
+    def __init__(self, capacidad=10_000, ttl=300.0, modo='lru', tasa_falsos_positivos=0.001, reloj=time.monotonic):
+        if capacidad <= 0:
+            raise ValueError("La capacidad debe ser positiva.")
+        if modo not in ('lru', 'bloom'):
+            raise ValueError(f"Modo de cache desconocido: {modo}")
+
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.modo = modo
+        self.tasa_falsos_positivos = tasa_falsos_positivos
+        self.reloj = reloj
+
+        # Contadores
+        self.consultas = 0
+        self.aciertos = 0
+        self.desalojos = 0
+        self.expirados = 0
+
+        if modo == 'lru':
+            self._entradas = OrderedDict()  # id -> última vez visto
+        else:
+            # Cada filtro guarda media capacidad; juntos cubren `capacidad` ids. Se
+            # consultan los dos, así que cada uno se dimensiona para la mitad de la tasa
+            self._por_filtro = max(1, capacidad // 2)
+            tasa_por_filtro = tasa_falsos_positivos / 2
+            self._bits = max(8, math.ceil(-self._por_filtro * math.log(tasa_por_filtro) / math.log(2) ** 2))
+            self._hashes = max(1, round(self._bits / self._por_filtro * math.log(2)))
+            self._actual = bytearray((self._bits + 7) // 8)
+            self._anterior = bytearray((self._bits + 7) // 8)
+            self._en_actual = 0
+            self._en_anterior = 0
+            self._rotado_en = reloj()
+
+    def __len__(self):
+        if self.modo == 'lru':
+            return len(self._entradas)
+        return self._en_actual + self._en_anterior
+
+    def __contains__(self, mensaje_id):
+        self.consultas += 1
+        if self.modo == 'lru':
+            self._expirar()
+            encontrado = mensaje_id in self._entradas
+        else:
+            self._rotar_si_corresponde()
+            posiciones = self._posiciones(mensaje_id)
+            encontrado = self._contiene(self._actual, posiciones) or self._contiene(self._anterior, posiciones)
+        if encontrado:
+            self.aciertos += 1
+        return encontrado
+
+    def add(self, mensaje_id):
+        if self.modo == 'lru':
+            self._entradas[mensaje_id] = self.reloj()
+            self._entradas.move_to_end(mensaje_id)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+            return
+
+        self._rotar_si_corresponde()
+        for posicion in self._posiciones(mensaje_id):
+            self._actual[posicion >> 3] |= 1 << (posicion & 7)
+        self._en_actual += 1
+        if self._en_actual >= self._por_filtro:
+            self._rotar(por_capacidad=True)
+
+    def visto(self, mensaje_id):
+        """
+        Devuelve True si el id ya estaba; si no, lo registra y devuelve False.
+        """
+        if mensaje_id in self:
+            if self.modo == 'lru':
+                self.add(mensaje_id)  # Refrescar su antigüedad
+            return True
+        self.add(mensaje_id)
+        return False
+
+    def tasa_aciertos(self):
+        return self.aciertos / self.consultas if self.consultas else 0.0
+
+    def estadisticas(self):
+        return {
+            'modo': self.modo,
+            'entradas': len(self),
+            'consultas': self.consultas,
+            'aciertos': self.aciertos,
+            'desalojos': self.desalojos,
+            'expirados': self.expirados,
+            'tasa_aciertos': self.tasa_aciertos(),
+        }
+
+    def _expirar(self):
+        if self.ttl is None:
+            return
+        limite = self.reloj() - self.ttl
+        while self._entradas:
+            mensaje_id, visto_en = next(iter(self._entradas.items()))
+            if visto_en > limite:
+                break
+            del self._entradas[mensaje_id]
+            self.expirados += 1
+
+    def _posiciones(self, mensaje_id):
+        # Doble hashing sobre un solo blake2b: h1 + i * h2
+        resumen = hashlib.blake2b(str(mensaje_id).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(resumen[:8], 'little')
+        h2 = int.from_bytes(resumen[8:], 'little') | 1
+        return [(h1 + i * h2) % self._bits for i in range(self._hashes)]
+
+    @staticmethod
+    def _contiene(filtro, posiciones):
+        return all(filtro[posicion >> 3] & (1 << (posicion & 7)) for posicion in posiciones)
+
+    def _rotar_si_corresponde(self):
+        # Cada filtro vive como máximo medio TTL, así que un id se recuerda entre ttl/2 y ttl
+        if self.ttl is None:
+            return
+        transcurrido = self.reloj() - self._rotado_en
+        if transcurrido >= self.ttl / 2:
+            self._rotar()
+        if transcurrido >= self.ttl:
+            self._rotar()
+
+    def _rotar(self, por_capacidad=False):
+        # Rotar por capacidad descarta el filtro anterior antes de que expire
+        if por_capacidad:
+            self.desalojos += self._en_anterior
+        else:
+            self.expirados += self._en_anterior
+        self._anterior = self._actual
+        self._en_anterior = self._en_actual
+        self._actual = bytearray(len(self._anterior))
+        self._en_actual = 0
+        self._rotado_en = self.reloj()
@@ -0,0 +1,386 @@
+import base64
+import json
+import struct
+import zlib
+
+
+VERSION = 1
+
+# Campos obligatorios y su tipo para cada tipo de mensaje conocido. Los tipos
+# que no aparecen aquí se aceptan sin validar para no frenar extensiones.
+ESQUEMAS = {
+    'echo': {},
+    'echo_response': {},
+    'weights': {'table': dict, 'version': int, 'from': str},
+    'lsdb_summary': {'versions': dict, 'from': str},
+    'send_routing': {'from': str, 'data': object},
+    'message': {'from': str, 'data': object},
+}
+
+# Campos que contienen un nodo y se pueden internar
+CAMPOS_NODO = ('from', 'to', 'origin')
+
+PREFIJO_BINARIO = '~'
+PREFIJO_LOTE = '['  # Un lote es una lista JSON de cuerpos ya codificados
+_CLAVE_DATOS = '"data":'  # Así empieza la carga en un cuerpo JSON compacto
+_CABECERA = struct.Struct('!BB')  # versión, banderas
+_COMPRIMIDO = 0x01
+
+# Etiquetas del formato binario (un byte antes de cada valor)
+_NULO, _FALSO, _VERDADERO, _ENTERO, _REAL, _TEXTO, _LISTA, _OBJETO = range(8)
+_REAL_64 = struct.Struct('!d')
+# Anidamiento máximo de listas y objetos al leer, para que un cuerpo malicioso
+# no agote la pila
+PROFUNDIDAD_MAXIMA = 64
+
+
+class ErrorCodec(ValueError):
+    """
+    El cuerpo de un mensaje no se pudo codificar o decodificar.
+    """
+
+
+class CodecMensajes:
+    """
+    Serializa los mensajes de control y datos de los tres algoritmos.
+
+    En modo 'json' el cuerpo es un objeto JSON compacto que los nodos antiguos
+    siguen entendiendo. En modo 'binario' se usa una codificación etiquetada
+    (enteros como varint, reales en 8 bytes, textos con largo prefijado) dentro de
+    un sobre con versión y banderas, comprimida con zlib si supera
+    `umbral_compresion` bytes, y todo en base64 precedido de '~' para viajar en el
+    cuerpo de un mensaje XMPP.
+
+    Si se indica la lista de `nodos` (la misma en todos los extremos), los nombres
+    de nodo en los campos conocidos y en las claves de las tablas se reemplazan por
+    identificadores cortos ('#0', '#1', ...).
+
+    En ambos modos el campo 'data' se escribe al final, después de la versión,
+    para que un nodo de tránsito pueda leer solo la cabecera y reenviar la carga
+    sin decodificarla (leer_cabecera y recomponer).
+    """
+
+    def __init__(self, modo='json', nodos=None, umbral_compresion=512):
+        if modo not in ('json', 'binario'):
+            raise ValueError(f"Modo de codec desconocido: {modo}")
+        self.modo = modo
+        self.umbral_compresion = umbral_compresion
+        self.a_corto = {}
+        self.a_nombre = {}
+        for indice, nodo in enumerate(sorted(nodos or ())):
+            corto = f"#{indice:x}"
+            self.a_corto[nodo] = corto
+            self.a_nombre[corto] = nodo
+
+    @classmethod
+    def desde_config(cls, config, **kwargs):
+        """
+        Codec que interna los JIDs e ids de nodo de un NetConfig.
+        """
+        return cls(nodos=set(config.node_map) | set(config.node_map.values()), **kwargs)
+
+    def codificar(self, mensaje):
+        validar(mensaje)
+        mensaje = dict(mensaje, v=VERSION)
+        if 'data' in mensaje:
+            mensaje['data'] = mensaje.pop('data')
+        if self.a_corto:
+            mensaje = self._traducir(mensaje, self.a_corto)
+        if self.modo == 'json':
+            return json.dumps(mensaje, separators=(',', ':'))
+
+        carga = bytearray()
+        _escribir(carga, mensaje)
+        return self._sobre(carga)
+
+    def leer_cabecera(self, cuerpo):
+        """
+        Lee solo la cabecera de un mensaje con 'data', sin decodificar la carga.
+
+        Devuelve (cabecera, carga): la cabecera es el mensaje sin 'data' (ya
+        traducido) y la carga sigue codificada, para pasarla tal cual a
+        recomponer(). Devuelve None si el mensaje no admite este camino (no tiene
+        'data', viene de un codificador que no pone la carga al
+        final o está mal formado); en ese caso se usa decodificar().
+        """
+        try:
+            if cuerpo.startswith(PREFIJO_BINARIO):
+                sobre = base64.b64decode(cuerpo[len(PREFIJO_BINARIO):], validate=True)
+                version, banderas = _CABECERA.unpack_from(sobre)
+                sobre = sobre[_CABECERA.size:]
+                if banderas & _COMPRIMIDO:
+                    sobre = zlib.decompress(sobre)
+                if version > VERSION or sobre[0] != _OBJETO:
+                    return None
+                posicion = 0
+                cantidad, posicion = _leer_varint(sobre, 1)
+                cabecera = {}
+                for indice in range(cantidad):
+                    clave, posicion = _leer_clave(sobre, posicion)
+                    if clave == 'data':
+                        if indice != cantidad - 1:
+                            return None
+                        carga = sobre[posicion:]
+                        break
+                    cabecera[clave], posicion = _leer(sobre, posicion)
+                else:
+                    return None
+            elif cuerpo.startswith('{') and cuerpo.endswith('}'):
+                # En JSON válido '"data":' solo puede ser una clave; la primera es
+                # la del mensaje salvo que la cabecera tenga objetos anidados, y
+                # entonces el prefijo no es JSON válido y se descarta el camino rápido
+                inicio = cuerpo.find(_CLAVE_DATOS)
+                if inicio < 2 or cuerpo[inicio - 1] != ',':
+                    return None
+                cabecera = json.loads(cuerpo[:inicio - 1] + '}')
+                carga = cuerpo[inicio + len(_CLAVE_DATOS):-1]
+            else:
+                return None
+        except (ErrorCodec, ValueError, TypeError, IndexError, RecursionError, struct.error, zlib.error):
+            return None
+
+        # Sin versión antes de 'data' el mensaje es de un codificador que no
+        # garantiza que la carga sea el último campo
+        version = cabecera.pop('v', None) if isinstance(cabecera, dict) else None
+        if not isinstance(version, int) or version > VERSION or not isinstance(cabecera.get('type'), str):
+            return None
+        if self.a_nombre:
+            cabecera = self._traducir(cabecera, self.a_nombre)
+        try:
+            return normalizar_saltos(cabecera), carga
+        except ErrorCodec:
+            return None
+
+    def recomponer(self, cabecera, carga):
+        """
+        Cuerpo con una cabecera (posiblemente modificada) y la carga obtenida de
+        leer_cabecera(), en el mismo formato en que llegó la carga.
+        """
+        mensaje = dict(cabecera, v=VERSION)
+        if self.a_corto:
+            mensaje = self._traducir(mensaje, self.a_corto)
+        if isinstance(carga, str):
+            return json.dumps(mensaje, separators=(',', ':'))[:-1] + ',' + _CLAVE_DATOS + carga + '}'
+
+        salida = bytearray((_OBJETO,))
+        _escribir_varint(salida, len(mensaje) + 1)
+        for clave, valor in mensaje.items():
+            _escribir(salida, clave)
+            _escribir(salida, valor)
+        _escribir(salida, 'data')
+        salida += carga
+        return self._sobre(salida)
+
+    def _sobre(self, carga):
+        banderas = 0
+        if self.umbral_compresion is not None and len(carga) >= self.umbral_compresion:
+            carga = zlib.compress(carga)
+            banderas |= _COMPRIMIDO
+        sobre = _CABECERA.pack(VERSION, banderas) + carga
+        return PREFIJO_BINARIO + base64.b64encode(sobre).decode('ascii')
+
+    def decodificar(self, cuerpo):
+        # Se aceptan ambos formatos sin importar el modo, así los nodos pueden migrar de a uno
+        try:
+            if cuerpo.startswith(PREFIJO_BINARIO):
+                sobre = base64.b64decode(cuerpo[len(PREFIJO_BINARIO):], validate=True)
+                version, banderas = _CABECERA.unpack_from(sobre)
+                if version > VERSION:
+                    raise ErrorCodec(f"Versión de mensaje no soportada: {version}")
+                carga = sobre[_CABECERA.size:]
+                if banderas & _COMPRIMIDO:
+                    carga = zlib.decompress(carga)
+                mensaje, fin = _leer(carga, 0)
+                if fin != len(carga):
+                    raise ErrorCodec("Sobran bytes al final del mensaje.")
+            else:
+                mensaje = json.loads(cuerpo)
+        except ErrorCodec:
+            raise
+        except (ValueError, TypeError, IndexError, RecursionError, struct.error, zlib.error) as error:
+            raise ErrorCodec(f"Mensaje mal formado: {error}") from error
+
+        if not isinstance(mensaje, dict):
+            raise ErrorCodec("El mensaje debe ser un objeto JSON.")
+        version = mensaje.pop('v', VERSION)
+        if not isinstance(version, int) or version > VERSION:
+            raise ErrorCodec(f"Versión de mensaje no soportada: {version}")
+        if self.a_nombre:
+            mensaje = self._traducir(mensaje, self.a_nombre)
+        validar(mensaje)
+        return normalizar_saltos(mensaje)
+
+    def agrupar(self, cuerpos):
+        """
+        Une varios cuerpos ya codificados en uno solo para enviarlos juntos. Los
+        cuerpos JSON se insertan tal cual (sin escaparlos como texto) y los binarios
+        como cadenas.
+        """
+        partes = (cuerpo if cuerpo.startswith('{') else json.dumps(cuerpo) for cuerpo in cuerpos)
+        return PREFIJO_LOTE + ','.join(partes) + ']'
+
+    def desagrupar(self, cuerpo):
+        """
+        Devuelve la lista de cuerpos de un lote, o None si el cuerpo no es un lote.
+        """
+        if not cuerpo.startswith(PREFIJO_LOTE):
+            return None
+        try:
+            cuerpos = json.loads(cuerpo)
+        except ValueError as error:
+            raise ErrorCodec(f"Lote mal formado: {error}") from error
+        if not isinstance(cuerpos, list):
+            raise ErrorCodec("Un lote debe ser una lista de cuerpos.")
+        partes = []
+        for parte in cuerpos:
+            if isinstance(parte, dict):
+                parte = json.dumps(parte, separators=(',', ':'))
+            elif not isinstance(parte, str):
+                raise ErrorCodec("Cada parte de un lote debe ser un objeto o un texto.")
+            partes.append(parte)
+        return partes
+
+    def _traducir(self, mensaje, tabla):
+        def nodo(valor):
+            return tabla.get(valor, valor) if isinstance(valor, str) else valor
+
+        def tabla_nodos(valor):
+            if not isinstance(valor, dict):
+                return valor
+            traducida = {}
+            for clave, entrada in valor.items():
+                # Entradas de vector de distancias: (costo, siguiente_salto)
+                if isinstance(entrada, (list, tuple)) and len(entrada) == 2:
+                    entrada = [entrada[0], nodo(entrada[1])]
+                traducida[nodo(clave)] = entrada
+            return traducida
+
+        mensaje = dict(mensaje)
+        for campo in CAMPOS_NODO:
+            if campo in mensaje:
+                mensaje[campo] = nodo(mensaje[campo])
+        if 'table' in mensaje:
+            mensaje['table'] = tabla_nodos(mensaje['table'])
+        datos = mensaje.get('data')
+        if isinstance(datos, dict) and 'tabla_rutas' in datos:
+            mensaje['data'] = dict(datos, tabla_rutas=tabla_nodos(datos['tabla_rutas']))
+        return mensaje
+
+
+def validar(mensaje):
+    """
+    Comprueba que el mensaje tenga tipo y los campos que exige su esquema.
+    """
+    if not isinstance(mensaje, dict) or not isinstance(mensaje.get('type'), str):
+        raise ErrorCodec("El mensaje no tiene un campo 'type' válido.")
+    for campo, tipo in ESQUEMAS.get(mensaje['type'], {}).items():
+        if campo not in mensaje:
+            raise ErrorCodec(f"Al mensaje '{mensaje['type']}' le falta el campo '{campo}'.")
+        if tipo is not object and not isinstance(mensaje[campo], tipo):
+            raise ErrorCodec(f"El campo '{campo}' del mensaje '{mensaje['type']}' debe ser {tipo.__name__}.")
+
+
+def normalizar_saltos(mensaje):
+    """
+    Algunos clientes mandan 'hops' como texto; dentro del programa siempre es un entero.
+    """
+    saltos = mensaje.get('hops')
+    if isinstance(saltos, str):
+        try:
+            mensaje['hops'] = int(saltos)
+        except ValueError:
+            raise ErrorCodec(f"El campo 'hops' debe ser un entero: {saltos!r}") from None
+    return mensaje
+
+def _escribir_varint(salida, valor):
+    while valor > 0x7F:
+        salida.append((valor & 0x7F) | 0x80)
+        valor >>= 7
+    salida.append(valor)
+
+def _leer_varint(datos, posicion):
+    valor = 0
+    desplazamiento = 0
+    while True:
+        byte = datos[posicion]
+        posicion += 1
+        valor |= (byte & 0x7F) << desplazamiento
+        if byte < 0x80:
+            return valor, posicion
+        desplazamiento += 7
+
+def _escribir(salida, valor):
+    if valor is None:
+        salida.append(_NULO)
+    elif valor is True:
+        salida.append(_VERDADERO)
+    elif valor is False:
+        salida.append(_FALSO)
+    elif isinstance(valor, int):
+        salida.append(_ENTERO)
+        _escribir_varint(salida, valor * 2 if valor >= 0 else -valor * 2 - 1)  # zigzag
+    elif isinstance(valor, float):
+        salida.append(_REAL)
+        salida += _REAL_64.pack(valor)
+    elif isinstance(valor, str):
+        codificado = valor.encode('utf-8')
+        salida.append(_TEXTO)
+        _escribir_varint(salida, len(codificado))
+        salida += codificado
+    elif isinstance(valor, (list, tuple)):
+        salida.append(_LISTA)
+        _escribir_varint(salida, len(valor))
+        for elemento in valor:
+            _escribir(salida, elemento)
+    elif isinstance(valor, dict):
+        salida.append(_OBJETO)
+        _escribir_varint(salida, len(valor))
+        for clave, elemento in valor.items():
+            # Igual que JSON, las claves siempre viajan como texto
+            _escribir(salida, clave if isinstance(clave, str) else json.dumps(clave))
+            _escribir(salida, elemento)
+    else:
+        raise ErrorCodec(f"Tipo no serializable: {type(valor).__name__}")
+
+def _leer(datos, posicion, profundidad=0):
+    etiqueta = datos[posicion]
+    posicion += 1
+    if etiqueta == _NULO:
+        return None, posicion
+    if etiqueta == _VERDADERO:
+        return True, posicion
+    if etiqueta == _FALSO:
+        return False, posicion
+    if etiqueta == _ENTERO:
+        zigzag, posicion = _leer_varint(datos, posicion)
+        return (zigzag >> 1) ^ -(zigzag & 1), posicion
+    if etiqueta == _REAL:
+        return _REAL_64.unpack_from(datos, posicion)[0], posicion + _REAL_64.size
+    if etiqueta == _TEXTO:
+        largo, posicion = _leer_varint(datos, posicion)
+        if posicion + largo > len(datos):
+            raise ErrorCodec("Texto truncado.")
+        return bytes(datos[posicion:posicion + largo]).decode('utf-8'), posicion + largo
+    if etiqueta in (_LISTA, _OBJETO) and profundidad >= PROFUNDIDAD_MAXIMA:
+        raise ErrorCodec("Demasiados niveles de anidamiento.")
+    if etiqueta == _LISTA:
+        largo, posicion = _leer_varint(datos, posicion)
+        lista = []
+        for _ in range(largo):
+            elemento, posicion = _leer(datos, posicion, profundidad + 1)
+            lista.append(elemento)
+        return lista, posicion
+    if etiqueta == _OBJETO:
+        largo, posicion = _leer_varint(datos, posicion)
+        objeto = {}
+        for _ in range(largo):
+            clave, posicion = _leer_clave(datos, posicion)
+            objeto[clave], posicion = _leer(datos, posicion, profundidad + 1)
+        return objeto, posicion
+    raise ErrorCodec(f"Etiqueta desconocida: {etiqueta}")
+
+def _leer_clave(datos, posicion):
+    # Como en JSON, las claves de un objeto solo pueden ser textos
+    if datos[posicion] != _TEXTO:
+        raise ErrorCodec("La clave de un objeto debe ser un texto.")
+    return _leer(datos, posicion)
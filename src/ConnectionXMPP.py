@@ -1,20 +1,35 @@
 import slixmpp
 import asyncio
-import json
 import ssl
 import logging
 
-# Habilitar logging detallado
-logging.basicConfig(level=logging.DEBUG, format='%(levelname)-8s %(message)s')
+from Transporte import Transporte
+from Metricas import REGISTRO
 
-class ClienteXMPP(slixmpp.ClientXMPP):
-    def __init__(self, jid, password, algoritmo):
-        super().__init__(jid, password)
+# El nivel de logging lo decide el programa que arranca el nodo (ver configurar_logging);
+# aquí solo se obtiene el logger del módulo
+log = logging.getLogger(__name__)
+
+def configurar_logging(nivel=logging.INFO):
+    """
+    Configura el logging de la consola. Con DEBUG se registra el contenido de
+    cada mensaje enviado y recibido, lo que es costoso con mucho tráfico.
+    """
+    logging.basicConfig(level=nivel, format='%(levelname)-8s %(name)s: %(message)s')
+
+class ClienteXMPP(slixmpp.ClientXMPP, Transporte):
+    def __init__(self, jid, password, algoritmo, codec=None, archivo_metricas=None, intervalo_metricas=10.0):
+        slixmpp.ClientXMPP.__init__(self, jid, password)
+        Transporte.__init__(self, algoritmo, codec)  # Instancia del algoritmo que se va a usar, e.g., DifusionAlgoritmo
+        # Si se indica, las métricas se vuelcan en formato Prometheus a este archivo
+        self.archivo_metricas = archivo_metricas
+        self.intervalo_metricas = intervalo_metricas
+        self._tarea_metricas = None
 
-        self.algoritmo = algoritmo  # Instancia del algoritmo que se va a usar, e.g., DifusionAlgoritmo
         self.add_event_handler("session_start", self.iniciar_sesion)
         self.add_event_handler("message", self.manejar_mensaje)
         self.add_event_handler("got_online", self.vecino_encontrado)  # Evento para detectar vecinos
+        self.add_event_handler("got_offline", self.vecino_perdido)  # Evento para detectar vecinos caídos
 
         # Configurar SSL para actuar como cliente
         self.ssl_context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
@@ -26,49 +41,36 @@ class ClienteXMPP(slixmpp.ClientXMPP):
         self.register_plugin('xep_0030')  # Servicio de descubrimiento de XMPP
         self.register_plugin('xep_0199')  # Ping XMPP para mantener la conexión viva
 
+    @property
+    def jid_propio(self):
+        return self.boundjid.bare
+
     async def iniciar_sesion(self, event):
-        print(f"{self.boundjid.bare} está enviando presencia...")
+        log.info("%s está enviando presencia...", self.boundjid.bare)
         self.send_presence()  # Enviar presencia a todos los nodos
         await self.get_roster()  # Obtener lista de usuarios conectados
-        print(f"{self.boundjid.bare} presencia enviada.")
-
-        # Depuración del estado de conexión
-        print(f"Conectado a: {self.boundjid.full}")
-        print(f"Estado: {self.get_status()}")
+        log.info("Conectado a: %s", self.boundjid.full)
 
         # Enviar un ping al servidor para verificar el estado de la conexión
-        print("Enviando ping al servidor...")
+        log.debug("Enviando ping al servidor...")
         await self.plugin['xep_0199'].send_ping(self.boundjid.host)
-        print("Ping enviado y respuesta recibida.")
+        log.debug("Ping enviado y respuesta recibida.")
+
+        if self.archivo_metricas and self._tarea_metricas is None:
+            self._tarea_metricas = asyncio.ensure_future(
+                REGISTRO.volcar_periodicamente(self.archivo_metricas, self.intervalo_metricas))
+
+        await self.sesion_iniciada()
 
     def manejar_mensaje(self, msg):
-        print(f"{self.boundjid.bare} recibió un mensaje de {msg['from'].bare}")
         if msg['type'] in ('chat', 'normal'):
-            mensaje_json = json.loads(msg['body'])
-            tipo_mensaje = mensaje_json.get('type')
-            print(f"Contenido del mensaje: {mensaje_json}")
-
-            if tipo_mensaje == "send_routing":
-                self.algoritmo.recibir_mensaje(mensaje_json['from'], msg['id'], mensaje_json['data'])
-            elif tipo_mensaje == "echo":
-                self.enviar_echo_response(mensaje_json['from'])
-            elif tipo_mensaje == "echo_response":
-                self.algoritmo.recibir_echo_response(mensaje_json)
-            # Aquí se pueden agregar más tipos de mensajes según sea necesario
-
-    def enviar_mensaje(self, destino, mensaje_json):
-        print(f"{self.boundjid.bare} está enviando mensaje a {destino}: {mensaje_json}")
-        self.send_message(mto=destino, mbody=json.dumps(mensaje_json), mtype='chat')
-
-    def enviar_echo_response(self, destino):
-        mensaje = {
-            "type": "echo_response",
-            "from": self.boundjid.bare,
-        }
-        self.enviar_mensaje(destino, mensaje)
+            self.recibir(msg['from'].bare, msg['id'], msg['body'])
+
+    def enviar(self, destino, cuerpo):
+        self.send_message(mto=destino, mbody=cuerpo, mtype='chat')
 
     def vecino_encontrado(self, presence):
-        vecino_jid = presence['from'].bare
-        if vecino_jid != self.boundjid.bare:
-            print(f"{self.boundjid.bare} encontró al vecino: {vecino_jid}")
-            self.algoritmo.agregar_vecino(vecino_jid)
+        self.vecino_conectado(presence['from'].bare)
+
+    def vecino_perdido(self, presence):
+        self.vecino_desconectado(presence['from'].bare)
@@ -1,4 +1,10 @@
 import heapq
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # numpy solo se necesita para el modo vectorizado
+    np = None
 
 def dijkstra(graph, start):
     # Inicializar la distancia de todos los nodos a infinito
@@ -26,15 +32,334 @@ def dijkstra(graph, start):
     
     return distances
 
+def dijkstra_tree(graph, start):
+    """
+    Igual que dijkstra(), pero también devuelve el predecesor de cada nodo en el
+    árbol de caminos más cortos. Solo aparecen los nodos alcanzables, y se toleran
+    vecinos que todavía no tienen entrada propia en el grafo.
+    """
+    distances = {start: 0}
+    previous = {start: None}
+    priority_queue = [(0, start)]
+
+    while priority_queue:
+        current_distance, current_node = heapq.heappop(priority_queue)
+
+        if current_distance > distances[current_node]:
+            continue
+
+        for neighbor, weight in graph.get(current_node, {}).items():
+            distance = current_distance + weight
+            if distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = distance
+                previous[neighbor] = current_node
+                heapq.heappush(priority_queue, (distance, neighbor))
+
+    return distances, previous
+
+def update_tree(graph, distances, previous, changed_node, old_links):
+    """
+    Actualiza en sitio el árbol de dijkstra_tree() cuando solo cambiaron las
+    aristas salientes de `changed_node` (antes `old_links`, ahora graph[changed_node]).
+
+    Los subárboles colgados de aristas que empeoraron o desaparecieron se invalidan
+    y se vuelven a sembrar desde la frontera válida; las aristas que mejoraron se
+    propagan desde `changed_node`. El resto del árbol no se toca.
+
+    Devuelve el conjunto de nodos cuya distancia o predecesor cambió (incluidos
+    los que quedaron inalcanzables). Un nodo cuyo camino cambió arrastra a todo
+    su subárbol, así que el conjunto queda cerrado hacia abajo en el árbol.
+    """
+    new_links = graph.get(changed_node, {})
+
+    # Nodos cuyo camino actual pasa por una arista del árbol que empeoró
+    children = {}
+    for node, parent in previous.items():
+        if parent is not None:
+            children.setdefault(parent, []).append(node)
+
+    stack = [
+        neighbor for neighbor, weight in old_links.items()
+        if previous.get(neighbor) == changed_node
+        and (neighbor not in new_links or new_links[neighbor] > weight)
+    ]
+    invalid = set()
+    while stack:
+        node = stack.pop()
+        if node in invalid:
+            continue
+        invalid.add(node)
+        stack.extend(children.get(node, ()))
+
+    for node in invalid:
+        del distances[node]
+        del previous[node]
+    changed = set(invalid)
+
+    # Cola de candidatos (distancia, nodo, predecesor)
+    priority_queue = []
+    if invalid:
+        for node, links in graph.items():
+            node_distance = distances.get(node)
+            if node_distance is None:
+                continue
+            for neighbor, weight in links.items():
+                if neighbor in invalid:
+                    priority_queue.append((node_distance + weight, neighbor, node))
+
+    changed_distance = distances.get(changed_node)
+    if changed_distance is not None:
+        for neighbor, weight in new_links.items():
+            if neighbor not in old_links or weight < old_links[neighbor]:
+                priority_queue.append((changed_distance + weight, neighbor, changed_node))
+
+    heapq.heapify(priority_queue)
+    while priority_queue:
+        current_distance, current_node, parent = heapq.heappop(priority_queue)
+        if current_distance >= distances.get(current_node, float('inf')):
+            continue
+
+        distances[current_node] = current_distance
+        previous[current_node] = parent
+        changed.add(current_node)
+
+        for neighbor, weight in graph.get(current_node, {}).items():
+            distance = current_distance + weight
+            if distance < distances.get(neighbor, float('inf')):
+                heapq.heappush(priority_queue, (distance, neighbor, current_node))
+
+    return changed
+
+def equal_cost_first_hops(graph, source, distances, tolerance=1e-9):
+    """
+    Todos los primeros saltos de los caminos de costo mínimo desde `source`, a
+    partir de las distancias de dijkstra_tree(): {nodo: tupla de vecinos de
+    source}. Un nodo hereda los primeros saltos de cada predecesor u con
+    distances[u] + peso == distances[nodo], con una tolerancia relativa para los
+    errores de redondeo de los costos reales.
+    """
+    hops = {source: set()}
+    for node in sorted(distances, key=distances.get):
+        node_hops = hops.get(node)
+        if node_hops is None:
+            continue
+        node_distance = distances[node]
+        for neighbor, weight in graph.get(node, {}).items():
+            neighbor_distance = distances.get(neighbor)
+            if neighbor_distance is None or node_distance >= neighbor_distance:
+                continue
+            if abs(node_distance + weight - neighbor_distance) <= tolerance * max(1.0, neighbor_distance):
+                hops.setdefault(neighbor, set()).update(node_hops if node != source else (neighbor,))
+    return {node: tuple(sorted(node_hops)) for node, node_hops in hops.items()}
+
+def shortest_path(graph, source, target, removed_nodes=(), removed_edges=()):
+    """
+    Camino más corto de source a target como (costo, [nodos]), o None si no hay.
+    Se pueden excluir nodos y aristas (pares (u, v)), como pide el algoritmo de Yen.
+    """
+    distances = {source: 0}
+    previous = {source: None}
+    priority_queue = [(0, source)]
+    while priority_queue:
+        current_distance, current_node = heapq.heappop(priority_queue)
+        if current_node == target:
+            path = [target]
+            while previous[path[-1]] is not None:
+                path.append(previous[path[-1]])
+            return current_distance, path[::-1]
+        if current_distance > distances[current_node]:
+            continue
+        for neighbor, weight in graph.get(current_node, {}).items():
+            if neighbor in removed_nodes or (current_node, neighbor) in removed_edges:
+                continue
+            distance = current_distance + weight
+            if distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = distance
+                previous[neighbor] = current_node
+                heapq.heappush(priority_queue, (distance, neighbor))
+    return None
+
+def k_shortest_paths(graph, source, target, k):
+    """
+    Los k caminos sin ciclos más cortos de source a target (algoritmo de Yen),
+    como lista de (costo, [nodos]) en orden creciente de costo.
+    """
+    first = shortest_path(graph, source, target)
+    if first is None or k <= 0:
+        return []
+    paths = [first]
+    candidates = []
+    seen = {tuple(first[1])}
+    while len(paths) < k:
+        previous_path = paths[-1][1]
+        for i in range(len(previous_path) - 1):
+            spur_node = previous_path[i]
+            root = previous_path[:i + 1]
+            root_cost = sum(graph[u][v] for u, v in zip(root, root[1:]))
+            # Se quitan las aristas que repetirían caminos ya encontrados con la misma raíz
+            removed_edges = {(path[i], path[i + 1]) for _, path in paths if path[:i + 1] == root}
+            spur = shortest_path(graph, spur_node, target, set(root[:-1]), removed_edges)
+            if spur is None:
+                continue
+            path = root[:-1] + spur[1]
+            if tuple(path) not in seen:
+                seen.add(tuple(path))
+                heapq.heappush(candidates, (root_cost + spur[0], path))
+        if not candidates:
+            break
+        paths.append(heapq.heappop(candidates))
+    return paths
+
+class CompactGraph:
+    """
+    Grafo dirigido compacto: los nodos se internan como enteros 0..n-1 y la
+    adyacencia se guarda en arreglos tipo CSR (offsets, targets, weights).
+
+    Los vecinos del nodo i son targets[offsets[i]:offsets[i + 1]] con sus pesos
+    en la misma posición de weights. Cambiar el peso de una arista existente no
+    requiere reconstruir nada.
+    """
+
+    # Densidad (aristas / n^2) a partir de la cual all_pairs() prefiere numpy
+    DENSE_THRESHOLD = 0.25
+
+    def __init__(self, nodes, offsets, targets, weights):
+        self.nodes = list(nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+    @classmethod
+    def from_dict(cls, graph):
+        """
+        Construye el grafo a partir del formato dict-de-dicts que usa dijkstra().
+        """
+        nodes = list(graph)
+        index = {node: i for i, node in enumerate(nodes)}
+        for links in graph.values():
+            for neighbor in links:
+                if neighbor not in index:
+                    index[neighbor] = len(nodes)
+                    nodes.append(neighbor)
+
+        offsets = array('l', [0])
+        targets = array('l')
+        weights = array('d')
+        for node in nodes:
+            for neighbor, weight in graph.get(node, {}).items():
+                targets.append(index[neighbor])
+                weights.append(weight)
+            offsets.append(len(targets))
+
+        return cls(nodes, offsets, targets, weights)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def edge_count(self):
+        return len(self.targets)
+
+    def set_weight(self, source, target, weight):
+        """
+        Cambia el peso de una arista existente (por nombre de nodo).
+        """
+        u = self.index[source]
+        v = self.index[target]
+        for position in range(self.offsets[u], self.offsets[u + 1]):
+            if self.targets[position] == v:
+                self.weights[position] = weight
+                return
+        raise KeyError(f"No existe la arista {source} -> {target}")
+
+    def shortest_paths(self, source):
+        """
+        Dijkstra desde un solo origen (por nombre de nodo). Devuelve (distancias,
+        predecesores) indexados por id entero; -1 indica que no hay predecesor.
+        """
+        return self._shortest_paths_from(self.index[source])
+
+    def _shortest_paths_from(self, start):
+        n = len(self.nodes)
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+
+        distances = array('d', [float('inf')]) * n
+        previous = array('l', [-1]) * n
+        distances[start] = 0.0
+        priority_queue = [(0.0, start)]
+
+        while priority_queue:
+            current_distance, u = heapq.heappop(priority_queue)
+            if current_distance > distances[u]:
+                continue
+            for position in range(offsets[u], offsets[u + 1]):
+                v = targets[position]
+                distance = current_distance + weights[position]
+                if distance < distances[v]:
+                    distances[v] = distance
+                    previous[v] = u
+                    heapq.heappush(priority_queue, (distance, v))
+
+        return distances, previous
+
+    def all_pairs(self, method='auto'):
+        """
+        Caminos más cortos desde todos los orígenes. Devuelve (distancias,
+        predecesores) como matrices n x n: listas de arreglos con method='heap',
+        arreglos de numpy con method='numpy'. Con 'auto' se usa numpy para
+        topologías densas si está instalado.
+        """
+        if method == 'auto':
+            n = len(self.nodes)
+            dense = n > 0 and self.edge_count() >= self.DENSE_THRESHOLD * n * n
+            method = 'numpy' if dense and np is not None else 'heap'
+
+        if method == 'heap':
+            rows = [self._shortest_paths_from(i) for i in range(len(self.nodes))]
+            return [row[0] for row in rows], [row[1] for row in rows]
+
+        if method == 'numpy':
+            return self._all_pairs_numpy()
+
+        raise ValueError(f"Método desconocido: {method}")
+
+    def _all_pairs_numpy(self):
+        # Floyd-Warshall vectorizado: O(n^3) pero cada paso k es una sola operación
+        if np is None:
+            raise ImportError("El modo vectorizado requiere numpy")
+
+        n = len(self.nodes)
+        distances = np.full((n, n), np.inf)
+        previous = np.full((n, n), -1, dtype=np.int64)
+
+        sources = np.repeat(np.arange(n), np.diff(np.asarray(self.offsets)))
+        targets = np.asarray(self.targets, dtype=np.int64)
+        weights = np.asarray(self.weights, dtype=np.float64)
+        # Con aristas repetidas se queda la de menor peso
+        order = np.argsort(-weights, kind='stable')
+        distances[sources[order], targets[order]] = weights[order]
+        previous[sources, targets] = sources
+        np.fill_diagonal(distances, 0.0)
+        np.fill_diagonal(previous, -1)
+
+        for k in range(n):
+            through_k = distances[:, k, None] + distances[None, k, :]
+            better = through_k < distances
+            distances = np.where(better, through_k, distances)
+            previous = np.where(better, previous[k][None, :], previous)
+
+        return distances, previous
+
 # Ejemplo de uso:
-graph = {
-    'A': {'B': 1, 'C': 4},
-    'B': {'A': 1, 'C': 2, 'D': 5},
-    'C': {'A': 4, 'B': 2, 'D': 1},
-    'D': {'B': 5, 'C': 1}
-}
+if __name__ == "__main__":
+    graph = {
+        'A': {'B': 1, 'C': 4},
+        'B': {'A': 1, 'C': 2, 'D': 5},
+        'C': {'A': 4, 'B': 2, 'D': 1},
+        'D': {'B': 5, 'C': 1}
+    }
 
-start_node = 'A'
-shortest_paths = dijkstra(graph, start_node)
+    start_node = 'A'
+    shortest_paths = dijkstra(graph, start_node)
 
-print(f"Shortest paths from {start_node}: {shortest_paths}")
+    print(f"Shortest paths from {start_node}: {shortest_paths}")
@@ -1,89 +1,398 @@
 import asyncio
+import logging
+import random
 import sys
+import time
 
 # Solución para problemas con aiodns en Windows
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-from ConnectionXMPP import ClienteXMPP
+from CacheMensajes import CacheDuplicados
+from Metricas import DURACION_TABLA, observar_cache
+from SondeoEnlaces import SondeoEnlaces
+from Instantaneas import Instantaneas
+
+log = logging.getLogger(__name__)
 
 class DistanceVectorRouting:
-    def __init__(self, nodo_id, password):
+    def __init__(self, nodo_id, password, transporte=None, cache_duplicados=None,
+                 retardo_actualizacion=0.05, intervalo_refresco=30.0,
+                 infinito=10_000, costo_defecto=1, medir_costos=True, sondeo=None,
+                 archivo_estado=None, intervalo_estado=30.0):
         """
-        Inicializa el nodo con su JID y contraseña.
+        Inicializa el nodo con su JID y contraseña. Si no se indica un transporte
+        se usa una conexión XMPP propia; cache_duplicados permite ajustar la
+        capacidad, el TTL o el modo de la cache de mensajes vistos.
+
+        Los cambios de la tabla se acumulan durante retardo_actualizacion segundos
+        y se anuncian juntos, solo con las entradas que cambiaron; cada
+        intervalo_refresco segundos (None lo desactiva) se envía la tabla completa.
+
+        El costo de cada enlace es el RTT suavizado de los echos periódicos en
+        milisegundos (costo_defecto mientras no hay medición, o siempre si
+        medir_costos es False); sondeo son las opciones de SondeoEnlaces. Ninguna ruta
+        cuesta más que `infinito`, que también es el costo que se anuncia para
+        rutas perdidas y, por poison reverse, al vecino usado como siguiente salto.
+
+        Con archivo_estado, la tabla de rutas, los vectores de los vecinos y los
+        costos se guardan en ese archivo (a lo sumo cada intervalo_estado
+        segundos) y se retoman al reiniciar. Cada tabla lleva una versión y, al
+        reencontrarse, los vecinos solo se reenvían la tabla completa si la
+        versión que tiene el otro no es la actual.
         """
         self.nodo_id = nodo_id
+        self.infinito = infinito
+        self.costo_defecto = costo_defecto
+        self.medir_costos = medir_costos
+        self.costos_enlace = {}  # vecino -> costo del enlace
+        self.tablas_vecinos = {}  # vecino -> {destino: costo anunciado}
+        self.retardo_actualizacion = retardo_actualizacion
+        self.intervalo_refresco = intervalo_refresco
+        self.cambios_pendientes = set()  # Destinos modificados aún no anunciados
+        self._envio_programado = None
+        self._tarea_refresco = None
+        self.congestionado = False  # Contrapresión del planificador de envío
         self.red_vecinos = set()  # Usaremos un set para almacenar dinámicamente los vecinos
-        self.mensajes_recibidos = set()
+        self.mensajes_recibidos = cache_duplicados if cache_duplicados is not None else CacheDuplicados()
+        observar_cache(nodo_id, self.mensajes_recibidos)
         self.tabla_rutas = {}  # Tabla de rutas: {nodo_destino: (costo, siguiente_salto)}
+        # Versión de la tabla: encarnación aleatoria (nueva en cada arranque en frío)
+        # y número de cambios; solo se compara por igualdad
+        self.encarnacion = f"{random.getrandbits(32):08x}"
+        self.cambios_tabla = 0
+        self.versiones_vecinos = {}  # vecino -> versión de su último vector recibido
+        self.sondeo = None
+        if medir_costos:
+            self.sondeo = SondeoEnlaces.from_config(self.enviar_echo, self._actualizar_costo, sondeo,
+                                                    costo=lambda rtt: max(rtt * 1000, 1e-3),
+                                                    al_perder_vecino=self.eliminar_vecino)
         self.inicializar_tabla()
-        self.cliente_xmpp = ClienteXMPP(nodo_id, password, self)
+        self.instantaneas = None
+        self.restaurado = False
+        if archivo_estado is not None:
+            self.instantaneas = Instantaneas(archivo_estado, nodo_id, self.estado_guardable, intervalo_estado)
+            estado = self.instantaneas.cargar()
+            if estado is not None:
+                self.restaurar(estado)
+        if transporte is None:
+            from ConnectionXMPP import ClienteXMPP
+            transporte = ClienteXMPP(nodo_id, password, self)
+        else:
+            transporte.algoritmo = self
+        self.transporte = transporte
 
     def inicializar_tabla(self):
         # Inicializar la tabla de rutas consigo mismo (costo 0, siguiente salto es el mismo nodo)
         self.tabla_rutas[self.nodo_id] = (0, self.nodo_id)
 
+    @property
+    def version_tabla(self):
+        return f"{self.encarnacion}-{self.cambios_tabla}"
+
+    def estado_guardable(self):
+        return {
+            'encarnacion': self.encarnacion,
+            'cambios_tabla': self.cambios_tabla,
+            'tabla_rutas': self.tabla_rutas,
+            'tablas_vecinos': self.tablas_vecinos,
+            'versiones_vecinos': self.versiones_vecinos,
+            'costos_enlace': self.costos_enlace,
+        }
+
+    def restaurar(self, estado):
+        """
+        Retoma el estado guardado con estado_guardable(). Los vecinos de la copia
+        se dan por conectados hasta que el sondeo diga lo contrario.
+        """
+        self.encarnacion = estado['encarnacion']
+        self.cambios_tabla = estado['cambios_tabla']
+        self.tabla_rutas = {destino: tuple(entrada) for destino, entrada in estado['tabla_rutas'].items()}
+        self.tabla_rutas[self.nodo_id] = (0, self.nodo_id)
+        self.tablas_vecinos = estado['tablas_vecinos']
+        self.versiones_vecinos = estado['versiones_vecinos']
+        self.costos_enlace = estado['costos_enlace']
+        self.red_vecinos = set(self.costos_enlace)
+        self.restaurado = True
+        log.info("%s retomó %d rutas de %s", self.nodo_id, len(self.tabla_rutas), self.instantaneas.ruta)
+
+    def guardar_estado(self):
+        if self.instantaneas is not None:
+            self.instantaneas.guardar()
+
     def conectar(self):
         """
         Inicia la conexión XMPP.
         """
-        print("Intentando conectar al servidor XMPP...")
-        self.cliente_xmpp.connect()
-        print("Conexión iniciada, procesando...")
-        self.cliente_xmpp.process(forever=False)
-        print("Conexión procesada.")
+        log.info("Intentando conectar al servidor XMPP...")
+        self.transporte.connect()
+        self.transporte.process(forever=False)
 
     def agregar_vecino(self, vecino_jid):
         """
         Agrega un vecino a la lista de vecinos del nodo.
         """
         self.red_vecinos.add(vecino_jid)
-        print(f"Vecino agregado: {vecino_jid}")
-        # Propagar la tabla a los nuevos vecinos
-        self.enviar_tabla(vecino_jid)
-
-    def actualizar_tabla(self, vecino, tabla_vecino):
-        # Revisar las rutas que llegan a través del vecino
-        tabla_actualizada = False
-        for destino, (costo_vecino, salto_vecino) in tabla_vecino.items():
-            nuevo_costo = costo_vecino + 1  # Añadir 1 al costo para llegar al vecino
-            if destino not in self.tabla_rutas or nuevo_costo < self.tabla_rutas[destino][0]:
-                self.tabla_rutas[destino] = (nuevo_costo, vecino)
-                tabla_actualizada = True
-
-        # Si la tabla se actualizó, propagar la nueva tabla a los vecinos
-        if tabla_actualizada:
+        self.costos_enlace.setdefault(vecino_jid, self.costo_defecto)
+        log.info("Vecino agregado: %s", vecino_jid)
+        self._recalcular_rutas([vecino_jid])
+        # Propagar la tabla a los nuevos vecinos; a uno ya conocido basta con
+        # comparar versiones
+        if vecino_jid in self.versiones_vecinos:
+            self.enviar_sincronizacion(vecino_jid)
+        else:
+            self.enviar_tabla(vecino_jid)
+        if self.sondeo is not None:
+            self.sondeo.agregar_vecino(vecino_jid)
+
+    def eliminar_vecino(self, vecino_jid):
+        """
+        Quita un vecino caído y recalcula las rutas que pasaban por él.
+        """
+        if vecino_jid not in self.red_vecinos:
+            return
+        self.red_vecinos.discard(vecino_jid)
+        self.costos_enlace.pop(vecino_jid, None)
+        self.versiones_vecinos.pop(vecino_jid, None)
+        if self.sondeo is not None:
+            self.sondeo.quitar_vecino(vecino_jid)
+        tabla_vecino = self.tablas_vecinos.pop(vecino_jid, {})
+        log.info("Vecino eliminado: %s", vecino_jid)
+        afectados = [destino for destino, (_, salto) in self.tabla_rutas.items() if salto == vecino_jid]
+        self._recalcular_rutas(set(afectados) | set(tabla_vecino) | {vecino_jid})
+
+    def enviar_echo(self, vecino, secuencia=None):
+        """
+        Envía un echo para medir el costo del enlace con el vecino.
+        """
+        mensaje = {
+            "type": "echo",
+            "from": self.nodo_id,
+        }
+        if secuencia is not None:
+            mensaje["seq"] = secuencia
+        self.transporte.enviar_mensaje(vecino, mensaje)
+
+    def recibir_echo_response(self, mensaje):
+        if self.sondeo is not None:
+            self.sondeo.recibir_respuesta(mensaje.get('from'), mensaje.get('seq'))
+
+    def _actualizar_costo(self, vecino, costo):
+        """
+        El sondeo publicó un costo nuevo (ya filtrado por histéresis): recalcular todas las rutas.
+        """
+        if vecino not in self.red_vecinos:
+            return
+        log.debug("Costo del enlace con %s: %.3fms", vecino, costo)
+        self.costos_enlace[vecino] = costo
+        self._recalcular_rutas(self.tabla_rutas.keys() | self._destinos_conocidos())
+
+    async def iniciar(self):
+        """
+        Arranca el refresco periódico de la tabla completa.
+        """
+        if self.intervalo_refresco and self._tarea_refresco is None:
+            self._tarea_refresco = asyncio.ensure_future(self._refrescar_periodicamente())
+        if self.restaurado:
+            for vecino in self.red_vecinos:
+                self.enviar_sincronizacion(vecino)
+                if self.sondeo is not None:
+                    self.sondeo.agregar_vecino(vecino)
+
+    async def _refrescar_periodicamente(self):
+        while True:
+            await asyncio.sleep(self.intervalo_refresco)
             self.propagar_tabla()
 
+    def actualizar_tabla(self, vecino, tabla_vecino, completa=True, version=None):
+        """
+        Guarda el vector anunciado por el vecino (completo o solo los cambios) y
+        recalcula las rutas hacia los destinos que menciona.
+        """
+        if vecino not in self.red_vecinos:
+            # Un anuncio también prueba que el vecino está en línea
+            self.red_vecinos.add(vecino)
+            self.costos_enlace.setdefault(vecino, self.costo_defecto)
+            if self.sondeo is not None:
+                self.sondeo.agregar_vecino(vecino)
+
+        inicio = time.perf_counter()
+        anteriores = self.tablas_vecinos.get(vecino, {})
+        vector = {} if completa else dict(anteriores)
+        for destino, entrada in tabla_vecino.items():
+            vector[destino] = min(entrada[0], self.infinito)
+        self.tablas_vecinos[vecino] = vector
+        if version is not None:
+            self.versiones_vecinos[vecino] = version
+        if self.instantaneas is not None:
+            self.instantaneas.marcar()
+
+        # En una tabla completa, lo que ya no aparece se da por perdido
+        afectados = set(tabla_vecino)
+        if completa:
+            afectados |= set(anteriores) - set(vector)
+        self._recalcular_rutas(afectados)
+        DURACION_TABLA.observar(time.perf_counter() - inicio, self.nodo_id)
+
+    def _destinos_conocidos(self):
+        destinos = set(self.red_vecinos)
+        for vector in self.tablas_vecinos.values():
+            destinos.update(vector)
+        return destinos
+
+    def _mejor_ruta(self, destino):
+        # Bellman-Ford sobre los vectores guardados: min(costo enlace + costo anunciado)
+        mejor = (self.infinito, None)
+        for vecino in self.red_vecinos:
+            costo_enlace = self.costos_enlace.get(vecino, self.costo_defecto)
+            if destino == vecino:
+                costo = costo_enlace
+            else:
+                costo = costo_enlace + self.tablas_vecinos.get(vecino, {}).get(destino, self.infinito)
+            if costo < mejor[0]:
+                mejor = (costo, vecino)
+        return mejor
+
+    def _recalcular_rutas(self, destinos):
+        cambios = set()
+        for destino in destinos:
+            if destino == self.nodo_id:
+                continue
+            anterior = self.tabla_rutas.get(destino)
+            nueva = self._mejor_ruta(destino)
+            if anterior is None and nueva[1] is None:
+                continue
+            # Se acepta aunque empeore: el vecino por el que pasaba la ruta manda
+            if nueva != anterior:
+                self.tabla_rutas[destino] = nueva
+                cambios.add(destino)
+
+        # Si la tabla se actualizó, anunciar los cambios a los vecinos
+        if cambios:
+            self.cambios_tabla += 1
+            if self.instantaneas is not None:
+                self.instantaneas.marcar()
+            self.programar_anuncio(cambios)
+        return cambios
+
+    def programar_anuncio(self, destinos):
+        """
+        Acumula destinos modificados y programa un único anuncio al terminar la ventana.
+        """
+        self.cambios_pendientes.update(destinos)
+        if self._envio_programado is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Fuera de un event loop no hay temporizadores: anunciar de inmediato
+            self.anunciar_cambios()
+            return
+        self._envio_programado = loop.call_later(self.retardo_actualizacion, self.anunciar_cambios)
+
+    def trabajo_pendiente(self):
+        return self._envio_programado is not None
+
+    def contrapresion(self, activa):
+        """
+        Mientras la cola de salida está saturada los cambios se siguen acumulando
+        sin anunciarse; al liberarse sale un solo anuncio con todos.
+        """
+        self.congestionado = activa
+        if not activa and self.cambios_pendientes:
+            self.programar_anuncio(())
+
+    def anunciar_cambios(self):
+        self._envio_programado = None
+        if not self.cambios_pendientes or self.congestionado:
+            return
+        entradas = {destino: self.tabla_rutas[destino] for destino in self.cambios_pendientes
+                    if destino in self.tabla_rutas}
+        self.cambios_pendientes.clear()
+        for vecino in self.red_vecinos:
+            self.enviar_tabla(vecino, entradas)
+
     def propagar_tabla(self):
+        # Una tabla completa ya incluye cualquier cambio pendiente
+        self.cambios_pendientes.clear()
         for vecino in self.red_vecinos:
             self.enviar_tabla(vecino)
 
-    def enviar_tabla(self, vecino):
+    def enviar_tabla(self, vecino, entradas=None):
+        """
+        Envía la tabla completa o, si se indican, solo las entradas dadas.
+        Con split horizon y poison reverse, las rutas que salen por este vecino
+        se le anuncian con costo infinito.
+        """
+        completa = entradas is None
+        if completa:
+            entradas = self.tabla_rutas
+        anunciadas = {
+            destino: (self.infinito, salto) if salto == vecino and destino != vecino else (costo, salto)
+            for destino, (costo, salto) in entradas.items()
+        }
+        mensaje = {
+            "type": "send_routing",
+            "from": self.nodo_id,
+            "data": {
+                "tabla_rutas": anunciadas,
+                "completa": completa,
+                "version": self.version_tabla
+            }
+        }
+        self.transporte.enviar_mensaje(vecino, mensaje)
+
+    def enviar_sincronizacion(self, vecino, respuesta=False):
+        """
+        Le dice al vecino qué versión de su tabla tenemos y cuál es la nuestra,
+        para que cada uno envíe la tabla completa solo si el otro está atrasado.
+        """
         mensaje = {
             "type": "send_routing",
             "from": self.nodo_id,
-            "tabla_rutas": self.tabla_rutas
+            "data": {
+                "sincronizar": self.versiones_vecinos.get(vecino),
+                "version": self.version_tabla,
+                "respuesta": respuesta
+            }
         }
-        self.cliente_xmpp.enviar_mensaje(vecino, mensaje)
+        self.transporte.enviar_mensaje(vecino, mensaje)
+
+    def sincronizar(self, vecino, contenido):
+        if vecino not in self.red_vecinos:
+            self.red_vecinos.add(vecino)
+            self.costos_enlace.setdefault(vecino, self.costo_defecto)
+            if self.sondeo is not None:
+                self.sondeo.agregar_vecino(vecino)
+        if contenido['sincronizar'] != self.version_tabla:
+            self.enviar_tabla(vecino)
+        if contenido.get('version') != self.versiones_vecinos.get(vecino) and not contenido.get('respuesta'):
+            self.enviar_sincronizacion(vecino, respuesta=True)
 
-    def recibir_mensaje(self, origen, mensaje_id, contenido):
+    def recibir_mensaje(self, origen, mensaje_id, contenido, saltos=0, ttl=None, originador=None):
         """
         Procesa un mensaje recibido, actualiza la tabla de rutas si es necesario.
+        Los campos de la cabecera de difusión (saltos, ttl, originador) que pasa
+        el transporte no se usan aquí.
         """
-        if mensaje_id not in self.mensajes_recibidos:
-            self.mensajes_recibidos.add(mensaje_id)
-            print(f"Mensaje recibido de {origen}: {contenido}")
+        if not self.mensajes_recibidos.visto(mensaje_id):
+            log.debug("Mensaje recibido de %s: %s", origen, contenido)
             
             if 'tabla_rutas' in contenido:
-                self.actualizar_tabla(origen, contenido['tabla_rutas'])
+                self.actualizar_tabla(origen, contenido['tabla_rutas'], contenido.get('completa', True),
+                                      contenido.get('version'))
+            elif 'sincronizar' in contenido:
+                self.sincronizar(origen, contenido)
             else:
-                print("Mensaje no contiene tabla de rutas, ignorado.")
+                log.debug("Mensaje de %s no contiene tabla de rutas, ignorado.", origen)
         else:
-            print(f"Mensaje {mensaje_id} ya procesado, ignorando.")
+            log.debug("Mensaje %s ya procesado, ignorando.", mensaje_id)
 
 # Ejemplo de cómo configurar un nodo específico
 if __name__ == "__main__":
+    from ConnectionXMPP import configurar_logging
+    configurar_logging()
+
     # JID (Jabber ID) y contraseña del nodo
     nodo_id = "ore21970-te@alumchat.lol"
     password = "pruebas"
@@ -1,48 +1,157 @@
 import asyncio
+import logging
 import sys
 
 # Solución para problemas con aiodns en Windows
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-from ConnectionXMPP import ClienteXMPP
+from CacheMensajes import CacheDuplicados
+from Metricas import observar_cache
+from SondeoEnlaces import SondeoEnlaces
+
+log = logging.getLogger(__name__)
+
+MODOS_DIFUSION = ('inundacion', 'arbol', 'rpf')
+
+def arbol_bfs(topologia, raiz):
+    """
+    Árbol BFS de la topología ({jid: [vecinos]}) con raíz en `raiz`, como
+    diccionario {nodo: padre}. Los vecinos se recorren ordenados para que todos
+    los nodos calculen exactamente el mismo árbol.
+    """
+    padres = {raiz: None}
+    frontera = [raiz]
+    while frontera:
+        siguiente = []
+        for nodo in frontera:
+            for vecino in sorted(topologia.get(nodo, ())):
+                if vecino not in padres:
+                    padres[vecino] = nodo
+                    siguiente.append(vecino)
+        frontera = siguiente
+    return padres
+
+def topologia_por_jid(config):
+    """
+    Traduce el topo_map de un NetConfig (ids de nodo) a JIDs, con enlaces en ambos sentidos.
+    """
+    return {
+        config.node_map[nodo]: {config.node_map[vecino] for vecino in vecinos}
+        for nodo, vecinos in config.undirected_links().items()
+    }
 
 class DifusionAlgoritmo:
-    def __init__(self, nodo_id, password):
-        """
-        Inicializa el nodo con su JID y contraseña.
+    def __init__(self, nodo_id, password, transporte=None, cache_duplicados=None,
+                 modo='inundacion', topologia=None, ttl=16, sondeo=None):
         """
+        Inicializa el nodo con su JID y contraseña. Si no se indica un transporte
+        se usa una conexión XMPP propia; cache_duplicados permite ajustar la
+        capacidad, el TTL o el modo de la cache de mensajes vistos.
+
+        modo elige cómo se reenvía cada difusión:
+        - 'inundacion': a todos los vecinos excepto al que lo envió.
+        - 'arbol': solo por los enlaces de un árbol de expansión compartido.
+        - 'rpf': por el árbol de caminos más cortos del nodo que originó el
+          mensaje; las copias que no llegan por el camino inverso se descartan.
+        Los dos últimos necesitan la topología ({jid: [vecinos]}, ver
+        topologia_por_jid). ttl es el máximo de saltos de cada mensaje.
+
+        La difusión no usa costos, pero si se pasan opciones de sondeo (ver
+        SondeoEnlaces; {} para los valores por defecto) se mide el RTT de cada
+        enlace en milisegundos y queda en costos_enlace.
+        """
+        if modo not in MODOS_DIFUSION:
+            raise ValueError(f"Modo de difusión desconocido: {modo}")
+        if modo != 'inundacion' and topologia is None:
+            raise ValueError(f"El modo '{modo}' necesita la topología de la red.")
+
         self.nodo_id = nodo_id
+        self.modo = modo
+        self.ttl = ttl
+        self.topologia = topologia
+        self.vecinos_arbol = self._calcular_vecinos_arbol() if modo == 'arbol' else None
+        self.arboles_origen = {}  # originador -> {nodo: padre}, para el modo rpf
         self.red_vecinos = set()  # Usaremos un set para almacenar dinámicamente los vecinos
-        self.mensajes_recibidos = set()
-        self.cliente_xmpp = ClienteXMPP(nodo_id, password, self)
+        self.mensajes_recibidos = cache_duplicados if cache_duplicados is not None else CacheDuplicados()
+        observar_cache(nodo_id, self.mensajes_recibidos)
+        self.mensajes_originados = 0
+        self.al_entregar = None  # Callback opcional (origen, contenido) para mensajes nuevos
+        self.costos_enlace = {}  # vecino -> RTT suavizado en ms (solo con sondeo)
+        self.sondeo = None
+        if sondeo is not None:
+            self.sondeo = SondeoEnlaces.from_config(self.enviar_echo, self.costos_enlace.__setitem__, sondeo,
+                                                    costo=lambda rtt: rtt * 1000)
+        if transporte is None:
+            from ConnectionXMPP import ClienteXMPP
+            transporte = ClienteXMPP(nodo_id, password, self)
+        else:
+            transporte.algoritmo = self
+        self.transporte = transporte
 
     def conectar(self):
         """
         Inicia la conexión XMPP.
         """
-        print("Intentando conectar al servidor XMPP...")
-        self.cliente_xmpp.connect()
-        print("Conexión iniciada, procesando...")
-        self.cliente_xmpp.process(forever=False)
-        print("Conexión procesada.")
+        log.info("Intentando conectar al servidor XMPP...")
+        self.transporte.connect()
+        self.transporte.process(forever=False)
 
     def agregar_vecino(self, vecino_jid):
         """
         Agrega un vecino a la lista de vecinos del nodo.
         """
         self.red_vecinos.add(vecino_jid)
-        print(f"Vecino agregado: {vecino_jid}")
+        log.info("Vecino agregado: %s", vecino_jid)
+        if self.sondeo is not None:
+            self.sondeo.agregar_vecino(vecino_jid)
+
+    def _calcular_vecinos_arbol(self):
+        # El árbol compartido se enraíza en el menor JID para que todos coincidan
+        padres = arbol_bfs(self.topologia, min(self.topologia))
+        vecinos = {hijo for hijo, padre in padres.items() if padre == self.nodo_id}
+        if padres.get(self.nodo_id) is not None:
+            vecinos.add(padres[self.nodo_id])
+        return vecinos
 
-    def propagar_mensaje(self, origen, mensaje_id, contenido):
+    def _arbol_de(self, originador):
+        padres = self.arboles_origen.get(originador)
+        if padres is None:
+            padres = arbol_bfs(self.topologia, originador)
+            self.arboles_origen[originador] = padres
+        return padres
+
+    def destinos_reenvio(self, origen, originador):
+        """
+        Vecinos a los que se reenvía una difusión de `originador` recibida desde `origen`.
         """
-        Envía el mensaje a todos los vecinos del nodo actual, excepto al origen.
+        if self.modo == 'arbol':
+            return [vecino for vecino in self.vecinos_arbol if vecino != origen]
+        if self.modo == 'rpf':
+            padres = self._arbol_de(originador)
+            return [vecino for vecino in self.topologia.get(self.nodo_id, ())
+                    if padres.get(vecino) == self.nodo_id]
+        return [vecino for vecino in self.red_vecinos if vecino != origen]
+
+    def difundir(self, contenido):
         """
-        for vecino in self.red_vecinos:
-            if vecino != origen:
-                self.enviar_a_vecino(vecino, mensaje_id, contenido)
+        Origina un mensaje nuevo y lo envía a los vecinos según el modo de difusión.
+        """
+        self.mensajes_originados += 1
+        mensaje_id = f"{self.nodo_id}-{self.mensajes_originados}"
+        self.mensajes_recibidos.add(mensaje_id)
+        self.propagar_mensaje(self.nodo_id, mensaje_id, contenido)
+        return mensaje_id
+
+    def propagar_mensaje(self, origen, mensaje_id, contenido, saltos=0, originador=None):
+        """
+        Envía el mensaje a los vecinos que correspondan, excepto al origen.
+        """
+        originador = originador or origen
+        for vecino in self.destinos_reenvio(origen, originador):
+            self.enviar_a_vecino(vecino, mensaje_id, contenido, saltos + 1, originador)
     
-    def enviar_a_vecino(self, vecino, mensaje_id, contenido):
+    def enviar_a_vecino(self, vecino, mensaje_id, contenido, saltos=1, originador=None):
         """
         Lógica para enviar un mensaje a un vecino específico.
         Se envía el mensaje utilizando el cliente XMPP.
@@ -51,23 +160,37 @@ class DifusionAlgoritmo:
             "type": "send_routing",
             "to": vecino,
             "from": self.nodo_id,
+            "origin": originador or self.nodo_id,
+            "id": mensaje_id,
             "data": contenido,
-            "hops": len(self.red_vecinos)
+            "hops": saltos,
+            "ttl": self.ttl
         }
-        self.cliente_xmpp.enviar_mensaje(vecino, mensaje)
+        self.transporte.enviar_mensaje(vecino, mensaje)
 
-    def recibir_mensaje(self, origen, mensaje_id, contenido):
+    def recibir_mensaje(self, origen, mensaje_id, contenido, saltos=0, ttl=None, originador=None):
         """
-        Procesa un mensaje recibido, reenviándolo si no se ha visto antes.
+        Procesa un mensaje recibido, reenviándolo si no se ha visto antes y le
+        quedan saltos.
         """
-        if mensaje_id not in self.mensajes_recibidos:
-            self.mensajes_recibidos.add(mensaje_id)
-            print(f"Mensaje recibido de {origen}: {contenido}")
-            self.propagar_mensaje(origen, mensaje_id, contenido)
+        originador = originador or origen
+        if self.modo == 'rpf' and self._arbol_de(originador).get(self.nodo_id) != origen:
+            log.debug("Mensaje %s no llegó por el camino inverso a %s, descartado.", mensaje_id, originador)
+            return
+
+        if not self.mensajes_recibidos.visto(mensaje_id):
+            log.debug("Mensaje recibido de %s: %s", origen, contenido)
+            if self.al_entregar is not None:
+                self.al_entregar(origen, contenido)
+            limite = self.ttl if ttl is None else min(ttl, self.ttl)
+            if saltos < limite:
+                self.propagar_mensaje(origen, mensaje_id, contenido, saltos, originador)
+            else:
+                log.debug("Mensaje %s alcanzó el límite de %s saltos.", mensaje_id, limite)
         else:
-            print(f"Mensaje {mensaje_id} ya procesado, ignorando.")
+            log.debug("Mensaje %s ya procesado, ignorando.", mensaje_id)
     
-    def enviar_echo(self, vecino):
+    def enviar_echo(self, vecino, secuencia=None):
         """
         Envía un mensaje de tipo echo para medir tiempos de respuesta.
         """
@@ -75,18 +198,25 @@ class DifusionAlgoritmo:
             "type": "echo",
             "from": self.nodo_id,
         }
-        self.cliente_xmpp.enviar_mensaje(vecino, mensaje)
+        if secuencia is not None:
+            mensaje["seq"] = secuencia
+        self.transporte.enviar_mensaje(vecino, mensaje)
     
     def recibir_echo_response(self, mensaje):
         """
-        Procesa el mensaje echo_response, calculando el tiempo de respuesta.
+        Procesa el mensaje echo_response; el sondeo calcula el tiempo de respuesta.
         """
-        # Lógica para calcular el tiempo de recepción y envío
-        tiempo_recepcion = 0  # Esto debería ser calculado en base a timestamps reales
-        print(f"Echo response recibido. Tiempo de respuesta: {tiempo_recepcion}ms")
+        if self.sondeo is None:
+            return
+        rtt = self.sondeo.recibir_respuesta(mensaje.get('from'), mensaje.get('seq'))
+        if rtt is not None:
+            log.debug("Echo response de %s. Tiempo de respuesta: %.3fms", mensaje.get('from'), rtt * 1000)
 
 # Ejemplo de cómo configurar un nodo específico
 if __name__ == "__main__":
+    from ConnectionXMPP import configurar_logging
+    configurar_logging()
+
     # JID (Jabber ID) y contraseña del nodo
     nodo_id = "ore21970-te@alumchat.lol"
     password = "pruebas"
@@ -0,0 +1,308 @@
+import heapq
+
+from Dijkstra import dijkstra_tree, update_tree, equal_cost_first_hops, k_shortest_paths
+
+# Modos de múltiples caminos: None (un solo salto), 'ecmp' o 'k-shortest'
+MULTIPATH_MODES = (None, 'ecmp', 'k-shortest')
+
+
+class ForwardingTable:
+    """
+    Tabla de reenvío (FIB) de un nodo: destino -> (siguiente salto, costo).
+
+    Se construye a partir del árbol de caminos más cortos con predecesores, y se
+    mantiene de forma incremental cuando cambia la tabla de enlaces de un solo nodo,
+    de modo que reenviar un paquete es una sola consulta a un diccionario. En la
+    actualización incremental solo se recalculan las entradas de los nodos cuyo
+    camino cambió (y, con 'ecmp', las de los nodos a los que eso afecta).
+
+    Con multipath='ecmp' se guardan además todos los primeros saltos de costo
+    mínimo de cada destino (next_hops). Con 'k-shortest' se agregan los primeros
+    saltos de los `k_paths` caminos sin ciclos más cortos cuyo costo no supere
+    `max_stretch` veces el mínimo; se calculan al pedirlos y solo se aceptan
+    vecinos que estén más cerca del destino que este nodo, así ningún paquete
+    puede volver a pasar por aquí aunque cada nodo elija un camino distinto.
+
+    Con loop_free_alternates=True se precalculan además, por destino, los
+    vecinos de respaldo sin ciclos (LFA, RFC 5286): un vecino N que no es primer
+    salto sirve si dist(N, D) < dist(N, fuente) + dist(fuente, D), es decir, si
+    su propio camino hacia D no vuelve a pasar por aquí. Cuestan un SPF por
+    vecino, así que cada SPF solo los invalida y compute_backups() los recalcula
+    cuando conviene (a más tardar, al marcar un vecino caído). Los vecinos
+    marcados con mark_down() se saltean en next_hop() y next_hops(), que pasan
+    al respaldo sin esperar al SPF siguiente.
+    """
+
+    def __init__(self, source, multipath=None, k_paths=3, max_stretch=1.5, loop_free_alternates=False):
+        if multipath not in MULTIPATH_MODES:
+            raise ValueError(f"Unknown multipath mode: {multipath}")
+        self.source = source
+        self.multipath = multipath
+        self.k_paths = k_paths
+        self.max_stretch = max_stretch
+        self.loop_free_alternates = loop_free_alternates
+        self.graph = {}
+        self.predecessors = {}  # nodo -> nodos con un enlace hacia él en `graph`
+        self.distances = {source: 0}
+        self.previous = {source: None}
+        self.entries = {source: (source, 0)}
+        self.hops = {source: (source,)}  # destino -> primeros saltos de costo mínimo
+        self.alternates = {}  # destino -> primeros saltos de 'k-shortest' ya calculados
+        self.neighbor_distances = {}  # vecino -> distancias desde ese vecino
+        self.backups = {}  # destino -> vecinos LFA, del más barato al más caro (None: sin calcular)
+        self.down = set()  # Vecinos caídos que todavía pueden figurar en el árbol
+
+    def rebuild(self, graph):
+        """
+        Recalcula todo el árbol desde cero (SPF completo).
+        """
+        self.graph = graph
+        self.distances, self.previous = dijkstra_tree(graph, self.source)
+        self._refresh_entries()
+        self._index_predecessors()
+
+    def update_node(self, graph, node_id, old_links):
+        """
+        Aplica el cambio de la tabla de enlaces de `node_id`; `graph` ya debe
+        contener la tabla nueva y `old_links` es la anterior ({} si es un nodo nuevo).
+        """
+        self.graph = graph
+        new_links = graph.get(node_id, {})
+        for neighbor in old_links:
+            if neighbor not in new_links:
+                self.predecessors.get(neighbor, set()).discard(node_id)
+        for neighbor in new_links:
+            self.predecessors.setdefault(neighbor, set()).add(node_id)
+        changed = update_tree(graph, self.distances, self.previous, node_id, old_links)
+        self._refresh_changed(changed, set(old_links) | set(new_links))
+
+    def restore(self, graph, distances, previous):
+        """
+        Retoma un árbol ya calculado (por ejemplo, de una copia en disco) sin
+        correr el SPF; si no es coherente con la fuente o con las aristas de
+        `graph` se recalcula.
+        """
+        consistent = (previous.get(self.source, self.source) is None
+                      and set(distances) == set(previous)
+                      and all(parent is None or _tree_edge_holds(graph, distances, parent, node)
+                              for node, parent in previous.items()))
+        if not consistent:
+            self.rebuild(graph)
+            return
+        self.graph = graph
+        self.distances = dict(distances)
+        self.previous = dict(previous)
+        self._refresh_entries()
+        self._index_predecessors()
+
+    def next_hop(self, destination):
+        entry = self.entries.get(destination)
+        if entry is None:
+            return None
+        if entry[0] in self.down:
+            hops = self.next_hops(destination)
+            return hops[0] if hops else None
+        return entry[0]
+
+    def next_hops(self, destination):
+        """
+        Primeros saltos entre los que se puede repartir el tráfico hacia
+        `destination` (vacío si no hay ruta); el primero es siempre next_hop().
+        Si todos están caídos se devuelve el mejor respaldo LFA que siga vivo;
+        los respaldos no se calculan aquí (es el camino de reenvío), así que
+        si todavía no hay ninguno calculado el destino queda sin salto.
+        """
+        entry = self.entries.get(destination)
+        if entry is None:
+            return ()
+        if self.multipath == 'k-shortest':
+            hops = self.alternates.get(destination)
+            if hops is None:
+                hops = self.alternates[destination] = self._k_shortest_hops(destination, entry)
+        else:
+            hops = self.hops.get(destination, (entry[0],))
+        if not self.down:
+            return hops
+        alive = tuple(hop for hop in hops if hop not in self.down)
+        if alive:
+            return alive
+        for backup in (self.backups or {}).get(destination, ()):
+            if backup not in self.down:
+                return (backup,)
+        return ()
+
+    def mark_down(self, neighbor):
+        """
+        Deja de usar a `neighbor` como salto hasta mark_up(); el árbol no cambia,
+        así que el reenvío pasa a los respaldos de inmediato.
+        """
+        self.down.add(neighbor)
+        self.compute_backups()
+
+    def mark_up(self, neighbor):
+        self.down.discard(neighbor)
+
+    def distance_from(self, neighbor, destination):
+        """
+        Distancia de `neighbor` a `destination` según el mismo grafo; el árbol de
+        cada vecino se calcula una vez por SPF.
+        """
+        distances = self.neighbor_distances.get(neighbor)
+        if distances is None:
+            distances = self.neighbor_distances[neighbor] = dijkstra_tree(self.graph, neighbor)[0]
+        return distances.get(destination, float('inf'))
+
+    def cost(self, destination):
+        entry = self.entries.get(destination)
+        return entry[1] if entry else float('inf')
+
+    def _refresh_entries(self):
+        # El primer salto de cada nodo es el de su padre, salvo los hijos directos
+        # de la fuente; se memoriza para recorrer cada cadena una sola vez.
+        first_hops = {self.source: self.source}
+        for node in self.previous:
+            path = []
+            current = node
+            while current not in first_hops:
+                path.append(current)
+                current = self.previous[current]
+            hop = first_hops[current]
+            for current in reversed(path):
+                if hop == self.source:
+                    hop = current
+                first_hops[current] = hop
+
+        self.entries = {
+            node: (hop, self.distances[node]) for node, hop in first_hops.items()
+        }
+        self.hops = {}
+        if self.multipath is not None:
+            # El salto del árbol va primero para que next_hops()[0] == next_hop()
+            equal_cost = equal_cost_first_hops(self.graph, self.source, self.distances)
+            for node, (hop, _) in self.entries.items():
+                others = equal_cost.get(node, ())
+                self.hops[node] = (hop,) + tuple(other for other in others if other != hop)
+            self.hops[self.source] = (self.source,)
+        self._clear_caches()
+
+    def _refresh_changed(self, changed, touched):
+        """
+        Actualiza solo las entradas de `changed` (los nodos cuyo camino cambió
+        según update_tree) y, con multipath, los primeros saltos de costo mínimo
+        de esos nodos, de `touched` (destinos de los enlaces que cambiaron) y de
+        los que heredan de ellos.
+        """
+        resolved = {}
+        for node in changed:
+            if node not in self.previous:
+                self.entries.pop(node, None)
+                continue
+            # Se sube hasta un ancestro cuyo camino no cambió
+            path = []
+            current = node
+            while current in changed and current not in resolved:
+                path.append(current)
+                current = self.previous[current]
+            hop = resolved[current] if current in resolved else self.entries[current][0]
+            for current in reversed(path):
+                if hop == self.source:
+                    hop = current
+                resolved[current] = hop
+                self.entries[current] = (hop, self.distances[current])
+
+        if self.multipath is not None:
+            self._refresh_hops(changed, changed | touched)
+        self._clear_caches()
+
+    def _refresh_hops(self, changed, seeds, tolerance=1e-9):
+        # Mismo criterio que equal_cost_first_hops, recorriendo en orden de
+        # distancia solo los nodos cuyos predecesores de costo mínimo pudieron
+        # cambiar: las semillas, los sucesores de nodos cuya distancia cambió y
+        # los que heredan primeros saltos que cambiaron
+        seeds = set(seeds)
+        for node in changed:
+            seeds.update(self.graph.get(node, ()))
+        queue = []
+        for node in seeds:
+            if node in self.distances:
+                if node != self.source:
+                    queue.append((self.distances[node], node))
+            else:
+                self.hops.pop(node, None)
+        queued = {node for _, node in queue}
+        heapq.heapify(queue)
+
+        while queue:
+            distance, node = heapq.heappop(queue)
+            hops = set()
+            for predecessor in self.predecessors.get(node, ()):
+                predecessor_distance = self.distances.get(predecessor)
+                if predecessor_distance is None or predecessor_distance >= distance:
+                    continue
+                weight = self.graph[predecessor][node]
+                if abs(predecessor_distance + weight - distance) <= tolerance * max(1.0, distance):
+                    hops.update((node,) if predecessor == self.source else self.hops[predecessor])
+            hop = self.entries[node][0]
+            node_hops = (hop,) + tuple(other for other in sorted(hops) if other != hop)
+            if node_hops == self.hops.get(node):
+                continue
+            self.hops[node] = node_hops
+            for successor in self.graph.get(node, {}):
+                if successor not in queued and self.distances.get(successor, -1) > distance:
+                    queued.add(successor)
+                    heapq.heappush(queue, (self.distances[successor], successor))
+
+    def _index_predecessors(self):
+        self.predecessors = {}
+        for node, links in self.graph.items():
+            for neighbor in links:
+                self.predecessors.setdefault(neighbor, set()).add(node)
+
+    def _clear_caches(self):
+        self.alternates = {}
+        self.neighbor_distances = {}
+        self.backups = None if self.loop_free_alternates else {}
+
+    def compute_backups(self):
+        """
+        Calcula los respaldos LFA del árbol actual si todavía no están.
+        """
+        if self.backups is not None:
+            return
+        # Un SPF por vecino directo; sus árboles quedan en neighbor_distances
+        links = self.graph.get(self.source, {})
+        backups = {}
+        for destination, (hop, best) in self.entries.items():
+            if destination == self.source:
+                continue
+            primaries = self.hops.get(destination, (hop,))
+            candidates = []
+            for neighbor, cost in links.items():
+                if neighbor in primaries:
+                    continue
+                distance = self.distance_from(neighbor, destination)
+                if distance < self.distance_from(neighbor, self.source) + best:
+                    candidates.append((cost + distance, neighbor))
+            if candidates:
+                backups[destination] = tuple(neighbor for _, neighbor in sorted(candidates))
+        self.backups = backups
+
+    def _k_shortest_hops(self, destination, entry):
+        hop, best = entry
+        hops = list(self.hops.get(destination, (hop,)))
+        if destination == self.source:
+            return tuple(hops)
+        for path_cost, path in k_shortest_paths(self.graph, self.source, destination, self.k_paths):
+            candidate = path[1]
+            if path_cost > best * self.max_stretch or candidate in hops:
+                continue
+            if self.distance_from(candidate, destination) < best:
+                hops.append(candidate)
+        return tuple(hops)
+
+
+def _tree_edge_holds(graph, distances, parent, node):
+    # La arista del árbol sigue en el grafo y explica la distancia guardada
+    weight = graph.get(parent, {}).get(node)
+    return (weight is not None and parent in distances
+            and abs(distances[parent] + weight - distances[node]) <= 1e-9)
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import zlib
+
+log = logging.getLogger(__name__)
+
+# Versión del formato de las copias; cambiarla hace que se ignoren las anteriores
+FORMATO = 1
+
+
+class Instantaneas:
+    """
+    Copias del estado de un nodo en disco para arrancar en caliente.
+
+    obtener_estado() devuelve un diccionario serializable en JSON y el algoritmo
+    llama a marcar() cada vez que el estado cambia. Mientras haya cambios sin
+    guardar se escribe una copia a lo sumo cada `intervalo` segundos; guardar()
+    la escribe de inmediato.
+
+    La copia se escribe en un archivo temporal que se sincroniza con el disco y
+    reemplaza a la anterior de forma atómica, así que un corte a mitad de camino
+    deja la copia anterior entera. La primera línea es una cabecera con el nodo
+    y la suma de verificación del estado, que va en la segunda.
+    """
+
+    def __init__(self, ruta, nodo, obtener_estado, intervalo=30.0, reloj=time.time):
+        self.ruta = ruta
+        self.nodo = nodo
+        self.obtener_estado = obtener_estado
+        self.intervalo = intervalo
+        self.reloj = reloj
+        self.pendiente = False  # Hay cambios sin guardar
+        self.guardadas = 0
+        self._temporizador = None
+
+    def cargar(self):
+        """
+        Estado de la última copia, o None si no existe, está dañada o es de otro nodo.
+        """
+        try:
+            with open(self.ruta, encoding='utf-8') as archivo:
+                cabecera = json.loads(archivo.readline())
+                texto = archivo.readline().rstrip('\n')
+            if not isinstance(cabecera, dict):
+                return None
+            if cabecera.get('formato') != FORMATO or cabecera.get('nodo') != self.nodo:
+                return None
+            if zlib.crc32(texto.encode('utf-8')) != cabecera.get('crc'):
+                log.warning("La copia de estado %s está dañada, se ignora", self.ruta)
+                return None
+            return json.loads(texto)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            log.warning("No se pudo leer la copia de estado %s: %s", self.ruta, error)
+            return None
+
+    def marcar(self):
+        """
+        Registra un cambio del estado y programa la próxima copia si hace falta.
+        """
+        self.pendiente = True
+        if self._temporizador is not None or self.intervalo is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sin event loop solo se guarda al llamar a guardar()
+        self._temporizador = loop.call_later(self.intervalo, self._guardar_programado)
+
+    def guardar(self):
+        texto = json.dumps(self.obtener_estado(), separators=(',', ':'))
+        cabecera = {
+            'formato': FORMATO,
+            'nodo': self.nodo,
+            'guardado': self.reloj(),
+            'crc': zlib.crc32(texto.encode('utf-8')),
+        }
+        temporal = f"{self.ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write(json.dumps(cabecera) + "\n" + texto + "\n")
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, self.ruta)
+        self.pendiente = False
+        self.guardadas += 1
+
+    def detener(self):
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+
+    def _guardar_programado(self):
+        self._temporizador = None
+        if not self.pendiente:
+            return
+        try:
+            self.guardar()
+        except OSError as error:
+            # Se reintenta en el próximo intervalo sin detener al nodo
+            log.warning("No se pudo guardar la copia de estado %s: %s", self.ruta, error)
+            self.marcar()
@@ -1,32 +1,54 @@
-import asyncio
-import json
 import time
 import logging
+import zlib
 
-from slixmpp import ClientXMPP
 from NetConfig import NetConfig
-from Dijkstra import dijkstra
-from aioconsole import ainput
-from json import JSONDecodeError
-
-
-class RoutingLSR(ClientXMPP):
-    def __init__(self, jid, password, config: NetConfig):
-        super().__init__(jid, password)
-        print(f"LSR activo para el usuario: {jid}\n")
-        print("INFO: Asegúrese de que la topología de red esté completa antes de enviar mensajes\n")
-
+from ForwardingTable import ForwardingTable
+from Throttle import ThrottleTimer
+from SondeoEnlaces import SondeoEnlaces
+from Instantaneas import Instantaneas
+from CodecMensajes import ErrorCodec
+from PlanificadorEnvio import DATOS, CuerpoDiferido
+from Trazas import nueva_traza, llegada, salida
+from Metricas import (MENSAJES_RECIBIDOS, MENSAJES_ENVIADOS, ERRORES_DECODIFICACION, DURACION_MANEJO,
+                      DURACION_SPF)
+
+
+class RoutingLSR:
+    def __init__(self, jid, password, config: NetConfig, transport=None, interactive=True,
+                 spf_throttle=None, lsa_throttle=(0.1, 1.0, 10.0), probe=None, multipath='ecmp',
+                 k_paths=3, max_stretch=1.5, snapshot_path=None, snapshot_interval=30.0,
+                 trace=False, fast_reroute=True, lfa_throttle=(1.0, 5.0, 30.0)):
         self.log = logging.getLogger(__name__)
+        self.log.info("LSR activo para el usuario: %s", jid)
+        self.log.info("Asegúrese de que la topología de red esté completa antes de enviar mensajes")
 
         self.user_jid = jid
-        self.user_id = config.jid_node_map[jid]
+        self.user_id = config.jid_map[jid]
         self.neighbors = config.neighbors_of(self.user_id)
+        self.interactive = interactive
+
+        # Sin transporte explícito se abre una conexión XMPP propia
+        if transport is None:
+            from ConnectionXMPP import ClienteXMPP
+            transport = ClienteXMPP(jid, password, self)
+        else:
+            transport.algoritmo = self
+        self.transport = transport
 
-        self._init_event_handlers()
         self.messages_sent = set()
+        self.on_message = None  # Callback opcional (sender_id, data) al entregar un paquete
+        # Con trace=True los paquetes originados aquí registran cada salto (ver
+        # Trazas); el destino entrega la traza completa a on_trace(trace)
+        self.trace = trace
+        self.on_trace = None
+        self.arrival = None  # Hora de llegada del mensaje que se está procesando
         self.network_config = config
 
-        self.echo_times = {}
+        # Sondeo periódico de los vecinos (opciones de SondeoEnlaces); el costo de
+        # cada enlace es su RTT suavizado en segundos y solo cambia con histéresis
+        self.prober = SondeoEnlaces.from_config(self._send_echo, self._link_cost_changed, probe,
+                                                al_perder_vecino=self._probe_lost)
         self.weight_tables = {
             self.user_id: {
                 'table': {neighbor_id: 10_000.0 for neighbor_id in self.neighbors},
@@ -34,10 +56,56 @@ class RoutingLSR(ClientXMPP):
             }
         }
 
-        self.shortest_distances = None
-        self.shortest_paths = None
+        # Grafo de enlaces compartido con la FIB; cada entrada apunta a la tabla
+        # de weight_tables, así que no hace falta reconstruirlo en cada LSA
+        self.link_graph = {self.user_id: self.weight_tables[self.user_id]['table']}
+        # Con varios primeros saltos por destino (ver ForwardingTable) cada flujo
+        # se asigna a uno por hash, así sus paquetes no se reordenan. Con
+        # fast_reroute se precalculan respaldos sin ciclos (tras cada ráfaga de
+        # SPF, con lfa_timer): al caer un vecino el reenvío pasa a ellos mientras
+        # el LSA y el SPF siguen su curso
+        self.forwarding = ForwardingTable(self.user_id, multipath, k_paths, max_stretch,
+                                          loop_free_alternates=fast_reroute)
+        self.flow_seed = zlib.crc32(self.user_id.encode())
+        self.forwarding.rebuild(self.link_graph)
+
+        # Temporizadores (initial_delay, hold_time, max_wait) que agrupan ráfagas:
+        # varias mediciones propias salen en un solo LSA y varios LSA en un solo SPF
+        self.pending_links = {}  # Costos propios que aún no se anunciaron (None: enlace caído)
+        self.congested = False  # Contrapresión del planificador de envío
+        self.pending_spf = {}  # node_id -> enlaces antes del primer cambio sin procesar (None: desconocidos)
+        self.lsa_timer = ThrottleTimer.from_config(self._originate_lsa, lsa_throttle)
+        self.spf_timer = ThrottleTimer.from_config(self._run_spf, spf_throttle)
+        self.lfa_timer = ThrottleTimer.from_config(self._compute_backups, lfa_throttle)
+
+        # Manejador de cada tipo de mensaje (sender_jid, body)
+        self.handlers = {
+            'echo': self._handle_echo,
+            'echo_response': self._handle_echo_response,
+            'weights': self._handle_weights,
+            'send_routing': self._handle_send_routing,
+            'message': self._handle_message,
+            'lsdb_summary': self._handle_lsdb_summary,
+        }
+
+        # Arranque en caliente: la LSDB y la FIB se guardan periódicamente y, si
+        # hay una copia, se retoman de ella; al iniciar, las versiones se
+        # reconcilian con los vecinos (ver _handle_lsdb_summary)
+        self.snapshots = None
+        self.restored = False
+        if snapshot_path is not None:
+            self.snapshots = Instantaneas(snapshot_path, self.user_id, self._snapshot_state, snapshot_interval)
+            state = self.snapshots.cargar()
+            if state is not None:
+                self._restore(state)
+
+    def conectar(self):
+        self.transport.connect()
+        self.transport.process(forever=False)
 
     async def prompt_send_message(self):
+        from aioconsole import ainput
+
         while True:
             destination = await ainput("Ingrese el nodo de destino: ")
             message_data = await ainput("Ingrese el mensaje: ")
@@ -51,133 +119,399 @@ class RoutingLSR(ClientXMPP):
             hops = 0
 
             if destination not in self.neighbors:
-                message_string = f'{{\"type\": \"send_routing\", \"from\": \"{sender_id}\", \"to\": \"{destination}\", \"data\": \"{message_data}\" , \"hops\": \"{hops + 1}\"}}'
-                self.send_message(mto=receiver_jid, mbody=message_string, mtype='chat')
+                self.transport.enviar_mensaje(receiver_jid, {
+                    "type": "send_routing",
+                    "from": sender_id,
+                    "to": destination,
+                    "data": message_data,
+                    "hops": hops + 1
+                })
                 return
 
-            message_string = f'{{\"type\": \"message\", \"from\": \"{sender_id}\", \"data\": \"{message_data}\" }}'
-            self.send_message(mto=receiver_jid, mbody=message_string, mtype='chat')
-
-    def _send_echo(self):
-        echo_message = '{\"type\": \"echo\"}'
+            self.transport.enviar_mensaje(receiver_jid, {"type": "message", "from": sender_id, "data": message_data})
+
+    def _send_echo(self, neighbor_jid, seq):
+        self.transport.enviar_mensaje(neighbor_jid, {"type": "echo", "seq": seq})
+
+    def _link_cost_changed(self, neighbor_jid, cost):
+        self.pending_links[self.network_config.jid_map[neighbor_jid]] = cost
+        self.lsa_timer.schedule()
+
+    def _probe_lost(self, neighbor_jid):
+        self.log.warning("El vecino %s no responde a los echos", neighbor_jid)
+        self._neighbor_down(neighbor_jid)
+
+    def agregar_vecino(self, neighbor_jid):
+        # Un vecino que vuelve a estar en línea se sondea otra vez; el enlace se
+        # restablece con el primer echo que conteste
+        neighbor_id = self.network_config.jid_map.get(neighbor_jid)
+        if neighbor_id in self.forwarding.down:
+            self.prober.agregar_vecino(neighbor_jid)
+
+    def eliminar_vecino(self, neighbor_jid):
+        self.prober.quitar_vecino(neighbor_jid)
+        self._neighbor_down(neighbor_jid)
+
+    def _neighbor_down(self, neighbor_jid):
+        """
+        Da por caído el enlace con un vecino: el reenvío lo saltea desde ya
+        (ver ForwardingTable.mark_down) y el enlace sale del próximo LSA.
+        """
+        neighbor_id = self.network_config.jid_map.get(neighbor_jid)
+        if neighbor_id not in self.neighbors or neighbor_id in self.forwarding.down:
+            return
+        self.log.info("%s da por caído el enlace con %s", self.user_jid, neighbor_id)
+        self.forwarding.mark_down(neighbor_id)
+        self.pending_links[neighbor_id] = None
+        self.lsa_timer.schedule()
+
+    def _neighbor_up(self, neighbor_jid):
+        neighbor_id = self.network_config.jid_map[neighbor_jid]
+        self.log.info("%s restableció el enlace con %s", self.user_jid, neighbor_id)
+        self.forwarding.mark_up(neighbor_id)
+        self.pending_links[neighbor_id] = self.prober.costo_de(neighbor_jid)
+        self.lsa_timer.schedule()
+
+    async def iniciar(self):
+        if self.restored:
+            # Tras un reinicio solo se intercambian los LSA en que alguien está atrasado
+            summary = self._lsdb_summary(reply=False)
+            for neighbor_id in self.neighbors:
+                self.transport.despachar(self.network_config.node_map[neighbor_id], summary)
+            MENSAJES_ENVIADOS.inc(self.user_jid, 'lsdb_summary', n=len(self.neighbors))
         for neighbor_id in self.neighbors:
-            neighbor_jid = self.network_config.node_map[neighbor_id]
-            self.send_message(mto=neighbor_jid, mbody=echo_message, mtype='chat')
-            self.echo_times[neighbor_jid] = time.time()
+            self.prober.agregar_vecino(self.network_config.node_map[neighbor_id])
+        if self.interactive:
+            await self.prompt_send_message()
+
+    def recibir_cuerpo(self, sender_jid, msg_id, body):
+        start = time.perf_counter()
+        self.arrival = time.time()
+        # Camino rápido: un paquete de datos en tránsito se reenvía leyendo solo
+        # su cabecera; la carga sale tal como llegó
+        header = self.transport.codec.leer_cabecera(body)
+        if header is not None and header[0]['type'] == 'send_routing' and header[0].get('to') != self.user_id:
+            MENSAJES_RECIBIDOS.inc(self.user_jid, 'send_routing')
+            self.log.debug("%s reenvía de %s: %s", self.user_jid, sender_jid, header[0])
+            try:
+                self._forward(*header)
+            except (KeyError, TypeError, ValueError):
+                self.log.warning("El mensaje de %s no está correctamente formateado: %s", sender_jid, header[0])
+            finally:
+                DURACION_MANEJO.observar(time.perf_counter() - start, self.user_jid, 'send_routing')
+            return
 
-    def _init_event_handlers(self):
-        self.add_event_handler('session_start', self.start_session)
-        self.add_event_handler('message', self.process_message)
+        try:
+            body = self.transport.codec.decodificar(body)
+        except ErrorCodec as error:
+            ERRORES_DECODIFICACION.inc(self.user_jid)
+            self.log.warning("El mensaje de %s no se pudo decodificar: %s", sender_jid, error)
+            return
 
-    async def start_session(self, event):
-        self.send_presence()
-        await self.get_roster()
-        self._send_echo()
-        await asyncio.create_task(self.prompt_send_message())
+        msg_type = body['type']
+        MENSAJES_RECIBIDOS.inc(self.user_jid, msg_type)
+        self.log.debug("%s recibió de %s: %s", self.user_jid, sender_jid, body)
+        try:
+            self._handle(sender_jid, msg_type, body)
+        finally:
+            DURACION_MANEJO.observar(time.perf_counter() - start, self.user_jid, msg_type)
+
+    def _handle(self, sender_jid, msg_type, body):
+        handler = self.handlers.get(msg_type)
+        if handler is None:
+            self.log.debug("Tipo de mensaje desconocido de %s: %s", sender_jid, msg_type)
+            return
+        try:
+            handler(sender_jid, body)
+        except (KeyError, TypeError, ValueError):
+            self.log.warning("El mensaje de %s no está correctamente formateado: %s", sender_jid, body)
+
+    def _handle_echo(self, sender_jid, body):
+        self.transport.enviar_mensaje(sender_jid, {"type": "echo_response", "seq": body.get('seq')})
+
+    def _handle_echo_response(self, sender_jid, body):
+        rtt = self.prober.recibir_respuesta(sender_jid, body.get('seq'))
+        if rtt is not None and self.network_config.jid_map.get(sender_jid) in self.forwarding.down:
+            self._neighbor_up(sender_jid)
+
+    def _handle_weights(self, sender_jid, body):
+        table = body['table']
+        version = body['version']
+        user = body['from']
+        node_id = self.network_config.jid_map[user]
+
+        if node_id == self.user_id:
+            # Un LSA propio más nuevo que el actual quedó en la red de antes de un
+            # reinicio: se reemplaza con la tabla actual y una versión mayor
+            own = self.weight_tables[node_id]
+            if own['version'] < version:
+                self.install_table(node_id, dict(own['table']), version + 1)
+                self.broadcast_weights(node_id)
+            return
 
-    async def process_message(self, msg):
-        if msg['type'] not in ('chat', 'normal'):
+        if node_id not in self.weight_tables or self.weight_tables[node_id]['version'] < version:
+            self.install_table(node_id, table, version)
+            self.broadcast_weights(node_id)
+
+    def _handle_lsdb_summary(self, sender_jid, body):
+        # Se envían los LSA en que el vecino está atrasado y, si él tiene alguno
+        # más nuevo, se le contesta con el resumen propio para que los envíe
+        theirs = body['versions']
+        behind = False
+        for node_id, entry in self.weight_tables.items():
+            if entry['version'] > theirs.get(node_id, -1):
+                self.transport.despachar(sender_jid, self._weights_body(node_id))
+                MENSAJES_ENVIADOS.inc(self.user_jid, 'weights')
+        for node_id, version in theirs.items():
+            if node_id not in self.weight_tables or self.weight_tables[node_id]['version'] < version:
+                behind = True
+        if behind and not body.get('reply'):
+            self.transport.despachar(sender_jid, self._lsdb_summary(reply=True))
+            MENSAJES_ENVIADOS.inc(self.user_jid, 'lsdb_summary')
+
+    def _handle_send_routing(self, sender_jid, body):
+        if body['to'] == self.user_id:
+            if 'trace' in body:
+                self._emit_trace(llegada(body['trace'], self.user_id, self.arrival))
+            self.deliver(body['from'], body['data'])
+            return
+        self._forward(body)
+
+    def _emit_trace(self, trace):
+        self.log.debug("Traza de %s: %s", trace['h'][0][0], trace)
+        if self.on_trace is not None:
+            self.on_trace(trace)
+
+    def _handle_message(self, sender_jid, body):
+        self.deliver(body['from'], body['data'])
+
+    def _forward(self, packet, payload=None):
+        """
+        Reenvía un paquete send_routing hacia su destino. Si se da `payload` (la
+        carga aún codificada, ver CodecMensajes.leer_cabecera), `packet` es solo
+        la cabecera y la carga se reenvía sin decodificarla.
+        """
+        destination_id = packet['to']
+        next_hop_id = self.get_next_hop(destination_id, flow_key(packet['from'], destination_id, packet.get('flow')))
+        if next_hop_id is None:
+            self.log.warning("No hay ruta conocida hacia el nodo %s", destination_id)
             return
-        
-        sender_jid = str(msg["from"]).split("/")[0]
-        body = msg['body']
 
-        try:
-            body = json.loads(body)
-        except JSONDecodeError:
-            print(f"ERROR: El mensaje de {sender_jid} no es compatible con JSON!")
+        packet = dict(packet, hops=packet['hops'] + 1)
+        ttl = packet.get('ttl')
+        if ttl is not None:
+            if ttl <= 1:
+                self.log.debug("Paquete de %s hacia %s descartado: TTL agotado", packet['from'], destination_id)
+                return
+            packet['ttl'] = ttl - 1
+        if 'trace' in packet:
+            packet['trace'] = llegada(packet['trace'], self.user_id, self.arrival)
+        self._send_packet(self.network_config.node_map[next_hop_id], packet, payload)
+
+    def _send_packet(self, receiver_jid, packet, payload=None):
+        """
+        Envía un paquete send_routing (con la carga ya codificada si se da
+        `payload`). Si lleva traza, el cuerpo se genera al salir de la cola para
+        registrar la espera y la hora real de salida.
+        """
+        codec = self.transport.codec
+
+        def encode(packet):
+            return codec.codificar(packet) if payload is None else codec.recomponer(packet, payload)
+
+        MENSAJES_ENVIADOS.inc(self.user_jid, 'send_routing')
+        if 'trace' in packet:
+            body = CuerpoDiferido(lambda wait: encode(dict(packet, trace=salida(packet['trace'], wait))))
+        else:
+            body = encode(packet)
+        self.transport.despachar(receiver_jid, body, DATOS)
+
+    def send_data(self, destination_id, data, flow=None):
+        """
+        Origina un paquete de datos hacia destination_id usando la FIB. Los
+        paquetes con distinto `flow` hacia el mismo destino pueden repartirse
+        entre caminos distintos; los del mismo flujo siguen siempre el mismo.
+        """
+        if destination_id == self.user_id:
+            self.deliver(self.user_id, data)
             return
 
-        try:
-            msg_type = body['type']
-
-            if msg_type == 'echo':
-                echo_response = '{\"type\": \"echo_response\"}'
-                self.send_message(mto=sender_jid, mbody=echo_response, mtype='chat')
-
-            elif msg_type == 'echo_response':
-                elapsed = time.time() - self.echo_times[sender_jid]
-                sender_id = self.network_config.jid_map[sender_jid]
-                self.weight_tables[self.user_id]['table'][sender_id] = elapsed
-                self.weight_tables[self.user_id]['version'] += 1
-                self.broadcast_weights(self.user_id)
-
-            elif msg_type == 'weights':
-                table = body['table']
-                version = body['version']
-                user = body['from']
-                node_id = self.network_config.jid_map[user]
-
-                if node_id not in self.weight_tables:
-                    self.weight_tables[node_id] = {
-                        'table': table,
-                        'version': version
-                    }
-                    self.broadcast_weights(node_id)
-
-                    processed_table = self.prepare_dijkstra_table()
-                    self.shortest_distances, self.shortest_paths = dijkstra(processed_table, self.user_id)
-                    return
-
-                if self.weight_tables[node_id]['version'] < version:
-                    self.weight_tables[node_id] = {
-                        'table': table,
-                        'version': version
-                    }
-                    self.broadcast_weights(node_id)
-
-                    processed_table = self.prepare_dijkstra_table()
-                    self.shortest_distances, self.shortest_paths = dijkstra(processed_table, self.user_id)
-
-            elif msg_type == 'send_routing':
-                destination_id = body['to']
-                sender_id = body['from']
-                data = body['data']
-                hops = body['hops']
-
-                next_hop_id = self.get_next_hop(destination_id)
-                receiver_jid = self.network_config.node_map[next_hop_id]
-
-                if destination_id != self.user_id:
-                    routing_msg = f'{{\"type\": \"send_routing\", \"from\": \"{sender_id}\", \"to\": \"{destination_id}\", \"data\": \"{data}\" , \"hops\": \"{hops + 1}\"}}'
-                    self.send_message(mto=receiver_jid, mbody=routing_msg, mtype='chat')
-                    return
-
-                final_msg = f'{{\"type\": \"message\", \"from\": \"{sender_id}\", \"data\": \"{data}\" }}'
-                self.send_message(mto=receiver_jid, mbody=final_msg, mtype='chat')
-
-            elif msg_type == 'message':
-                print("Mensaje recibido:")
-
-        except KeyError:
-            print("ERROR: El mensaje recibido no está correctamente formateado: \n")
-
-    def prepare_dijkstra_table(self):
-        processed_table = {}
-        for node_id, table_info in self.weight_tables.items():
-            processed_table[node_id] = table_info['table']
-
-        return processed_table
-
-    def get_next_hop(self, destination_id):
-        current_node = self.user_id
-        while current_node != destination_id:
-            for neighbor in self.shortest_paths[current_node]:
-                if self.shortest_distances[neighbor] < self.shortest_distances[current_node]:
-                    return neighbor
-            current_node = neighbor
-        return destination_id
+        next_hop_id = self.get_next_hop(destination_id, flow_key(self.user_id, destination_id, flow))
+        if next_hop_id is None:
+            self.log.warning("No hay ruta conocida hacia el nodo %s", destination_id)
+            return
+
+        message = {
+            "type": "send_routing",
+            "from": self.user_id,
+            "to": destination_id,
+            "data": data,
+            "hops": 1
+        }
+        if flow is not None:
+            message["flow"] = flow
+        if self.trace:
+            message["trace"] = nueva_traza(self.user_id)
+        self._send_packet(self.network_config.node_map[next_hop_id], message)
+
+    def deliver(self, sender_id, data):
+        # En modo interactivo el mensaje es la salida que espera el usuario
+        if self.interactive:
+            print(f"Mensaje recibido de {sender_id}: {data}")
+        else:
+            self.log.debug("Mensaje recibido de %s: %s", sender_id, data)
+        if self.on_message is not None:
+            self.on_message(sender_id, data)
+
+    def install_table(self, node_id, table, version):
+        """
+        Guarda la tabla de enlaces de un nodo y programa el SPF que la aplica a la FIB.
+        """
+        self.pending_spf.setdefault(node_id, self.link_graph.get(node_id, {}))
+        self.weight_tables[node_id] = {
+            'table': table,
+            'version': version
+        }
+        self.link_graph[node_id] = table
+        self.spf_timer.schedule()
+        if self.snapshots is not None:
+            self.snapshots.marcar()
+
+    def trabajo_pendiente(self):
+        return self.lsa_timer.pending or self.spf_timer.pending
+
+    def _run_spf(self):
+        # Un solo nodo cambiado admite SPF incremental; varios (o enlaces
+        # anteriores desconocidos), un SPF completo
+        start = time.perf_counter()
+        if len(self.pending_spf) == 1 and None not in self.pending_spf.values():
+            (node_id, old_links), = self.pending_spf.items()
+            self.forwarding.update_node(self.link_graph, node_id, old_links)
+            DURACION_SPF.observar(time.perf_counter() - start, self.user_jid, 'incremental')
+        elif self.pending_spf:
+            self.forwarding.rebuild(self.link_graph)
+            DURACION_SPF.observar(time.perf_counter() - start, self.user_jid, 'completo')
+        self.pending_spf.clear()
+        if self.forwarding.backups is None:
+            self.lfa_timer.schedule()
+        if self.snapshots is not None:
+            self.snapshots.marcar()
+
+    def _compute_backups(self):
+        # Si hay otro SPF en camino los respaldos se calcularían sobre un árbol viejo
+        if not self.spf_timer.pending:
+            self.forwarding.compute_backups()
+
+    def _snapshot_state(self):
+        return {
+            'weight_tables': self.weight_tables,
+            'forwarding': {
+                'distances': self.forwarding.distances,
+                'previous': self.forwarding.previous,
+            },
+        }
+
+    def _restore(self, state):
+        """
+        Retoma la LSDB y la FIB de una copia guardada con _snapshot_state.
+        """
+        for node_id, entry in state.get('weight_tables', {}).items():
+            if node_id == self.user_id:
+                continue
+            self.weight_tables[node_id] = {'table': entry['table'], 'version': entry['version']}
+            self.link_graph[node_id] = entry['table']
+
+        own = self.weight_tables[self.user_id]
+        saved = state.get('weight_tables', {}).get(self.user_id)
+        if saved is not None:
+            # Los costos medidos antes del reinicio son la mejor estimación hasta
+            # que el sondeo mida otros; si cambiaron los vecinos, el LSA es nuevo
+            for neighbor_id, cost in saved['table'].items():
+                if neighbor_id in own['table']:
+                    own['table'][neighbor_id] = cost
+            own['version'] = saved['version'] if set(saved['table']) == set(own['table']) else saved['version'] + 1
+
+        forwarding = state.get('forwarding')
+        if forwarding is not None:
+            self.forwarding.restore(self.link_graph, forwarding['distances'], forwarding['previous'])
+        else:
+            self.forwarding.rebuild(self.link_graph)
+        # El árbol pudo guardarse con un SPF pendiente (LSDB más nueva que la FIB):
+        # se confirma con un SPF completo, mientras tanto se reenvía con el retomado
+        self.pending_spf[self.user_id] = None
+        self.spf_timer.schedule()
+        self.restored = True
+        self.log.info("%s retomó %d LSA de %s", self.user_jid, len(self.weight_tables), self.snapshots.ruta)
+
+    def save_snapshot(self):
+        if self.snapshots is not None:
+            self.snapshots.guardar()
+
+    def contrapresion(self, active):
+        self.congested = active
+        if not active and self.pending_links:
+            self.lsa_timer.schedule()
+
+    def _originate_lsa(self):
+        # Con la cola de salida saturada el LSA propio espera; se reprograma al liberarse
+        if not self.pending_links or self.congested:
+            return
+        own_table = dict(self.weight_tables[self.user_id]['table'])
+        for neighbor_id, cost in self.pending_links.items():
+            if cost is None:
+                own_table.pop(neighbor_id, None)
+            else:
+                own_table[neighbor_id] = cost
+        self.pending_links.clear()
+        self.install_table(self.user_id, own_table, self.weight_tables[self.user_id]['version'] + 1)
+        self.broadcast_weights(self.user_id)
+
+    def get_next_hop(self, destination_id, flow=None):
+        """
+        Siguiente salto hacia destination_id. Con una clave de flujo (ver
+        flow_key) se elige entre los caminos alternativos de la FIB por hash; la
+        semilla propia de cada nodo evita que todos hagan la misma elección.
+        """
+        if flow is None:
+            return self.forwarding.next_hop(destination_id)
+        hops = self.forwarding.next_hops(destination_id)
+        if len(hops) < 2:
+            return hops[0] if hops else None
+        return hops[zlib.crc32(flow.encode(), self.flow_seed) % len(hops)]
 
     def broadcast_weights(self, node_id):
         if node_id not in self.weight_tables:
-            print(f"ERROR: No se pudo transmitir los pesos para el nodo id: {node_id}\n")
+            self.log.warning("No se pudo transmitir los pesos para el nodo id: %s", node_id)
             return
 
-        table = self.weight_tables[node_id]['table']
-        version = self.weight_tables[node_id]['version']
-        node_jid = self.network_config.node_map[node_id]
-        weights_message = f'{{\"type\": \"weights\", \"table\": {json.dumps(table)}, \"version\": {version}, \"from\": \"{node_jid}\" }}'
-
+        # Se codifica una sola vez y se reenvía el mismo cuerpo a todos los vecinos
+        weights_message = self._weights_body(node_id)
         for neighbor_id in self.neighbors:
             neighbor_jid = self.network_config.node_map[neighbor_id]
-            self.send_message(mto=neighbor_jid, mbody=weights_message, mtype='chat')
+            self.transport.despachar(neighbor_jid, weights_message)
+        MENSAJES_ENVIADOS.inc(self.user_jid, 'weights', n=len(self.neighbors))
+
+    def _weights_body(self, node_id):
+        return self.transport.codec.codificar({
+            "type": "weights",
+            "table": self.weight_tables[node_id]['table'],
+            "version": self.weight_tables[node_id]['version'],
+            "from": self.network_config.node_map[node_id]
+        })
+
+    def _lsdb_summary(self, reply):
+        return self.transport.codec.codificar({
+            "type": "lsdb_summary",
+            "from": self.user_jid,
+            "versions": {node_id: entry['version'] for node_id, entry in self.weight_tables.items()},
+            "reply": reply
+        })
+
+
+def flow_key(sender_id, destination_id, flow=None):
+    """
+    Clave estable de un flujo (la misma en todos los nodos del camino).
+    """
+    if flow is None:
+        return f"{sender_id}>{destination_id}"
+    return f"{sender_id}>{destination_id}>{flow}"
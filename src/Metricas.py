@@ -0,0 +1,260 @@
+import asyncio
+import math
+import os
+from bisect import bisect_left
+
+# Límites (en segundos) de los histogramas de duración: de 10µs a 1s
+LIMITES_DURACION = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class _Familia:
+    """
+    Métrica con nombre y etiquetas; guarda un valor por combinación de etiquetas.
+
+    Además de los valores que se registran en el camino caliente, una familia
+    puede leer valores bajo demanda con observar_con(funcion, *etiquetas): la
+    función se llama solo al tomar una instantánea, así que no cuesta nada
+    mientras nadie mira.
+    """
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.valores = {}  # (valores de etiquetas) -> valor
+        self.funciones = {}  # (valores de etiquetas) -> función sin argumentos
+
+    def observar_con(self, funcion, *etiquetas):
+        self.funciones[etiquetas] = funcion
+
+    def reiniciar(self):
+        self.valores.clear()
+        self.funciones.clear()
+
+    def muestras(self):
+        muestras = dict(self.valores)
+        for etiquetas, funcion in self.funciones.items():
+            muestras[etiquetas] = funcion()
+        return muestras
+
+
+class Contador(_Familia):
+    tipo = 'counter'
+
+    def inc(self, *etiquetas, n=1):
+        self.valores[etiquetas] = self.valores.get(etiquetas, 0) + n
+
+
+class Medidor(_Familia):
+    tipo = 'gauge'
+
+    def fijar(self, valor, *etiquetas):
+        self.valores[etiquetas] = valor
+
+
+class Histograma(_Familia):
+    """
+    Histograma de cubetas fijas. Cada serie guarda [cuentas por cubeta, suma,
+    total]; la última cubeta es +Inf.
+    """
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES_DURACION):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(limites)
+
+    def observar(self, valor, *etiquetas):
+        serie = self.valores.get(etiquetas)
+        if serie is None:
+            serie = [[0] * (len(self.limites) + 1), 0.0, 0]
+            self.valores[etiquetas] = serie
+        serie[0][bisect_left(self.limites, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def percentil(self, serie, p):
+        """
+        Estimación del percentil p a partir de las cubetas: el límite superior de
+        la cubeta donde cae (None si no hay muestras).
+        """
+        cuentas, _, total = serie
+        if not total:
+            return None
+        objetivo = total * p / 100
+        acumulado = 0
+        for indice, cuenta in enumerate(cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return self.limites[indice] if indice < len(self.limites) else float('inf')
+        return float('inf')
+
+
+class Registro:
+    """
+    Conjunto de métricas de un proceso. Las familias se crean una sola vez (por
+    nombre) y se comparten entre todos los nodos, que se distinguen por la
+    etiqueta 'nodo'.
+    """
+
+    def __init__(self):
+        self.familias = {}
+
+    def _familia(self, clase, nombre, ayuda, etiquetas, **opciones):
+        familia = self.familias.get(nombre)
+        if familia is None:
+            familia = clase(nombre, ayuda, etiquetas, **opciones)
+            self.familias[nombre] = familia
+        elif not isinstance(familia, clase):
+            raise ValueError(f"La métrica '{nombre}' ya existe con otro tipo.")
+        return familia
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._familia(Contador, nombre, ayuda, etiquetas)
+
+    def medidor(self, nombre, ayuda, etiquetas=()):
+        return self._familia(Medidor, nombre, ayuda, etiquetas)
+
+    def histograma(self, nombre, ayuda, etiquetas=(), limites=LIMITES_DURACION):
+        return self._familia(Histograma, nombre, ayuda, etiquetas, limites=limites)
+
+    def reiniciar(self):
+        """
+        Borra todos los valores y lecturas registradas (las familias se conservan).
+        """
+        for familia in self.familias.values():
+            familia.reiniciar()
+
+    def instantanea(self):
+        """
+        Valores actuales como diccionario {nombre: [{etiquetas..., valor}]}. Los
+        histogramas incluyen total, suma y p50/p95/p99 estimados.
+        """
+        resultado = {}
+        for nombre, familia in self.familias.items():
+            series = []
+            for valores, muestra in sorted(familia.muestras().items()):
+                serie = dict(zip(familia.etiquetas, valores))
+                if isinstance(familia, Histograma):
+                    serie.update(total=muestra[2], suma=muestra[1],
+                                 p50=familia.percentil(muestra, 50),
+                                 p95=familia.percentil(muestra, 95),
+                                 p99=familia.percentil(muestra, 99))
+                else:
+                    serie['valor'] = muestra
+                series.append(serie)
+            resultado[nombre] = series
+        return resultado
+
+    def texto_prometheus(self):
+        """
+        Todas las métricas en el formato de texto de Prometheus.
+        """
+        lineas = []
+        for nombre, familia in self.familias.items():
+            lineas.append(f"# HELP {nombre} {familia.ayuda}")
+            lineas.append(f"# TYPE {nombre} {familia.tipo}")
+            for valores, muestra in sorted(familia.muestras().items()):
+                etiquetas = list(zip(familia.etiquetas, valores))
+                if not isinstance(familia, Histograma):
+                    lineas.append(f"{nombre}{_etiquetas(etiquetas)} {_numero(muestra)}")
+                    continue
+                cuentas, suma, total = muestra
+                acumulado = 0
+                for limite, cuenta in zip(familia.limites + ('+Inf',), cuentas):
+                    acumulado += cuenta
+                    le = limite if limite == '+Inf' else _numero(limite)
+                    lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas + [('le', le)])} {acumulado}")
+                lineas.append(f"{nombre}_sum{_etiquetas(etiquetas)} {_numero(suma)}")
+                lineas.append(f"{nombre}_count{_etiquetas(etiquetas)} {total}")
+        return "\n".join(lineas) + "\n"
+
+    def volcar(self, ruta):
+        """
+        Escribe texto_prometheus() en `ruta` de forma atómica (archivo temporal y
+        reemplazo), para que un lector nunca vea un archivo a medias.
+        """
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write(self.texto_prometheus())
+        os.replace(temporal, ruta)
+
+    async def volcar_periodicamente(self, ruta, intervalo=10.0):
+        while True:
+            self.volcar(ruta)
+            await asyncio.sleep(intervalo)
+
+
+def percentil(valores, p):
+    """
+    Percentil p (0-100) de una muestra, interpolando entre los dos valores más
+    cercanos (None si está vacía).
+    """
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    bajo = math.floor(k)
+    alto = min(bajo + 1, len(ordenados) - 1)
+    return ordenados[bajo] + (ordenados[alto] - ordenados[bajo]) * (k - bajo)
+
+def _numero(valor):
+    if isinstance(valor, bool):
+        return str(int(valor))
+    if isinstance(valor, float) and valor == float('inf'):
+        return '+Inf'
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+def _etiquetas(pares):
+    if not pares:
+        return ''
+    texto = ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in pares)
+    return '{' + texto + '}'
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Registro del proceso y métricas comunes a todos los algoritmos
+REGISTRO = Registro()
+
+MENSAJES_RECIBIDOS = REGISTRO.contador(
+    'ruteo_mensajes_recibidos_total', "Mensajes recibidos por tipo.", ('nodo', 'tipo'))
+MENSAJES_ENVIADOS = REGISTRO.contador(
+    'ruteo_mensajes_enviados_total', "Mensajes enviados por tipo (antes de agruparse).", ('nodo', 'tipo'))
+BYTES_ENVIADOS = REGISTRO.contador(
+    'ruteo_bytes_enviados_total', "Bytes de cuerpos codificados enviados.", ('nodo',))
+ERRORES_DECODIFICACION = REGISTRO.contador(
+    'ruteo_errores_decodificacion_total', "Cuerpos que no se pudieron decodificar.", ('nodo',))
+DURACION_MANEJO = REGISTRO.histograma(
+    'ruteo_manejo_segundos', "Tiempo de proceso de cada mensaje recibido.", ('nodo', 'tipo'))
+PROFUNDIDAD_COLA = REGISTRO.medidor(
+    'ruteo_cola_salida_mensajes', "Mensajes esperando en la cola de salida.", ('nodo',))
+DESCARTES_COLA = REGISTRO.contador(
+    'ruteo_cola_descartes_total', "Mensajes descartados por la cola de salida llena.", ('nodo',))
+DURACION_SPF = REGISTRO.histograma(
+    'ruteo_spf_segundos', "Duración de cada cálculo de caminos más cortos.", ('nodo', 'modo'))
+DURACION_TABLA = REGISTRO.histograma(
+    'ruteo_actualizacion_tabla_segundos', "Duración de cada actualización de la tabla de vectores.", ('nodo',))
+DEDUP_CONSULTAS = REGISTRO.contador(
+    'ruteo_dedup_consultas_total', "Consultas a la cache de duplicados.", ('nodo',))
+DEDUP_ACIERTOS = REGISTRO.contador(
+    'ruteo_dedup_aciertos_total', "Mensajes descartados como duplicados.", ('nodo',))
+
+
+def tamano_utf8(texto):
+    """
+    Bytes que ocupa un cuerpo en el cable; los cuerpos ASCII (casi todos) no se recodifican.
+    """
+    return len(texto) if texto.isascii() else len(texto.encode('utf-8'))
+
+def observar_cache(nodo, cache):
+    """
+    Publica los contadores de una CacheDuplicados bajo la etiqueta del nodo.
+    """
+    DEDUP_CONSULTAS.observar_con(lambda: cache.consultas, nodo)
+    DEDUP_ACIERTOS.observar_con(lambda: cache.aciertos, nodo)
+
+def observar_planificador(nodo, planificador):
+    PROFUNDIDAD_COLA.observar_con(planificador.profundidad, nodo)
+    DESCARTES_COLA.observar_con(lambda: planificador.descartados, nodo)
@@ -1,48 +1,251 @@
 import json
+import logging
+import os
 import re
+import sys
+from array import array
+
+log = logging.getLogger(__name__)
+
+# Versión del formato del archivo de caché; cambiarla invalida las cachés existentes
+CACHE_VERSION = 2
+
+# Líneas del formato de texto: "A: B C" (vecinos de A) o "A B" (enlace en ambos sentidos)
+_ADJACENCY_LINE = re.compile(r"^\s*([^:\s]+)\s*:\s*(.*)$")
+
 
 class NetConfig:
-    def __init__(self):
+    def __init__(self, topo_map=None, node_map=None, strict=False):
+        """
+        topo_map ({nodo: [vecinos]}) y node_map ({nodo: jid}); si faltan se usan
+        los del laboratorio. Con strict=True los enlaces en un solo sentido y las
+        redes no conexas son errores; si no, solo se avisan en el log.
+        """
         self.topo_map = {}
         self.node_map = {}
         self.jid_map = {}
-        self.load_topo_data()
-        self.load_name_data()
+        if topo_map is None:
+            self.load_topo_data()
+        else:
+            self.topo_map = topo_map
+        if node_map is None:
+            self.load_name_data()
+        else:
+            self.node_map = node_map
         self.reverse_map()
-        self.validate_net_config()
+        self.compile_topology()
+        self.build_indexes()
+        self.validate_net_config(strict)
+
+    @classmethod
+    def from_files(cls, topo_path, names_path, cache_path=None, strict=False):
+        """
+        Carga la topología y los nombres desde archivos. La topología puede ser un
+        documento {"type": "topo", "config": {...}} o el formato de texto por
+        líneas (ver iter_topology_lines), que se lee sin cargar el archivo entero.
+
+        Con cache_path, el resultado ya validado y compilado se guarda en ese
+        archivo y se reutiliza mientras los archivos de origen no cambien.
+        """
+        signature = _file_signature(topo_path, names_path, strict)
+        if cache_path is not None:
+            config = cls.load_cache(cache_path, signature)
+            if config is not None:
+                return config
+
+        config = cls(read_topology(topo_path), read_names(names_path), strict=strict)
+        if cache_path is not None:
+            config.save_cache(cache_path, signature)
+        return config
 
     def reverse_map(self):
         self.jid_map = {v: k for k, v in self.node_map.items()}
 
-    def load_topo_data(self):
+    def load_topo_data(self, path=None):
         content = "{'type':'topo', 'config':{'A': ['B'], 'B': ['C'], 'C': ['A']}}"
-        content = re.sub(r"'", '"', content)
-        data = json.loads(content)
-        if data['type'] != 'topo':
-            raise ValueError("Invalid topology data.")
-        self.topo_map = data['config']
+        self.topo_map = read_topology(path) if path is not None else parse_document(content, 'topo')
 
-    def load_name_data(self):
+    def load_name_data(self, path=None):
         content = "{'type':'names', 'config':{'A': 'sag18173@alumchat.lol', 'B': 'sag18173-test1@alumchat.lol', 'C': 'sag18173-test2@alumchat.lol'}}"
-        content = re.sub(r"'", '"', content)
-        data = json.loads(content)
-        if data['type'] != 'names':
-            raise ValueError("Invalid names data.")
-        self.node_map = data['config']
+        self.node_map = read_names(path) if path is not None else parse_document(content, 'names')
 
-    def validate_net_config(self):
+    def compile_topology(self):
+        """
+        Asigna a cada nodo un id entero (su posición en orden alfabético) y guarda
+        los vecinos como listas de adyacencia compactas: los vecinos del nodo i
+        son neighbor_targets[neighbor_offsets[i]:neighbor_offsets[i + 1]].
+        """
+        nodes = set(self.topo_map) | set(self.node_map)
+        for neighbors in self.topo_map.values():
+            nodes.update(neighbors)
+        self.node_names = sorted(nodes)
+        self.node_index = {node: index for index, node in enumerate(self.node_names)}
+
+        self.neighbor_offsets = array('l', [0])
+        self.neighbor_targets = array('l')
+        for node in self.node_names:
+            self.neighbor_targets.extend(self.node_index[neighbor] for neighbor in self.topo_map.get(node, ()))
+            self.neighbor_offsets.append(len(self.neighbor_targets))
+
+    def build_indexes(self):
+        """
+        Índices que se calculan una sola vez: conjuntos de vecinos y JID <-> id entero.
+        """
+        self.neighbor_sets = {node: frozenset(neighbors) for node, neighbors in self.topo_map.items()}
+        self.jid_index = {jid: self.node_index[node] for node, jid in self.node_map.items()}
+        self.index_jid = [self.node_map.get(node) for node in self.node_names]
+
+    def validate_net_config(self, strict=False):
         for node in self.node_map.keys():
             if node not in self.topo_map:
                 raise ValueError(f"Node '{node}' not found in topology.")
 
+        problems = []
+        one_way = self.asymmetric_links()
+        if one_way:
+            sample = ', '.join(f"{a}->{b}" for a, b in one_way[:5])
+            problems.append(f"{len(one_way)} one-way links (e.g. {sample})")
+        components = self.connected_components()
+        if len(components) > 1:
+            problems.append(f"network is split into {len(components)} components")
+
+        for problem in problems:
+            if strict:
+                raise ValueError(f"Invalid topology: {problem}.")
+            log.warning("Topology: %s", problem)
+
+    def asymmetric_links(self):
+        """
+        Enlaces (a, b) listados en a pero no en b.
+        """
+        return [(node, neighbor)
+                for node, neighbors in self.topo_map.items()
+                for neighbor in neighbors
+                if node not in self.neighbor_sets.get(neighbor, ())]
+
+    def connected_components(self):
+        """
+        Componentes conexas de la topología (tomando los enlaces en ambos
+        sentidos), como listas de nodos.
+        """
+        # Unión-búsqueda sobre los ids enteros con compresión de caminos a la mitad
+        parent = list(range(len(self.node_names)))
+
+        def find(index):
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        offsets, targets = self.neighbor_offsets, self.neighbor_targets
+        for index in range(len(self.node_names)):
+            root = find(index)
+            for target in targets[offsets[index]:offsets[index + 1]]:
+                other = find(target)
+                if other != root:
+                    parent[other] = root
+
+        components = {}
+        for index, node in enumerate(self.node_names):
+            components.setdefault(find(index), []).append(node)
+        return list(components.values())
+
+    def undirected_links(self):
+        """
+        Vecinos de cada nodo con los enlaces en ambos sentidos ({nodo: set}).
+        """
+        links = {node: set() for node in self.topo_map}
+        for node, neighbors in self.topo_map.items():
+            for neighbor in neighbors:
+                links[node].add(neighbor)
+                links.setdefault(neighbor, set()).add(node)
+        return links
+
     def neighbors_of(self, node_id):
-        print(f"Neighbors of '{node_id}':")
         return self.topo_map.get(node_id, [])
 
+    def neighbor_ids(self, index):
+        """
+        Ids enteros de los vecinos del nodo con id `index`.
+        """
+        return self.neighbor_targets[self.neighbor_offsets[index]:self.neighbor_offsets[index + 1]]
+
+    def is_neighbor(self, node_id, other_id):
+        return other_id in self.neighbor_sets.get(node_id, ())
+
     def name_of(self, node_id):
-        print(f"Name of '{node_id}':")
         return self.node_map.get(node_id, None)
 
+    def save_cache(self, path, signature=None):
+        """
+        Guarda la configuración compilada de forma atómica: una línea JSON con
+        los nombres, los JIDs y la firma, seguida de los bytes de la adyacencia
+        compacta. Los diccionarios se reconstruyen al cargar, que es más rápido
+        que deserializarlos.
+        """
+        header = {
+            'version': CACHE_VERSION,
+            'signature': signature,
+            'byteorder': sys.byteorder,
+            'itemsize': self.neighbor_offsets.itemsize,
+            'node_names': self.node_names,
+            'listed': [node in self.topo_map for node in self.node_names],
+            'node_map': self.node_map,
+            'target_count': len(self.neighbor_targets),
+        }
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as cache_file:
+            cache_file.write(json.dumps(header, ensure_ascii=False).encode('utf-8') + b'\n')
+            self.neighbor_offsets.tofile(cache_file)
+            self.neighbor_targets.tofile(cache_file)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load_cache(cls, path, signature=None):
+        """
+        Carga una configuración guardada con save_cache, o None si no existe, está
+        dañada o no corresponde a `signature`.
+        """
+        # La firma se compara tal como queda al pasar por JSON (las tuplas son listas)
+        signature = json.loads(json.dumps(signature))
+        try:
+            with open(path, 'rb') as cache_file:
+                header = json.loads(cache_file.readline())
+                if not isinstance(header, dict):
+                    return None
+                if (header.get('version') != CACHE_VERSION or header.get('signature') != signature
+                        or header.get('byteorder') != sys.byteorder):
+                    return None
+                names = header['node_names']
+                listed = header['listed']
+                node_map = header['node_map']
+                offsets = array('l')
+                targets = array('l')
+                if header.get('itemsize') != offsets.itemsize:
+                    return None
+                offsets.fromfile(cache_file, len(names) + 1)
+                targets.fromfile(cache_file, header['target_count'])
+                if cache_file.read(1) or len(listed) != len(names) or not isinstance(node_map, dict):
+                    return None
+
+                # Ya se validó al compilarla: solo se reconstruyen los mapas
+                config = cls.__new__(cls)
+                config.node_names = names
+                config.neighbor_offsets = offsets
+                config.neighbor_targets = targets
+                config.node_index = {node: index for index, node in enumerate(names)}
+                config.topo_map = {
+                    node: [names[target] for target in targets[offsets[index]:offsets[index + 1]]]
+                    for index, (node, is_listed) in enumerate(zip(names, listed))
+                    if is_listed
+                }
+                config.node_map = node_map
+                config.reverse_map()
+                config.build_indexes()
+        except (OSError, EOFError, ValueError, KeyError, TypeError, IndexError):
+            return None
+        return config
+
     def __str__(self):
         topo_info = "Topology:\n"
         for node, neighbors in self.topo_map.items():
@@ -54,3 +257,80 @@ class NetConfig:
 
         return topo_info + "\n" + name_info
 
+
+def parse_document(content, expected_type):
+    """
+    Lee un documento {"type": ..., "config": {...}}. Acepta también el formato
+    del laboratorio con comillas simples.
+    """
+    try:
+        data = json.loads(content)
+    except ValueError:
+        data = json.loads(content.replace("'", '"'))
+    if not isinstance(data, dict) or data.get('type') != expected_type:
+        raise ValueError(f"Invalid {expected_type} data.")
+    return data['config']
+
+def iter_topology_lines(lines):
+    """
+    Recorre una topología en formato de texto y produce pares (nodo, vecino).
+
+    Cada línea es "A: B C" (o "A: B, C") con los vecinos de A, o "A B" para un
+    enlace en ambos sentidos. Las líneas vacías y lo que sigue a '#' se ignoran.
+    Un nodo sin vecinos ("A:") produce (A, None).
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        match = _ADJACENCY_LINE.match(line)
+        if match:
+            node = match.group(1)
+            yield node, None
+            for neighbor in match.group(2).replace(',', ' ').split():
+                yield node, neighbor
+            continue
+        parts = line.split()
+        if len(parts) != 2:
+            raise ValueError(f"Invalid topology line {number}: {line!r}")
+        yield parts[0], parts[1]
+        yield parts[1], parts[0]
+
+def read_topology(path):
+    """
+    Lee un archivo de topología (documento JSON o formato de texto por líneas) como topo_map.
+    """
+    with open(path, encoding='utf-8') as topo_file:
+        if _first_significant_char(topo_file) == '{':
+            return parse_document(topo_file.read(), 'topo')
+
+        topo_map = {}
+        seen = {}  # nodo -> set de vecinos, para no repetir enlaces
+        for node, neighbor in iter_topology_lines(topo_file):
+            neighbors = topo_map.get(node)
+            if neighbors is None:
+                neighbors = topo_map[node] = []
+                seen[node] = set()
+            if neighbor is not None and neighbor not in seen[node]:
+                seen[node].add(neighbor)
+                neighbors.append(neighbor)
+        return topo_map
+
+def read_names(path):
+    with open(path, encoding='utf-8') as names_file:
+        return parse_document(names_file.read(), 'names')
+
+def _first_significant_char(text_file):
+    # Mira el primer carácter no blanco y deja el archivo al principio
+    while True:
+        char = text_file.read(1)
+        if not char or not char.isspace():
+            text_file.seek(0)
+            return char
+
+def _file_signature(topo_path, names_path, strict):
+    signature = [strict]
+    for path in (topo_path, names_path):
+        stat = os.stat(path)
+        signature.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
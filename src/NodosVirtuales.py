@@ -0,0 +1,218 @@
+import asyncio
+import itertools
+import logging
+
+from Transporte import Transporte
+from PlanificadorEnvio import CuerpoDiferido, CONTROL
+from Metricas import BYTES_ENVIADOS, tamano_utf8
+
+log = logging.getLogger(__name__)
+
+# Sobre de un mensaje entre nodos virtuales: ">origen destino\n" seguido del cuerpo
+PREFIJO_SOBRE = '>'
+
+
+class TransporteVirtual(Transporte):
+    """
+    Transporte de un nodo lógico atendido por un HostNodos.
+    """
+
+    def __init__(self, host, jid, algoritmo=None, codec=None):
+        super().__init__(algoritmo, codec)
+        self.host = host
+        self.jid = jid
+
+    @property
+    def jid_propio(self):
+        return self.jid
+
+    def enviar(self, destino, cuerpo):
+        self.host.enviar_desde(self.jid, destino, cuerpo)
+
+    def despachar(self, destino, cuerpo, prioridad=CONTROL):
+        if self.planificador is not None:
+            super().despachar(destino, cuerpo, prioridad)
+            return
+        # Sin cola propia la prioridad (y los cuerpos diferidos) pasan a la conexión compartida
+        if not isinstance(cuerpo, CuerpoDiferido):
+            BYTES_ENVIADOS.inc(self.jid, n=tamano_utf8(cuerpo))
+        self.host.enviar_desde(self.jid, destino, cuerpo, prioridad)
+
+
+class HostNodos:
+    """
+    Atiende muchos nodos de ruteo lógicos sobre una sola conexión.
+
+    Para el transporte "físico" (un ClienteXMPP o un nodo de RedSimulada) el
+    host es un algoritmo más: recibe los cuerpos, la presencia de otros hosts y
+    el inicio de sesión, y los reparte entre los nodos virtuales creados con
+    agregar_nodo(). Cada nodo virtual usa un TransporteVirtual y se identifica
+    con su propio JID, aunque no tenga cuenta en el servidor.
+
+    `directorio` ({jid virtual: jid del host que lo atiende}) dice a qué
+    conexión mandar lo que va a un nodo de otro host; esos mensajes viajan en un
+    sobre con el origen y el destino virtuales. Entre nodos del mismo host no se
+    pasa por el servidor, y los JIDs fuera del directorio son clientes comunes a
+    los que se envía sin sobre. Si la cuenta del host es también un nodo
+    virtual, recibe lo que llegue sin sobre.
+
+    `vecinos` ({jid virtual: vecinos}, ver topologia_por_jid) decide a qué
+    nodos se avisa cuando otro host se conecta o desconecta; sin él se avisa a
+    todos, como hace el roster de XMPP.
+    """
+
+    def __init__(self, jid=None, password=None, transporte=None, directorio=None, vecinos=None):
+        self.directorio = dict(directorio or {})
+        self.vecinos = vecinos
+        self.nodos = {}  # jid virtual -> TransporteVirtual
+        self.locales_en_vuelo = 0  # Entregas entre nodos del mismo host aún no procesadas
+        self._ids = itertools.count()
+        if transporte is None:
+            from ConnectionXMPP import ClienteXMPP
+            transporte = ClienteXMPP(jid, password, self)
+        else:
+            transporte.algoritmo = self
+        self.transporte = transporte
+        self.jid = transporte.jid_propio
+
+    def agregar_nodo(self, jid, codec=None):
+        """
+        Crea el transporte de un nodo virtual; se le pasa al algoritmo igual
+        que un ClienteXMPP o un TransporteSimulado.
+        """
+        transporte = TransporteVirtual(self, jid, codec=codec)
+        self.nodos[jid] = transporte
+        self.directorio[jid] = self.jid
+        return transporte
+
+    def conectar(self):
+        self.transporte.connect()
+        self.transporte.process(forever=False)
+
+    def _son_vecinos(self, a, b):
+        if a == b:
+            return False
+        return self.vecinos is None or b in self.vecinos.get(a, ())
+
+    # --- Envío -------------------------------------------------------------------
+
+    def enviar_desde(self, origen, destino, cuerpo, prioridad=CONTROL):
+        local = self.nodos.get(destino)
+        if local is not None:
+            if isinstance(cuerpo, CuerpoDiferido):
+                cuerpo = cuerpo.generar(0.0)
+            self._entregar_local(local, origen, cuerpo)
+            return
+        host = self.directorio.get(destino)
+        if host is None:
+            self.transporte.despachar(destino, cuerpo, prioridad)
+        elif isinstance(cuerpo, CuerpoDiferido):
+            generar = cuerpo.generar
+            self.transporte.despachar(host, CuerpoDiferido(
+                lambda espera: envolver(origen, destino, generar(espera))), prioridad)
+        else:
+            self.transporte.despachar(host, envolver(origen, destino, cuerpo), prioridad)
+
+    def _entregar_local(self, receptor, origen, cuerpo):
+        mensaje_id = f"{self.jid}/{next(self._ids)}"
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            receptor.recibir(origen, mensaje_id, cuerpo)
+            return
+        # En la siguiente vuelta del loop, como si hubiera llegado por la red
+        self.locales_en_vuelo += 1
+        loop.call_soon(self._entregar_pendiente, receptor, origen, mensaje_id, cuerpo)
+
+    def _entregar_pendiente(self, receptor, origen, mensaje_id, cuerpo):
+        try:
+            receptor.recibir(origen, mensaje_id, cuerpo)
+        finally:
+            self.locales_en_vuelo -= 1
+
+    # --- Interfaz de algoritmo para el transporte físico ---------------------------
+
+    def recibir_cuerpo(self, remitente, mensaje_id, cuerpo):
+        sobre = desenvolver(cuerpo)
+        if sobre is None:
+            origen, destino = remitente, self.jid
+        else:
+            origen, destino, cuerpo = sobre
+        receptor = self.nodos.get(destino)
+        if receptor is None:
+            log.debug("%s descartó un mensaje de %s para %s: no lo atiende", self.jid, origen, destino)
+            return
+        receptor.recibir(origen, mensaje_id, cuerpo)
+
+    def agregar_vecino(self, host_jid):
+        """
+        Otro host (o un cliente común) se conectó: sus nodos están en línea.
+        """
+        for remoto in self._atendidos_por(host_jid):
+            for jid, transporte in self.nodos.items():
+                if self._son_vecinos(jid, remoto):
+                    transporte.vecino_conectado(remoto)
+
+    def eliminar_vecino(self, host_jid):
+        for remoto in self._atendidos_por(host_jid):
+            for jid, transporte in self.nodos.items():
+                if self._son_vecinos(jid, remoto):
+                    transporte.vecino_desconectado(remoto)
+
+    def _atendidos_por(self, host_jid):
+        atendidos = [jid for jid, host in self.directorio.items() if host == host_jid and jid not in self.nodos]
+        return atendidos or [host_jid]
+
+    async def iniciar(self):
+        # Los nodos del mismo host se ven entre sí antes de arrancar
+        for jid, transporte in self.nodos.items():
+            for otro in self.nodos:
+                if self._son_vecinos(jid, otro):
+                    transporte.vecino_conectado(otro)
+        await asyncio.gather(*(transporte.sesion_iniciada() for transporte in self.nodos.values()))
+
+    def contrapresion(self, activa):
+        # La cola de la conexión compartida frena a todos los nodos
+        for transporte in self.nodos.values():
+            transporte._avisar_contrapresion(activa)
+
+    def trabajo_pendiente(self):
+        if self.locales_en_vuelo:
+            return True
+        for transporte in self.nodos.values():
+            if transporte.planificador is not None and transporte.planificador.encolados:
+                return True
+            pendiente = getattr(transporte.algoritmo, 'trabajo_pendiente', None)
+            if pendiente is not None and pendiente():
+                return True
+        return False
+
+
+def envolver(origen, destino, cuerpo):
+    return f"{PREFIJO_SOBRE}{origen} {destino}\n{cuerpo}"
+
+def desenvolver(cuerpo):
+    """
+    (origen, destino, cuerpo) de un mensaje con sobre, o None si no lo tiene.
+    """
+    if not cuerpo.startswith(PREFIJO_SOBRE):
+        return None
+    fin = cuerpo.find('\n')
+    partes = cuerpo[len(PREFIJO_SOBRE):fin].split(' ') if fin > 0 else ()
+    if len(partes) != 2:
+        return None
+    return partes[0], partes[1], cuerpo[fin + 1:]
+
+
+# Ejemplo: un host con todos los nodos LSR de la topología del laboratorio
+if __name__ == "__main__":
+    from ConnectionXMPP import configurar_logging
+    from NetConfig import NetConfig
+    from LinkStateRouting import RoutingLSR
+    configurar_logging()
+
+    config = NetConfig()
+    host = HostNodos("sag18173@alumchat.lol", "pruebas")
+    for jid in config.node_map.values():
+        RoutingLSR(jid, None, config, transport=host.agregar_nodo(jid), interactive=False)
+    host.conectar()
@@ -0,0 +1,201 @@
+import asyncio
+from collections import deque
+
+DATOS = 0
+CONTROL = 1
+
+
+class _Cubeta:
+    """
+    Cubeta de fichas: `tasa` envíos por segundo con ráfagas de hasta `rafaga`.
+    """
+
+    def __init__(self, tasa, rafaga):
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self.fichas = rafaga
+        self.actualizada = None
+
+    def recargar(self, ahora):
+        if self.actualizada is not None:
+            self.fichas = min(self.rafaga, self.fichas + (ahora - self.actualizada) * self.tasa)
+        self.actualizada = ahora
+
+    def espera(self):
+        # Segundos hasta que haya una ficha completa
+        return 0.0 if self.fichas >= 1 else (1 - self.fichas) / self.tasa
+
+
+class CuerpoDiferido:
+    """
+    Cuerpo que se genera recién al salir de la cola: generar(espera) recibe los
+    segundos que estuvo encolado y devuelve el texto (lo usa el trazado de
+    paquetes para registrar la espera y la hora real de salida).
+    """
+    __slots__ = ('generar', 'encolado')
+
+    def __init__(self, generar):
+        self.generar = generar
+        self.encolado = None
+
+
+class PlanificadorEnvio:
+    """
+    Cola de salida por vecino para un transporte.
+
+    Cada destino tiene una cola de datos y otra de control; los datos salen
+    primero. Los mensajes que esperan juntos hacia el mismo destino se agrupan en
+    un solo envío (hasta `max_por_envio`), y los envíos respetan una tasa por
+    destino y otra global (None = sin límite).
+
+    Si lo encolado supera `umbral_alto`, se avisa al algoritmo con
+    contrapresion(True) y, al bajar de `umbral_bajo`, con contrapresion(False).
+    Por encima de `capacidad` se descartan primero los mensajes de control más
+    antiguos.
+    """
+
+    def __init__(self, enviar, agrupar, tasa_por_destino=None, rafaga_por_destino=5,
+                 tasa_global=None, rafaga_global=20, max_por_envio=16, ventana_agrupacion=0.0,
+                 umbral_alto=500, umbral_bajo=100, capacidad=5000, al_cambiar_contrapresion=None):
+        self.enviar = enviar  # Envía un cuerpo ya listo: enviar(destino, cuerpo)
+        self.agrupar = agrupar  # Une varios cuerpos en uno: agrupar([cuerpos]) -> cuerpo
+        self.max_por_envio = max_por_envio
+        self.ventana_agrupacion = ventana_agrupacion
+        self.umbral_alto = umbral_alto
+        self.umbral_bajo = umbral_bajo
+        self.capacidad = capacidad
+        self.al_cambiar_contrapresion = al_cambiar_contrapresion
+
+        self.tasa_por_destino = tasa_por_destino
+        self.rafaga_por_destino = rafaga_por_destino
+        self.cubeta_global = _Cubeta(tasa_global, rafaga_global) if tasa_global else None
+        self.cubetas = {}  # destino -> _Cubeta
+        self.colas = {}  # destino -> (deque de datos, deque de control)
+
+        self.encolados = 0
+        self.contrapresion = False
+        self._vaciado = None
+
+        # Contadores
+        self.envios = 0
+        self.mensajes_enviados = 0
+        self.mensajes_agrupados = 0
+        self.descartados = 0
+
+    def profundidad(self, destino=None):
+        if destino is None:
+            return self.encolados
+        datos, control = self.colas.get(destino, ((), ()))
+        return len(datos) + len(control)
+
+    def encolar(self, destino, cuerpo, prioridad=CONTROL):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Sin event loop no hay a quién delegar el envío
+            self.envios += 1
+            self.mensajes_enviados += 1
+            self.enviar(destino, cuerpo.generar(0.0) if isinstance(cuerpo, CuerpoDiferido) else cuerpo)
+            return
+
+        if isinstance(cuerpo, CuerpoDiferido):
+            cuerpo.encolado = loop.time()
+        colas = self.colas.setdefault(destino, (deque(), deque()))
+        colas[prioridad].append(cuerpo)
+        self.encolados += 1
+        if self.encolados > self.capacidad:
+            self._descartar()
+        self._revisar_contrapresion()
+
+        # Un vaciado lejano (esperando fichas de otro destino) se adelanta
+        cuando = loop.time() + self.ventana_agrupacion
+        if self._vaciado is not None and self._vaciado.when() > cuando:
+            self._vaciado.cancel()
+            self._vaciado = None
+        if self._vaciado is None:
+            self._vaciado = loop.call_at(cuando, self._vaciar)
+
+    def _descartar(self):
+        # Control antes que datos; dentro de cada cola, el más antiguo
+        for prioridad in (CONTROL, DATOS):
+            cola_mayor = max(self.colas.values(), key=lambda colas: len(colas[prioridad]))
+            if cola_mayor[prioridad]:
+                cola_mayor[prioridad].popleft()
+                self.encolados -= 1
+                self.descartados += 1
+                return
+
+    def _revisar_contrapresion(self):
+        if not self.contrapresion and self.encolados >= self.umbral_alto:
+            self.contrapresion = True
+        elif self.contrapresion and self.encolados <= self.umbral_bajo:
+            self.contrapresion = False
+        else:
+            return
+        if self.al_cambiar_contrapresion is not None:
+            self.al_cambiar_contrapresion(self.contrapresion)
+
+    def _vaciar(self):
+        self._vaciado = None
+        loop = asyncio.get_running_loop()
+        ahora = loop.time()
+        proxima_espera = None
+
+        if self.cubeta_global is not None:
+            self.cubeta_global.recargar(ahora)
+
+        for destino in list(self.colas):
+            datos, control = self.colas[destino]
+            cubeta = self._cubeta(destino, ahora)
+            while datos or control:
+                espera = max(cubeta.espera() if cubeta else 0.0,
+                             self.cubeta_global.espera() if self.cubeta_global else 0.0)
+                if espera > 0:
+                    proxima_espera = espera if proxima_espera is None else min(proxima_espera, espera)
+                    break
+
+                lote = []
+                for cola in (datos, control):
+                    while cola and len(lote) < self.max_por_envio:
+                        cuerpo = cola.popleft()
+                        if isinstance(cuerpo, CuerpoDiferido):
+                            cuerpo = cuerpo.generar(ahora - cuerpo.encolado)
+                        lote.append(cuerpo)
+                self.encolados -= len(lote)
+
+                if cubeta:
+                    cubeta.fichas -= 1
+                if self.cubeta_global:
+                    self.cubeta_global.fichas -= 1
+                self.envios += 1
+                self.mensajes_enviados += len(lote)
+                if len(lote) > 1:
+                    self.mensajes_agrupados += len(lote)
+                self.enviar(destino, lote[0] if len(lote) == 1 else self.agrupar(lote))
+
+            if not datos and not control:
+                del self.colas[destino]
+
+        self._revisar_contrapresion()
+        if proxima_espera is not None:
+            self._vaciado = loop.call_later(proxima_espera, self._vaciar)
+
+    def _cubeta(self, destino, ahora):
+        if not self.tasa_por_destino:
+            return None
+        cubeta = self.cubetas.get(destino)
+        if cubeta is None:
+            cubeta = _Cubeta(self.tasa_por_destino, self.rafaga_por_destino)
+            self.cubetas[destino] = cubeta
+        cubeta.recargar(ahora)
+        return cubeta
+
+    def estadisticas(self):
+        return {
+            'encolados': self.encolados,
+            'envios': self.envios,
+            'mensajes_enviados': self.mensajes_enviados,
+            'mensajes_agrupados': self.mensajes_agrupados,
+            'descartados': self.descartados,
+            'contrapresion': self.contrapresion,
+        }
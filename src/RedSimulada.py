@@ -0,0 +1,203 @@
+import asyncio
+import itertools
+import random
+
+from Transporte import Transporte
+
+
+class EnlaceSimulado:
+    """
+    Parámetros de un sentido de un enlace: latencia (s), probabilidad de pérdida
+    y ancho de banda (bytes/s, None = ilimitado).
+    """
+
+    def __init__(self, latencia=0.0, perdida=0.0, ancho_banda=None):
+        self.latencia = latencia
+        self.perdida = perdida
+        self.ancho_banda = ancho_banda
+        self.libre_en = 0.0  # Momento en que el enlace termina de transmitir lo encolado
+
+
+class TransporteSimulado(Transporte):
+    """
+    Transporte de un nodo dentro de una RedSimulada.
+    """
+
+    def __init__(self, red, jid, algoritmo=None, codec=None):
+        super().__init__(algoritmo, codec)
+        self.red = red
+        self.jid = jid
+
+    @property
+    def jid_propio(self):
+        return self.jid
+
+    def enviar(self, destino, cuerpo):
+        self.red.transmitir(self.jid, destino, cuerpo)
+
+
+class RedSimulada:
+    """
+    Red en memoria sobre un solo event loop de asyncio. Cada nodo obtiene un
+    TransporteSimulado con agregar_nodo() y los enlaces se declaran con conectar().
+
+    Los mensajes entre nodos sin enlace declarado se entregan con el enlace por
+    defecto, igual que el servidor XMPP entrega a cualquier JID; los destinos que
+    no existen se descartan.
+
+    Un nodo puede vivir en otra red (otro proceso, ver SimulacionDistribuida): se
+    registra con agregar_remoto() y lo que se le envía pasa por el mismo modelo de
+    latencia, pérdida y ancho de banda antes de entregarse a la función puente con
+    la hora de llegada; la otra red lo recibe con entregar_remoto().
+    `prefijo` distingue los ids de mensaje de cada red.
+    """
+
+    def __init__(self, latencia_defecto=0.0, semilla=None, prefijo='sim'):
+        self.nodos = {}  # jid -> TransporteSimulado
+        self.remotos = {}  # jid -> puente(origen, destino, mensaje_id, cuerpo, llegada)
+        self.prefijo = prefijo
+        self.enlaces = {}  # (origen, destino) -> EnlaceSimulado
+        self.vecinos = {}  # jid -> set de jids con enlace declarado
+        self.latencia_defecto = latencia_defecto
+        self.aleatorio = random.Random(semilla)
+        self._ids = itertools.count()
+        self._inactiva = asyncio.Event()
+        self._inactiva.set()
+
+        # Contadores
+        self.en_vuelo = 0
+        self.mensajes_enviados = 0
+        self.mensajes_entregados = 0
+        self.mensajes_perdidos = 0
+        self.bytes_enviados = 0
+        self.remotos_enviados = 0
+        self.remotos_recibidos = 0
+        self.ultima_entrega = None  # Hora del loop de la última entrega
+
+    def agregar_nodo(self, jid, algoritmo=None, codec=None):
+        transporte = TransporteSimulado(self, jid, algoritmo, codec)
+        self.nodos[jid] = transporte
+        self.vecinos.setdefault(jid, set())
+        return transporte
+
+    def agregar_remoto(self, jid, puente):
+        self.remotos[jid] = puente
+        self.vecinos.setdefault(jid, set())
+
+    def conectar(self, a, b, latencia=None, perdida=0.0, ancho_banda=None, bidireccional=True):
+        if latencia is None:
+            latencia = self.latencia_defecto
+        self.enlaces[(a, b)] = EnlaceSimulado(latencia, perdida, ancho_banda)
+        self.vecinos.setdefault(a, set()).add(b)
+        if bidireccional:
+            self.enlaces[(b, a)] = EnlaceSimulado(latencia, perdida, ancho_banda)
+            self.vecinos.setdefault(b, set()).add(a)
+
+    def desconectar(self, a, b):
+        """
+        Corta el enlace entre a y b en ambos sentidos y avisa a los dos extremos,
+        como si cada uno viera al otro desconectarse.
+        """
+        self.enlaces.pop((a, b), None)
+        self.enlaces.pop((b, a), None)
+        self.vecinos.get(a, set()).discard(b)
+        self.vecinos.get(b, set()).discard(a)
+        if a in self.nodos:
+            self.nodos[a].vecino_desconectado(b)
+        if b in self.nodos:
+            self.nodos[b].vecino_desconectado(a)
+
+    def transmitir(self, origen, destino, cuerpo):
+        tamano = len(cuerpo.encode('utf-8'))
+        self.mensajes_enviados += 1
+        self.bytes_enviados += tamano
+
+        receptor = self.nodos.get(destino)
+        puente = self.remotos.get(destino) if receptor is None else None
+        enlace = self.enlaces.get((origen, destino))
+        if enlace is None:
+            enlace = EnlaceSimulado(self.latencia_defecto)
+
+        if (receptor is None and puente is None) or (enlace.perdida and self.aleatorio.random() < enlace.perdida):
+            self.mensajes_perdidos += 1
+            return
+
+        loop = asyncio.get_running_loop()
+        ahora = loop.time()
+        salida = ahora
+        if enlace.ancho_banda:
+            # Los mensajes se serializan en el enlace uno detrás de otro
+            salida = max(ahora, enlace.libre_en) + tamano / enlace.ancho_banda
+            enlace.libre_en = salida
+
+        mensaje_id = f"{self.prefijo}-{next(self._ids)}"
+        if puente is not None:
+            self.remotos_enviados += 1
+            puente(origen, destino, mensaje_id, cuerpo, salida + enlace.latencia)
+            return
+        self.en_vuelo += 1
+        self._inactiva.clear()
+        loop.call_later(salida - ahora + enlace.latencia, self._entregar, receptor, origen, mensaje_id, cuerpo)
+
+    def entregar_remoto(self, origen, destino, mensaje_id, cuerpo, llegada):
+        """
+        Recibe un mensaje transmitido por otra red; se entrega a la hora `llegada`
+        del reloj monotónico (o enseguida si ya pasó).
+        """
+        self.remotos_recibidos += 1
+        receptor = self.nodos.get(destino)
+        if receptor is None:
+            self.mensajes_perdidos += 1
+            return
+        self.en_vuelo += 1
+        self._inactiva.clear()
+        asyncio.get_running_loop().call_at(llegada, self._entregar, receptor, origen, mensaje_id, cuerpo)
+
+    def _entregar(self, receptor, origen, mensaje_id, cuerpo):
+        try:
+            receptor.recibir(origen, mensaje_id, cuerpo)
+            self.mensajes_entregados += 1
+            self.ultima_entrega = asyncio.get_running_loop().time()
+        finally:
+            self.en_vuelo -= 1
+            if self.en_vuelo == 0:
+                self._inactiva.set()
+
+    async def iniciar(self):
+        """
+        Simula el inicio de sesión de todos los nodos: cada uno ve en línea a sus
+        vecinos declarados y luego se dispara su evento de sesión iniciada.
+        """
+        for jid, transporte in self.nodos.items():
+            for vecino in self.vecinos[jid]:
+                transporte.vecino_conectado(vecino)
+        await asyncio.gather(*(t.sesion_iniciada() for t in self.nodos.values()))
+
+    def trabajo_pendiente(self):
+        """
+        True si algún algoritmo tiene un envío programado que aún no salió
+        (por ejemplo, un anuncio retenido por un temporizador o en una cola de salida).
+        """
+        for transporte in self.nodos.values():
+            if transporte.planificador is not None and transporte.planificador.encolados:
+                return True
+            pendiente = getattr(transporte.algoritmo, 'trabajo_pendiente', None)
+            if pendiente is not None and pendiente():
+                return True
+        return False
+
+    async def esperar_inactividad(self, silencio=0.0, sondeo=0.01):
+        """
+        Espera hasta que no quede ningún mensaje en vuelo ni envíos programados
+        durante `silencio` segundos.
+        """
+        while True:
+            await self._inactiva.wait()
+            if self.trabajo_pendiente():
+                await asyncio.sleep(sondeo)
+                continue
+            if silencio <= 0:
+                return
+            await asyncio.sleep(silencio)
+            if self.en_vuelo == 0 and not self.trabajo_pendiente():
+                return
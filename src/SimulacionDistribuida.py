@@ -0,0 +1,470 @@
+import argparse
+import asyncio
+import heapq
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+
+from RedSimulada import RedSimulada
+from CodecMensajes import CodecMensajes
+from Flooding import DifusionAlgoritmo, topologia_por_jid
+from DistanVR import DistanceVectorRouting
+from LinkStateRouting import RoutingLSR
+
+# Variantes de Flooding y su modo de difusión
+ALGORITMOS_DIFUSION = {
+    'flooding': 'inundacion',
+    'flooding-arbol': 'arbol',
+    'flooding-rpf': 'rpf',
+}
+ALGORITMOS = list(ALGORITMOS_DIFUSION) + ['dvr', 'lsr']
+
+# Un solo echo por enlace al conectarse: el sondeo periódico no dejaría a la red en silencio
+SONDEO_UNICO = {'intervalo': None}
+
+
+def crear_algoritmo(algoritmo, jid, transporte, config, topologia=None):
+    """
+    Instancia de un algoritmo configurada para simulación: sin refrescos ni
+    sondeos periódicos, para que la red llegue a quedar en silencio. topologia
+    ({jid: vecinos}) solo la usan los modos de difusión por árbol.
+    """
+    if algoritmo == 'lsr':
+        return RoutingLSR(jid, None, config, transport=transporte, interactive=False, probe=SONDEO_UNICO)
+    if algoritmo == 'dvr':
+        return DistanceVectorRouting(jid, None, transporte=transporte, intervalo_refresco=None,
+                                     sondeo=SONDEO_UNICO)
+    if algoritmo in ALGORITMOS_DIFUSION:
+        modo = ALGORITMOS_DIFUSION[algoritmo]
+        return DifusionAlgoritmo(jid, None, transporte=transporte, modo=modo,
+                                 topologia=topologia if modo != 'inundacion' else None,
+                                 ttl=len(config.topo_map))
+    raise ValueError(f"Algoritmo desconocido: {algoritmo}")
+
+
+# --- Partición -----------------------------------------------------------------
+
+def particionar(config, partes, pasadas=8, paciencia=50):
+    """
+    Reparte los nodos de un NetConfig en `partes` grupos del mismo tamaño (±1)
+    cortando pocos enlaces. Devuelve {nodo: parte}.
+
+    Es una bisección recursiva: cada grupo se ordena en anchura desde un nodo
+    periférico y se corta en dos (en proporción a las partes de cada mitad);
+    después se mejora el corte con hasta `pasadas` pasadas de intercambios de
+    pares al estilo Kernighan-Lin, que mantienen el tamaño de cada mitad.
+    """
+    enlaces = config.undirected_links()
+    nodos = sorted(enlaces)
+    partes = max(1, min(partes, len(nodos)))
+    asignacion = {}
+    _biseccionar(enlaces, nodos, 0, partes, asignacion, pasadas, paciencia)
+    return asignacion
+
+def enlaces_cortados(config, asignacion):
+    return sum(1 for nodo, vecinos in config.undirected_links().items()
+               for vecino in vecinos if nodo < vecino and asignacion[nodo] != asignacion[vecino])
+
+def _biseccionar(enlaces, nodos, primera, partes, asignacion, pasadas, paciencia):
+    if partes == 1:
+        for nodo in nodos:
+            asignacion[nodo] = primera
+        return
+
+    # Orden en anchura por componentes, empezando cada una por un nodo alejado
+    dentro = set(nodos)
+    orden = []
+    vistos = set()
+    for inicio in nodos:
+        if inicio in vistos:
+            continue
+        inicio = _recorrido_anchura(enlaces, inicio, dentro)[-1]
+        componente = _recorrido_anchura(enlaces, inicio, dentro)
+        vistos.update(componente)
+        orden.extend(componente)
+
+    izquierda = partes // 2
+    corte = round(len(orden) * izquierda / partes)
+    lado = {nodo: int(indice >= corte) for indice, nodo in enumerate(orden)}
+    for _ in range(pasadas):
+        if not _pasada_intercambios(enlaces, lado, paciencia):
+            break
+    _biseccionar(enlaces, [nodo for nodo in orden if not lado[nodo]], primera, izquierda,
+                 asignacion, pasadas, paciencia)
+    _biseccionar(enlaces, [nodo for nodo in orden if lado[nodo]], primera + izquierda, partes - izquierda,
+                 asignacion, pasadas, paciencia)
+
+def _pasada_intercambios(enlaces, lado, paciencia):
+    """
+    Una pasada de Kernighan-Lin sobre la bisección `lado` ({nodo: 0 o 1}):
+    intercambia el nodo de mayor ganancia de cada lado aunque empeore el corte,
+    sin volver a mover ninguno, y al final deshace los intercambios posteriores
+    al mejor punto. Corta tras `paciencia` intercambios sin mejorar. Devuelve
+    cuántos enlaces menos quedaron cortados.
+    """
+    def ganancia(nodo):
+        # Enlaces cortados de menos si el nodo cambiara de lado
+        propio = lado[nodo]
+        total = 0
+        for vecino in enlaces[nodo]:
+            otro = lado.get(vecino)
+            if otro is not None:
+                total += 1 if otro != propio else -1
+        return total
+
+    # Montículos por lado con la ganancia negada; se corrigen al sacarlos
+    monticulos = ([], [])
+    for nodo in lado:
+        monticulos[lado[nodo]].append((-ganancia(nodo), nodo))
+    for monticulo in monticulos:
+        heapq.heapify(monticulo)
+
+    movidos = set()
+    intercambios = []
+    acumulada = mejor = 0
+    mejor_en = 0
+    while len(intercambios) - mejor_en < paciencia:
+        elegidos = []
+        for monticulo in monticulos:
+            while monticulo:
+                negada, nodo = monticulo[0]
+                if nodo in movidos:
+                    heapq.heappop(monticulo)
+                elif -ganancia(nodo) != negada:
+                    heapq.heapreplace(monticulo, (-ganancia(nodo), nodo))
+                else:
+                    elegidos.append(heapq.heappop(monticulo))
+                    break
+        if len(elegidos) < 2:
+            break
+        (negada_a, a), (negada_b, b) = elegidos
+        # Si son vecinos, su enlace sigue cortado después del intercambio
+        acumulada += -negada_a - negada_b - (2 if b in enlaces[a] else 0)
+        lado[a], lado[b] = 1, 0
+        movidos.update((a, b))
+        intercambios.append((a, b))
+        if acumulada > mejor:
+            mejor, mejor_en = acumulada, len(intercambios)
+
+    for a, b in intercambios[mejor_en:]:
+        lado[a], lado[b] = 0, 1
+    return mejor
+
+def _recorrido_anchura(enlaces, inicio, dentro):
+    orden = [inicio]
+    vistos = {inicio}
+    for nodo in orden:
+        for vecino in sorted(enlaces[nodo]):
+            if vecino in dentro and vecino not in vistos:
+                vistos.add(vecino)
+                orden.append(vecino)
+    return orden
+
+
+# --- Proceso de cada fragmento -------------------------------------------------
+
+class _Fragmento:
+    """
+    Los nodos de una parte corriendo en una RedSimulada propia. Los enlaces con
+    nodos de otras partes se declaran solo en el sentido saliente; lo que se
+    transmite por ellos se junta por destino y sale en un solo put() por vuelta
+    del event loop hacia el buzón del otro proceso.
+    """
+
+    def __init__(self, indice, algoritmo, config, asignacion, opciones, buzones, respuestas):
+        self.indice = indice
+        self.algoritmo = algoritmo
+        self.config = config
+        self.asignacion = {config.node_map[nodo]: parte for nodo, parte in asignacion.items()}
+        self.buzones = buzones
+        self.respuestas = respuestas
+        self.opciones = opciones
+        self.salientes = {}  # parte -> [(origen, destino, id, cuerpo, llegada)]
+        self.entregas = {}  # (nodo, contenido) -> hora de llegada
+        self.terminado = None
+
+    def construir(self):
+        opciones = self.opciones
+        self.red = RedSimulada(latencia_defecto=opciones['latencia'], semilla=f"{opciones['semilla']}-{self.indice}",
+                               prefijo=f"sim{self.indice}")
+        if opciones.get('internar'):
+            codec = CodecMensajes.desde_config(self.config, modo=opciones.get('codec', 'json'))
+        else:
+            codec = CodecMensajes(modo=opciones.get('codec', 'json'))
+        topologia = topologia_por_jid(self.config) if self.algoritmo in ('flooding-arbol', 'flooding-rpf') else None
+
+        self.nodos = {}
+        for nodo, jid in self.config.node_map.items():
+            if self.asignacion[jid] != self.indice:
+                continue
+            transporte = self.red.agregar_nodo(jid, codec=codec)
+            if opciones.get('planificador') is not None:
+                transporte.usar_planificador(**opciones['planificador'])
+            instancia = crear_algoritmo(self.algoritmo, jid, transporte, self.config, topologia)
+            if self.algoritmo == 'lsr':
+                instancia.on_message = self._registrador(nodo)
+            elif self.algoritmo in ALGORITMOS_DIFUSION:
+                instancia.al_entregar = self._registrador(nodo)
+            self.nodos[nodo] = instancia
+
+        for nodo, vecinos in self.config.undirected_links().items():
+            jid = self.config.node_map[nodo]
+            if self.asignacion[jid] != self.indice:
+                continue
+            for vecino in vecinos:
+                vecino_jid = self.config.node_map[vecino]
+                if self.asignacion[vecino_jid] == self.indice:
+                    if nodo < vecino:
+                        self.red.conectar(jid, vecino_jid, opciones['latencia'], opciones['perdida'])
+                else:
+                    self.red.agregar_remoto(vecino_jid, self._puente)
+                    self.red.conectar(jid, vecino_jid, opciones['latencia'], opciones['perdida'],
+                                      bidireccional=False)
+
+    def _registrador(self, nodo):
+        def registrar(origen, contenido):
+            if isinstance(contenido, str) and contenido.startswith("bench:"):
+                self.entregas.setdefault((nodo, contenido), time.monotonic())
+        return registrar
+
+    def _puente(self, origen, destino, mensaje_id, cuerpo, llegada):
+        parte = self.asignacion[destino]
+        if not self.salientes:
+            asyncio.get_running_loop().call_soon(self._vaciar_salientes)
+        self.salientes.setdefault(parte, []).append((origen, destino, mensaje_id, cuerpo, llegada))
+
+    def _vaciar_salientes(self):
+        salientes, self.salientes = self.salientes, {}
+        for parte, mensajes in salientes.items():
+            self.buzones[parte].put(('mensajes', mensajes))
+
+    def _leer_buzon(self, loop):
+        # Hilo que bloquea en el buzón y pasa cada lote al event loop
+        while True:
+            elemento = self.buzones[self.indice].get()
+            loop.call_soon_threadsafe(self._procesar, elemento)
+            if elemento[0] == 'terminar':
+                return
+
+    def _procesar(self, elemento):
+        tipo = elemento[0]
+        if tipo == 'mensajes':
+            for mensaje in elemento[1]:
+                self.red.entregar_remoto(*mensaje)
+        elif tipo == 'terminar':
+            self.terminado.set()
+        else:
+            asyncio.ensure_future(self._ejecutar(tipo, *elemento[1:]))
+
+    async def _ejecutar(self, orden, *argumentos):
+        if orden == 'iniciar':
+            await self.red.iniciar()
+            respuesta = True
+        elif orden == 'estado':
+            respuesta = {
+                'inactiva': self.red.en_vuelo == 0 and not self.salientes and not self.red.trabajo_pendiente(),
+                'remotos_enviados': self.red.remotos_enviados,
+                'remotos_recibidos': self.red.remotos_recibidos,
+                'mensajes_enviados': self.red.mensajes_enviados,
+                'ultima_entrega': self.red.ultima_entrega,
+            }
+        elif orden == 'enviar':
+            respuesta = [self._enviar_dato(*dato) for dato in argumentos[0]]
+        elif orden == 'resultados':
+            respuesta = {
+                'nodos': len(self.nodos),
+                'mensajes_enviados': self.red.mensajes_enviados,
+                'mensajes_entregados': self.red.mensajes_entregados,
+                'mensajes_perdidos': self.red.mensajes_perdidos,
+                'bytes_enviados': self.red.bytes_enviados,
+                'remotos_enviados': self.red.remotos_enviados,
+                'entregas': self.entregas,
+            }
+        else:
+            respuesta = ValueError(f"Orden desconocida: {orden}")
+        self.respuestas.put((self.indice, respuesta))
+
+    def _enviar_dato(self, origen, destino, contenido):
+        instancia = self.nodos[origen]
+        if self.algoritmo == 'lsr':
+            instancia.send_data(destino, contenido)
+        elif self.algoritmo in ALGORITMOS_DIFUSION:
+            instancia.difundir(contenido)
+        else:
+            return False
+        return True
+
+    async def correr(self):
+        loop = asyncio.get_running_loop()
+        self.terminado = asyncio.Event()
+        self.construir()
+        lector = threading.Thread(target=self._leer_buzon, args=(loop,), daemon=True)
+        lector.start()
+        self.respuestas.put((self.indice, 'listo'))
+        await self.terminado.wait()
+
+
+def _trabajador(indice, algoritmo, config, asignacion, opciones, buzones, respuestas):
+    try:
+        asyncio.run(_Fragmento(indice, algoritmo, config, asignacion, opciones, buzones, respuestas).correr())
+    except BaseException as error:
+        respuestas.put((indice, error))
+        raise
+
+
+# --- Coordinador ---------------------------------------------------------------
+
+class SimulacionDistribuida:
+    """
+    Simula una red de un NetConfig repartida entre varios procesos.
+
+    La topología se parte con particionar() y cada parte corre en su propio
+    proceso con una RedSimulada; los enlaces que cruzan partes usan el mismo
+    modelo de latencia, pérdida y ancho de banda (lo aplica la red emisora) y
+    viajan por colas de multiprocessing con la hora de llegada en el reloj
+    monotónico, que comparten todos los procesos de la máquina. Si el IPC tarda
+    más que la latencia simulada, el mensaje se entrega apenas llega.
+
+    La red está inactiva cuando ninguna parte tiene mensajes en vuelo ni trabajo
+    programado y todo lo enviado entre procesos ya se recibió, dos consultas
+    seguidas sin envíos nuevos entre medio.
+    """
+
+    def __init__(self, config, algoritmo, procesos=None, latencia=0.001, perdida=0.0, semilla=0,
+                 codec='json', internar=False, planificador=None, espera=60.0):
+        self.config = config
+        self.procesos = procesos or os.cpu_count() or 1
+        self.espera = espera  # Segundos máximos para cada respuesta de un proceso
+        self.asignacion = particionar(config, self.procesos)
+        self.procesos = max(self.asignacion.values()) + 1
+        opciones = {'latencia': latencia, 'perdida': perdida, 'semilla': semilla,
+                    'codec': codec, 'internar': internar, 'planificador': planificador}
+
+        contexto = multiprocessing.get_context()
+        self.buzones = [contexto.Queue() for _ in range(self.procesos)]
+        self.respuestas = contexto.Queue()
+        self.trabajadores = [
+            contexto.Process(target=_trabajador, daemon=True,
+                             args=(indice, algoritmo, config, self.asignacion, opciones, self.buzones,
+                                   self.respuestas))
+            for indice in range(self.procesos)
+        ]
+        for trabajador in self.trabajadores:
+            trabajador.start()
+        self._recoger()  # Cada proceso avisa cuando terminó de construir sus nodos
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def _recoger(self):
+        respuestas = [None] * self.procesos
+        for _ in range(self.procesos):
+            try:
+                indice, respuesta = self.respuestas.get(timeout=self.espera)
+            except queue.Empty:
+                raise TimeoutError("Un proceso de la simulación no respondió.") from None
+            if isinstance(respuesta, BaseException):
+                raise RuntimeError(f"Falló el proceso {indice}") from respuesta
+            respuestas[indice] = respuesta
+        return respuestas
+
+    def _ordenar(self, orden, por_parte=None):
+        # por_parte: un argumento distinto para cada proceso
+        for indice, buzon in enumerate(self.buzones):
+            buzon.put((orden,) if por_parte is None else (orden, por_parte[indice]))
+        return self._recoger()
+
+    def iniciar(self):
+        self._ordenar('iniciar')
+
+    def estado(self):
+        return self._ordenar('estado')
+
+    def esperar_inactividad(self, silencio=0.05, sondeo=0.01):
+        anterior = None
+        while True:
+            estados = self.estado()
+            inactiva = (all(estado['inactiva'] for estado in estados)
+                        and sum(estado['remotos_enviados'] for estado in estados)
+                        == sum(estado['remotos_recibidos'] for estado in estados))
+            firma = tuple(estado['mensajes_enviados'] for estado in estados)
+            if inactiva and firma == anterior:
+                return estados
+            anterior = firma if inactiva else None
+            time.sleep(silencio if inactiva else sondeo)
+
+    def enviar_datos(self, datos):
+        """
+        Origina paquetes [(nodo origen, nodo destino, contenido)] en los procesos
+        dueños de cada origen.
+        """
+        por_parte = [[] for _ in range(self.procesos)]
+        for origen, destino, contenido in datos:
+            por_parte[self.asignacion[origen]].append((origen, destino, contenido))
+        return self._ordenar('enviar', por_parte)
+
+    def resultados(self):
+        return self._ordenar('resultados')
+
+    def cerrar(self):
+        for buzon in self.buzones:
+            buzon.put(('terminar',))
+        for trabajador in self.trabajadores:
+            trabajador.join(timeout=self.espera)
+            if trabajador.is_alive():
+                trabajador.terminate()
+
+
+def main(argv=None):
+    from Benchmark import TOPOLOGIAS
+    from NetConfig import NetConfig
+
+    parser = argparse.ArgumentParser(description="Simulación de una red grande repartida entre varios procesos.")
+    parser.add_argument('--algoritmo', default='lsr', choices=ALGORITMOS)
+    parser.add_argument('--topologia', default='grid', choices=sorted(TOPOLOGIAS))
+    parser.add_argument('--tamano', type=int, default=1000)
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--latencia', type=float, default=0.001)
+    parser.add_argument('--perdida', type=float, default=0.0)
+    parser.add_argument('--paquetes', type=int, default=10)
+    parser.add_argument('--silencio', type=float, default=0.2)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    topo = TOPOLOGIAS[args.topologia](args.tamano, semilla=args.semilla)
+    config = NetConfig(topo_map=topo, node_map={nodo: f"{nodo.lower()}@sim.local" for nodo in topo})
+    reloj = time.perf_counter()
+    with SimulacionDistribuida(config, args.algoritmo, args.procesos, args.latencia, args.perdida,
+                               args.semilla) as simulacion:
+        print(f"{len(topo)} nodos en {simulacion.procesos} procesos, "
+              f"{enlaces_cortados(config, simulacion.asignacion)} enlaces cortados "
+              f"({time.perf_counter() - reloj:.1f}s de arranque)")
+        inicio = time.monotonic()
+        simulacion.iniciar()
+        estados = simulacion.esperar_inactividad(args.silencio)
+        ultima = max((estado['ultima_entrega'] or inicio for estado in estados), default=inicio)
+        print(f"convergencia={ultima - inicio:.3f}s "
+              f"mensajes={sum(estado['mensajes_enviados'] for estado in estados)}")
+
+        aleatorio = random.Random(args.semilla)
+        datos = [(*aleatorio.sample(list(topo), 2), f"bench:{i}") for i in range(args.paquetes)]
+        if not any(any(enviados) for enviados in simulacion.enviar_datos(datos)):
+            print(f"{args.algoritmo} no transporta paquetes de datos")
+            return
+        simulacion.esperar_inactividad(args.silencio)
+        entregas = {}
+        for resultado in simulacion.resultados():
+            entregas.update(resultado['entregas'])
+        recibidos = sum(1 for _, destino, contenido in datos if (destino, contenido) in entregas)
+        print(f"paquetes entregados: {recibidos}/{len(datos)} "
+              f"(tiempo real total {time.perf_counter() - reloj:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import random
+import time
+
+log = logging.getLogger(__name__)
+
+
+class _EstadoVecino:
+    def __init__(self):
+        self.srtt = None  # RTT suavizado (segundos)
+        self.rttvar = None  # Variación del RTT (segundos)
+        self.costo = None  # Último costo publicado
+        self.pendiente = None  # (secuencia, instante de envío) del sondeo en curso
+        self.perdidas_seguidas = 0
+        self.enviados = 0
+        self.perdidos = 0
+        self.temporizador = None  # Próximo sondeo periódico
+        self.expiracion = None  # Vencimiento del sondeo en curso
+
+
+class SondeoEnlaces:
+    """
+    Mide la calidad de los enlaces con echos periódicos, común a los tres algoritmos.
+
+    Cada vecino se sondea cada `intervalo` segundos con una fluctuación aleatoria
+    de ±`fluctuacion` (fracción del intervalo) para que los nodos no se
+    sincronicen; con intervalo None solo se sondea al agregar el vecino o al
+    llamar a sondear(). Las respuestas actualizan un RTT suavizado y su variación
+    como en TCP (RFC 6298, pesos `alfa` y `beta`). Un echo sin respuesta en
+    `espera` segundos cuenta como perdido y, tras `perdidas_maximas` seguidos, se
+    llama a al_perder_vecino(vecino). Si toca sondear mientras el echo anterior
+    todavía está dentro de su espera, no se envía otro: se espera al siguiente
+    intervalo.
+
+    El costo del enlace es costo(srtt) y solo se publica con
+    al_cambiar_costo(vecino, costo) la primera vez o cuando difiere del último
+    publicado en más de `umbral` (fracción), así el ruido de cada muestra no
+    dispara anuncios nuevos.
+
+    enviar_echo(vecino, secuencia) lo implementa el algoritmo; la secuencia debe
+    volver en la respuesta y pasarse a recibir_respuesta().
+    """
+
+    def __init__(self, enviar_echo, al_cambiar_costo, intervalo=5.0, fluctuacion=0.25, espera=2.0,
+                 alfa=0.125, beta=0.25, umbral=0.2, perdidas_maximas=3, costo=None,
+                 al_perder_vecino=None, azar=None, reloj=time.monotonic):
+        self.enviar_echo = enviar_echo
+        self.al_cambiar_costo = al_cambiar_costo
+        self.al_perder_vecino = al_perder_vecino
+        self.intervalo = intervalo
+        self.fluctuacion = fluctuacion
+        self.espera = espera
+        self.alfa = alfa
+        self.beta = beta
+        self.umbral = umbral
+        self.perdidas_maximas = perdidas_maximas
+        self.costo = costo if costo is not None else (lambda rtt: rtt)
+        self.azar = azar if azar is not None else random.Random()
+        self.reloj = reloj
+        self.vecinos = {}  # vecino -> _EstadoVecino
+        self.secuencia = 0
+
+    @classmethod
+    def from_config(cls, enviar_echo, al_cambiar_costo, config, **kwargs):
+        """
+        Crea el sondeo a partir de un diccionario de opciones (o None para los valores por defecto).
+        """
+        return cls(enviar_echo, al_cambiar_costo, **dict(kwargs, **(config or {})))
+
+    def agregar_vecino(self, vecino):
+        """
+        Empieza a sondear un vecino; el primer echo sale de inmediato.
+        """
+        if vecino in self.vecinos:
+            return
+        self.vecinos[vecino] = _EstadoVecino()
+        self.sondear(vecino)
+
+    def quitar_vecino(self, vecino):
+        estado = self.vecinos.pop(vecino, None)
+        if estado is not None:
+            for temporizador in (estado.temporizador, estado.expiracion):
+                if temporizador is not None:
+                    temporizador.cancel()
+
+    def detener(self):
+        for vecino in list(self.vecinos):
+            self.quitar_vecino(vecino)
+
+    def sondear(self, vecino):
+        estado = self.vecinos.get(vecino)
+        if estado is None:
+            return
+        estado.temporizador = None
+        if estado.pendiente is not None:
+            if self.espera is not None and self.reloj() - estado.pendiente[1] < self.espera:
+                # El sondeo anterior aún puede contestar: se deja correr
+                self._programar(vecino, estado)
+                return
+            # El sondeo anterior sigue sin respuesta: se cuenta antes de reemplazarlo
+            self._vencer(vecino)
+            if vecino not in self.vecinos:
+                return
+
+        self.secuencia += 1
+        estado.pendiente = (self.secuencia, self.reloj())
+        estado.enviados += 1
+        self.enviar_echo(vecino, self.secuencia)
+
+        loop = _loop_activo()
+        if loop is not None and self.espera is not None:
+            estado.expiracion = loop.call_later(self.espera, self._vencer, vecino)
+        self._programar(vecino, estado)
+
+    def _programar(self, vecino, estado):
+        loop = _loop_activo()
+        if loop is None or not self.intervalo:
+            return
+        retardo = self.intervalo * (1 + self.azar.uniform(-self.fluctuacion, self.fluctuacion))
+        estado.temporizador = loop.call_later(retardo, self.sondear, vecino)
+
+    def recibir_respuesta(self, vecino, secuencia=None):
+        """
+        Procesa la respuesta a un echo. Devuelve el RTT medido o None si no
+        corresponde a un sondeo en curso (tardía, duplicada o de otro vecino).
+        """
+        estado = self.vecinos.get(vecino)
+        if estado is None or estado.pendiente is None:
+            return None
+        esperada, enviado = estado.pendiente
+        if secuencia is not None and secuencia != esperada:
+            return None
+        estado.pendiente = None
+        if estado.expiracion is not None:
+            estado.expiracion.cancel()
+            estado.expiracion = None
+        estado.perdidas_seguidas = 0
+
+        rtt = self.reloj() - enviado
+        if estado.srtt is None:
+            estado.srtt = rtt
+            estado.rttvar = rtt / 2
+        else:
+            estado.rttvar = (1 - self.beta) * estado.rttvar + self.beta * abs(estado.srtt - rtt)
+            estado.srtt = (1 - self.alfa) * estado.srtt + self.alfa * rtt
+
+        costo = self.costo(estado.srtt)
+        if estado.costo is None or abs(costo - estado.costo) > self.umbral * estado.costo:
+            estado.costo = costo
+            self.al_cambiar_costo(vecino, costo)
+        return rtt
+
+    def _vencer(self, vecino):
+        estado = self.vecinos.get(vecino)
+        if estado is None or estado.pendiente is None:
+            return
+        estado.pendiente = None
+        if estado.expiracion is not None:
+            estado.expiracion.cancel()
+            estado.expiracion = None
+        estado.perdidos += 1
+        estado.perdidas_seguidas += 1
+        log.debug("Echo a %s sin respuesta (%d seguidos)", vecino, estado.perdidas_seguidas)
+        if estado.perdidas_seguidas == self.perdidas_maximas and self.al_perder_vecino is not None:
+            self.al_perder_vecino(vecino)
+
+    def costo_de(self, vecino):
+        estado = self.vecinos.get(vecino)
+        return estado.costo if estado is not None else None
+
+    def estadisticas(self):
+        return {
+            vecino: {
+                'srtt': estado.srtt,
+                'rttvar': estado.rttvar,
+                'costo': estado.costo,
+                'enviados': estado.enviados,
+                'perdidos': estado.perdidos,
+                'tasa_perdida': estado.perdidos / estado.enviados if estado.enviados else 0.0,
+            }
+            for vecino, estado in self.vecinos.items()
+        }
+
+
+def _loop_activo():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
@@ -0,0 +1,77 @@
+import asyncio
+
+
+class ThrottleTimer:
+    """
+    Temporizador con retroceso exponencial al estilo de OSPF para agrupar
+    ráfagas de eventos en una sola ejecución del callback.
+
+    El primer evento tras un periodo tranquilo espera initial_delay. Si llegan más
+    eventos antes de que pase el tiempo de espera actual, la siguiente ejecución
+    se retrasa hasta completarlo y ese tiempo se duplica, hasta max_wait. Si no hay
+    eventos durante dos tiempos de espera, se vuelve a hold_time.
+    """
+
+    def __init__(self, callback, initial_delay=0.05, hold_time=0.2, max_wait=5.0):
+        self.callback = callback
+        self.initial_delay = initial_delay
+        self.hold_time = hold_time
+        self.max_wait = max_wait
+
+        self.current_hold = hold_time
+        self.last_run = None
+        self.runs = 0
+        self.coalesced = 0  # Eventos absorbidos por una ejecución ya programada
+        self._handle = None
+
+    @classmethod
+    def from_config(cls, callback, config):
+        """
+        Crea el temporizador a partir de una tupla (initial_delay, hold_time, max_wait)
+        o de un diccionario con esas claves; None usa los valores por defecto.
+        """
+        if config is None:
+            return cls(callback)
+        if isinstance(config, dict):
+            return cls(callback, **config)
+        return cls(callback, *config)
+
+    @property
+    def pending(self):
+        return self._handle is not None
+
+    def schedule(self):
+        if self._handle is not None:
+            self.coalesced += 1
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Sin event loop no hay temporizadores: ejecutar de inmediato
+            self._run()
+            return
+
+        now = loop.time()
+        if self.last_run is None or now - self.last_run >= 2 * self.current_hold:
+            self.current_hold = self.hold_time
+            delay = self.initial_delay
+        else:
+            delay = max(self.initial_delay, self.last_run + self.current_hold - now)
+            self.current_hold = min(self.current_hold * 2, self.max_wait)
+
+        self._handle = loop.call_later(delay, self._run)
+
+    def cancel(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _run(self):
+        self._handle = None
+        try:
+            self.last_run = asyncio.get_running_loop().time()
+        except RuntimeError:
+            self.last_run = None
+        self.runs += 1
+        self.callback()
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+
+from CodecMensajes import CodecMensajes, ErrorCodec
+from PlanificadorEnvio import PlanificadorEnvio, CuerpoDiferido, DATOS, CONTROL
+from Metricas import (MENSAJES_RECIBIDOS, MENSAJES_ENVIADOS, BYTES_ENVIADOS, ERRORES_DECODIFICACION,
+                      DURACION_MANEJO, observar_planificador, tamano_utf8)
+
+log = logging.getLogger(__name__)
+
+
+class Transporte:
+    """
+    Interfaz mínima entre un algoritmo de ruteo y la red.
+
+    Los algoritmos solo llaman a enviar()/enviar_mensaje(); el transporte entrega
+    lo que llega mediante recibir(). ClienteXMPP la implementa sobre slixmpp y
+    TransporteSimulado sobre una red en memoria (ver RedSimulada).
+    """
+
+    def __init__(self, algoritmo=None, codec=None):
+        self.algoritmo = algoritmo  # Instancia del algoritmo que recibe los mensajes
+        self.codec = codec if codec is not None else CodecMensajes()
+        self.planificador = None  # Sin planificador cada mensaje sale de inmediato
+        # Manejador de cada tipo de mensaje (origen, mensaje_id, mensaje_json); se
+        # pueden agregar tipos nuevos sin tocar recibir()
+        self.manejadores = {
+            'send_routing': self._recibir_send_routing,
+            'echo': self._recibir_echo,
+            'echo_response': self._recibir_echo_response,
+        }
+
+    @property
+    def jid_propio(self):
+        raise NotImplementedError
+
+    def enviar(self, destino, cuerpo):
+        """
+        Envía el cuerpo (texto) tal cual al JID de destino.
+        """
+        raise NotImplementedError
+
+    def usar_planificador(self, **opciones):
+        """
+        Pasa los envíos por una cola por vecino con agrupación, límites de tasa y
+        contrapresión (ver PlanificadorEnvio para las opciones).
+        """
+        opciones.setdefault('al_cambiar_contrapresion', self._avisar_contrapresion)
+        self.planificador = PlanificadorEnvio(self.enviar, self.codec.agrupar, **opciones)
+        observar_planificador(self.jid_propio, self.planificador)
+        return self.planificador
+
+    def _avisar_contrapresion(self, activa):
+        contrapresion = getattr(self.algoritmo, 'contrapresion', None)
+        if contrapresion is not None:
+            contrapresion(activa)
+
+    def despachar(self, destino, cuerpo, prioridad=CONTROL):
+        """
+        Envía un cuerpo ya codificado, pasando por el planificador si hay uno.
+        Un CuerpoDiferido se genera al salir de la cola (o enseguida si no hay cola).
+        """
+        if isinstance(cuerpo, CuerpoDiferido):
+            if self.planificador is None:
+                cuerpo = cuerpo.generar(0.0)
+            else:
+                cuerpo.generar = self._contando_bytes(cuerpo.generar)
+                self.planificador.encolar(destino, cuerpo, prioridad)
+                return
+        BYTES_ENVIADOS.inc(self.jid_propio, n=tamano_utf8(cuerpo))
+        if self.planificador is None:
+            self.enviar(destino, cuerpo)
+        else:
+            self.planificador.encolar(destino, cuerpo, prioridad)
+
+    def _contando_bytes(self, generar):
+        def generar_y_contar(espera):
+            cuerpo = generar(espera)
+            BYTES_ENVIADOS.inc(self.jid_propio, n=tamano_utf8(cuerpo))
+            return cuerpo
+        return generar_y_contar
+
+    def enviar_mensaje(self, destino, mensaje_json):
+        log.debug("%s envía a %s: %s", self.jid_propio, destino, mensaje_json)
+        MENSAJES_ENVIADOS.inc(self.jid_propio, mensaje_json.get('type'))
+        self.despachar(destino, self.codec.codificar(mensaje_json), prioridad_de(mensaje_json))
+
+    def enviar_echo_response(self, destino, secuencia=None):
+        mensaje = {
+            "type": "echo_response",
+            "from": self.jid_propio,
+        }
+        if secuencia is not None:
+            mensaje["seq"] = secuencia  # Permite emparejar la respuesta con su sondeo
+        self.enviar_mensaje(destino, mensaje)
+
+    def recibir(self, origen, mensaje_id, cuerpo):
+        """
+        Entrega un mensaje recibido al algoritmo. Si el algoritmo procesa los
+        cuerpos por su cuenta (recibir_cuerpo) se le pasa sin tocar; si no, se
+        decodifica con el codec y se despacha según el tipo.
+        """
+        try:
+            lote = self.codec.desagrupar(cuerpo)
+        except ErrorCodec as error:
+            ERRORES_DECODIFICACION.inc(self.jid_propio)
+            log.warning("El lote de %s no se pudo decodificar: %s", origen, error)
+            return
+        if lote is not None:
+            # Cada parte recibe su propio id para no confundirse con duplicados
+            for indice, parte in enumerate(lote):
+                self.recibir(origen, f"{mensaje_id}/{indice}", parte)
+            return
+
+        manejador = getattr(self.algoritmo, 'recibir_cuerpo', None)
+        if manejador is not None:
+            manejador(origen, mensaje_id, cuerpo)
+            return
+
+        inicio = time.perf_counter()
+        try:
+            mensaje_json = self.codec.decodificar(cuerpo)
+        except ErrorCodec as error:
+            ERRORES_DECODIFICACION.inc(self.jid_propio)
+            log.warning("El mensaje de %s no se pudo decodificar: %s", origen, error)
+            return
+        tipo_mensaje = mensaje_json.get('type')
+        log.debug("%s recibió de %s: %s", self.jid_propio, origen, mensaje_json)
+        MENSAJES_RECIBIDOS.inc(self.jid_propio, tipo_mensaje)
+
+        manejador = self.manejadores.get(tipo_mensaje)
+        try:
+            if manejador is not None:
+                manejador(origen, mensaje_id, mensaje_json)
+        finally:
+            DURACION_MANEJO.observar(time.perf_counter() - inicio, self.jid_propio, tipo_mensaje)
+
+    def _recibir_send_routing(self, origen, mensaje_id, mensaje_json):
+        # El id del mensaje original (si viene) identifica la difusión en todos los saltos
+        mensaje_id = mensaje_json.get('id', mensaje_id)
+        # Campos opcionales de la cabecera de difusión
+        extras = {
+            parametro: mensaje_json[campo]
+            for campo, parametro in (('hops', 'saltos'), ('ttl', 'ttl'), ('origin', 'originador'))
+            if campo in mensaje_json
+        }
+        self.algoritmo.recibir_mensaje(mensaje_json['from'], mensaje_id, mensaje_json['data'], **extras)
+
+    def _recibir_echo(self, origen, mensaje_id, mensaje_json):
+        self.enviar_echo_response(mensaje_json['from'], mensaje_json.get('seq'))
+
+    def _recibir_echo_response(self, origen, mensaje_id, mensaje_json):
+        self.algoritmo.recibir_echo_response(mensaje_json)
+
+    def vecino_conectado(self, vecino_jid):
+        """
+        Notifica al algoritmo que un vecino está en línea.
+        """
+        agregar_vecino = getattr(self.algoritmo, 'agregar_vecino', None)
+        if vecino_jid != self.jid_propio and agregar_vecino is not None:
+            log.info("%s encontró al vecino: %s", self.jid_propio, vecino_jid)
+            agregar_vecino(vecino_jid)
+
+    def vecino_desconectado(self, vecino_jid):
+        """
+        Notifica al algoritmo que un vecino dejó de estar en línea.
+        """
+        eliminar_vecino = getattr(self.algoritmo, 'eliminar_vecino', None)
+        if vecino_jid != self.jid_propio and eliminar_vecino is not None:
+            eliminar_vecino(vecino_jid)
+
+    async def sesion_iniciada(self):
+        """
+        Avisa al algoritmo que la sesión está lista, si le interesa saberlo.
+        """
+        iniciar = getattr(self.algoritmo, 'iniciar', None)
+        if iniciar is None:
+            return
+        resultado = iniciar()
+        if asyncio.iscoroutine(resultado):
+            await resultado
+
+
+def prioridad_de(mensaje_json):
+    """
+    Los paquetes de datos tienen prioridad sobre el control (echos, LSAs y
+    tablas de vectores de distancia).
+    """
+    tipo = mensaje_json.get('type')
+    if tipo == 'message':
+        return DATOS
+    if tipo == 'send_routing':
+        datos = mensaje_json.get('data')
+        es_control = isinstance(datos, dict) and ('tabla_rutas' in datos or 'sincronizar' in datos)
+        return CONTROL if es_control else DATOS
+    return CONTROL
@@ -0,0 +1,115 @@
+import time
+from collections import deque
+
+from Metricas import percentil
+
+# Una traza viaja en el campo 'trace' de un paquete send_routing:
+#   {"t0": hora de origen (s), "h": [[nodo, entrada, salida, espera], ..., [nodo, entrada]]}
+# Los tiempos de cada salto son microsegundos enteros desde t0: entrada es la
+# llegada al nodo, salida el momento en que el paquete dejó la cola de salida y
+# espera cuánto estuvo en ella. El último registro, sin salida, es el nodo
+# donde está el paquete.
+
+
+def nueva_traza(nodo, ahora=None):
+    return {"t0": time.time() if ahora is None else ahora, "h": [[nodo, 0]]}
+
+def llegada(traza, nodo, ahora=None):
+    """
+    Copia de la traza con el registro de llegada a `nodo`.
+    """
+    ahora = time.time() if ahora is None else ahora
+    return {"t0": traza["t0"], "h": traza["h"] + [[nodo, _micros(traza, ahora)]]}
+
+def salida(traza, espera, ahora=None):
+    """
+    Copia de la traza con la salida del nodo actual tras `espera` segundos en la cola.
+    """
+    ahora = time.time() if ahora is None else ahora
+    nodo, entrada = traza["h"][-1][:2]
+    registro = [nodo, entrada, _micros(traza, ahora), round(espera * 1e6)]
+    return {"t0": traza["t0"], "h": traza["h"][:-1] + [registro]}
+
+def _micros(traza, ahora):
+    return round((ahora - traza["t0"]) * 1e6)
+
+
+class AgregadorTrazas:
+    """
+    Junta las trazas que emiten los destinos y calcula percentiles de latencia
+    por nodo (de la llegada a la salida, cola incluida), de espera en la cola
+    por nodo, por enlace (de la salida de un nodo a la llegada al siguiente) y
+    de extremo a extremo por par origen-destino.
+
+    Se guardan las últimas `max_muestras` muestras de cada serie. Los tiempos
+    de enlace y de extremo a extremo comparan relojes de nodos distintos, así
+    que solo son exactos con relojes sincronizados (o en una simulación).
+    """
+
+    def __init__(self, max_muestras=10_000):
+        self.max_muestras = max_muestras
+        self.nodos = {}  # nodo -> muestras (s)
+        self.esperas = {}  # nodo -> muestras (s)
+        self.enlaces = {}  # (nodo, siguiente) -> muestras (s)
+        self.extremos = {}  # (origen, destino) -> muestras (s)
+        self.trazas = 0
+
+    def agregar(self, traza):
+        registros = traza["h"]
+        self.trazas += 1
+        for anterior, siguiente in zip(registros, registros[1:]):
+            nodo, entrada, salida_nodo, espera = anterior[:4]
+            self._muestra(self.nodos, nodo, salida_nodo - entrada)
+            self._muestra(self.esperas, nodo, espera)
+            self._muestra(self.enlaces, (nodo, siguiente[0]), siguiente[1] - salida_nodo)
+        self._muestra(self.extremos, (registros[0][0], registros[-1][0]), registros[-1][1])
+
+    def _muestra(self, series, clave, micros):
+        muestras = series.get(clave)
+        if muestras is None:
+            muestras = series[clave] = deque(maxlen=self.max_muestras)
+        muestras.append(micros / 1e6)
+
+    def reporte(self):
+        """
+        {'nodos'|'esperas'|'enlaces'|'extremos': {clave: {n, p50, p95, p99, max}}}
+        más 'trazas' (cuántas se juntaron); las claves de enlaces y extremos son 'A->B'.
+        """
+        def resumir(series):
+            return {_clave(clave): _resumen(muestras) for clave, muestras in sorted(series.items())}
+        return {
+            'trazas': self.trazas,
+            'nodos': resumir(self.nodos),
+            'esperas': resumir(self.esperas),
+            'enlaces': resumir(self.enlaces),
+            'extremos': resumir(self.extremos),
+        }
+
+    def texto(self, limite=10):
+        return texto_reporte(self.reporte(), limite)
+
+
+def texto_reporte(reporte, limite=10):
+    """
+    Resumen legible de un reporte(): los `limite` nodos y enlaces con mayor p95.
+    """
+    lineas = [f"{reporte['trazas']} trazas"]
+    for titulo, seccion in (("Nodos", 'nodos'), ("Espera en cola", 'esperas'), ("Enlaces", 'enlaces')):
+        lineas.append(f"{titulo} (p50 / p95 / p99 ms):")
+        peores = sorted(reporte[seccion].items(), key=lambda item: item[1]['p95'], reverse=True)[:limite]
+        for clave, resumen in peores:
+            lineas.append(f"  {clave:<30} {resumen['p50'] * 1000:8.3f} {resumen['p95'] * 1000:8.3f} "
+                          f"{resumen['p99'] * 1000:8.3f}  n={resumen['n']}")
+    return "\n".join(lineas)
+
+def _resumen(muestras):
+    return {
+        'n': len(muestras),
+        'p50': percentil(muestras, 50),
+        'p95': percentil(muestras, 95),
+        'p99': percentil(muestras, 99),
+        'max': max(muestras),
+    }
+
+def _clave(clave):
+    return '->'.join(clave) if isinstance(clave, tuple) else clave
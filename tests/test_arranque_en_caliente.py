@@ -0,0 +1,30 @@
+from NetConfig import NetConfig
+from RedSimulada import RedSimulada
+from LinkStateRouting import RoutingLSR
+
+NOMBRES = {'A': 'a@x', 'B': 'b@x', 'C': 'c@x'}
+
+
+def crear_lsr(topologia, ruta):
+    config = NetConfig(topo_map=topologia, node_map=NOMBRES)
+    transporte = RedSimulada().agregar_nodo('a@x')
+    return RoutingLSR('a@x', None, config, transport=transporte, interactive=False, snapshot_path=ruta)
+
+
+def test_reinicio_con_otros_vecinos_no_usa_rutas_viejas(tmp_path):
+    ruta = str(tmp_path / 'a.snap')
+    triangulo = {'A': ['B', 'C'], 'B': ['A', 'C'], 'C': ['A', 'B']}
+    nodo = crear_lsr(triangulo, ruta)
+    # Sin event loop los temporizadores corren de inmediato
+    nodo.install_table('B', {'A': 1.0, 'C': 1.0}, 1)
+    nodo.install_table('C', {'A': 1.0, 'B': 1.0}, 1)
+    assert nodo.forwarding.next_hop('C') == 'C'
+    nodo.save_snapshot()
+
+    # Se cae el enlace A-C entre el guardado y el reinicio
+    camino = {'A': ['B'], 'B': ['A', 'C'], 'C': ['B']}
+    reiniciado = crear_lsr(camino, ruta)
+    assert reiniciado.restored
+    assert reiniciado.weight_tables['A']['table'] == {'B': 10_000.0}
+    assert reiniciado.forwarding.next_hop('C') == 'B'
+    assert not reiniciado.spf_timer.pending
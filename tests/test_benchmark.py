@@ -0,0 +1,34 @@
+import json
+
+from Benchmark import main
+from SimulacionDistribuida import ALGORITMOS
+
+CAMPOS = {'algoritmo', 'topologia', 'nodos', 'enlaces', 'convergencia_s', 'mensajes_control', 'bytes_control',
+          'mensajes_totales', 'bytes_totales', 'mensajes_perdidos_red', 'memoria_nodo_max_bytes',
+          'memoria_nodo_media_bytes', 'paquetes_enviados', 'paquetes_perdidos', 'latencia_p50_s',
+          'latencia_p95_s', 'latencia_max_s', 'tiempo_real_s', 'memoria_proceso_pico_bytes'}
+
+
+def test_benchmark_en_un_anillo_chico(tmp_path, capsys):
+    ruta = tmp_path / 'bench.json'
+    main(['--algoritmos', *ALGORITMOS, '--topologias', 'ring', '--tamanos', '6', '--paquetes', '4',
+          '--trazar', '--salida', str(ruta)])
+    informe = json.loads(ruta.read_text())
+    assert informe['parametros']['paquetes'] == 4
+    resultados = {resultado['algoritmo']: resultado for resultado in informe['resultados']}
+    assert set(resultados) == set(ALGORITMOS)
+    for algoritmo, resultado in resultados.items():
+        assert CAMPOS <= set(resultado), algoritmo
+        assert (resultado['topologia'], resultado['nodos'], resultado['enlaces']) == ('ring', 6, 6)
+        assert resultado['convergencia_s'] >= 0
+        assert resultado['mensajes_totales'] >= resultado['mensajes_control'] > 0
+        assert resultado['mensajes_perdidos_red'] == 0
+        assert resultado['paquetes_perdidos'] == 0
+        if algoritmo != 'dvr':  # DV solo arma tablas, no origina datos
+            assert resultado['paquetes_enviados'] == 4
+            assert resultado['latencia_p50_s'] <= resultado['latencia_p95_s'] <= resultado['latencia_max_s']
+
+    trazas = resultados['lsr']['trazas']
+    assert trazas['trazas'] == 4
+    assert sum(resumen['n'] for resumen in trazas['extremos'].values()) == 4
+    assert "4 trazas" in capsys.readouterr().out
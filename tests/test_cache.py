@@ -0,0 +1,99 @@
+import pytest
+
+from CacheMensajes import CacheDuplicados
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_lru_desaloja_el_menos_reciente():
+    cache = CacheDuplicados(capacidad=3, ttl=None)
+    for mensaje_id in ('a', 'b', 'c'):
+        cache.add(mensaje_id)
+    assert cache.visto('a')  # 'a' pasa a ser el más reciente
+    cache.add('d')
+    assert 'b' not in cache
+    assert all(mensaje_id in cache for mensaje_id in ('a', 'c', 'd'))
+    assert len(cache) == 3
+    assert cache.desalojos == 1
+
+
+def test_lru_expira_por_ttl():
+    reloj = Reloj()
+    cache = CacheDuplicados(capacidad=10, ttl=10.0, reloj=reloj)
+    cache.add('a')
+    reloj.ahora = 5.0
+    cache.add('b')
+    reloj.ahora = 9.9
+    assert 'a' in cache
+    reloj.ahora = 10.0
+    assert 'a' not in cache
+    assert 'b' in cache
+    reloj.ahora = 15.0
+    assert 'b' not in cache
+    assert cache.expirados == 2
+    assert len(cache) == 0
+
+
+def test_lru_visto_refresca_el_ttl():
+    reloj = Reloj()
+    cache = CacheDuplicados(capacidad=10, ttl=10.0, reloj=reloj)
+    assert not cache.visto('a')
+    reloj.ahora = 8.0
+    assert cache.visto('a')
+    reloj.ahora = 16.0
+    assert 'a' in cache
+
+
+def test_bloom_sin_falsos_negativos():
+    cache = CacheDuplicados(capacidad=1000, ttl=None, modo='bloom', tasa_falsos_positivos=0.01)
+    ids = [f"m{i}" for i in range(1000)]
+    for mensaje_id in ids:
+        cache.add(mensaje_id)
+    # Tras dos rotaciones por capacidad el filtro anterior tiene los últimos 500
+    assert all(mensaje_id in cache for mensaje_id in ids[500:])
+    assert cache.desalojos == 500
+    falsos_positivos = sum(mensaje_id in cache for mensaje_id in ids[:500])
+    assert falsos_positivos <= 0.01 * 500 * 3
+
+
+def test_bloom_rota_por_tiempo():
+    reloj = Reloj()
+    cache = CacheDuplicados(capacidad=100, ttl=10.0, modo='bloom', reloj=reloj)
+    cache.add('a')
+    reloj.ahora = 6.0
+    assert 'a' in cache  # Rotó una vez: ahora está en el filtro anterior
+    cache.add('b')
+    reloj.ahora = 11.0
+    assert 'a' not in cache
+    assert 'b' in cache
+    assert cache.expirados == 1
+    reloj.ahora = 30.0
+    assert 'b' not in cache
+    assert len(cache) == 0
+
+
+def test_estadisticas_cuentan_consultas_y_aciertos():
+    cache = CacheDuplicados(capacidad=2, ttl=None)
+    resultados = [cache.visto(mensaje_id) for mensaje_id in ('a', 'b', 'a', 'c')]
+    assert resultados == [False, False, True, False]
+    assert cache.estadisticas() == {
+        'modo': 'lru',
+        'entradas': 2,
+        'consultas': 4,
+        'aciertos': 1,
+        'desalojos': 1,
+        'expirados': 0,
+        'tasa_aciertos': 0.25,
+    }
+
+
+@pytest.mark.parametrize('argumentos', [{'capacidad': 0}, {'modo': 'fifo'}])
+def test_parametros_invalidos(argumentos):
+    with pytest.raises(ValueError):
+        CacheDuplicados(**argumentos)
@@ -0,0 +1,60 @@
+import base64
+
+import pytest
+
+from CodecMensajes import CodecMensajes, ErrorCodec, PREFIJO_BINARIO, VERSION
+
+# Etiquetas del formato binario (ver CodecMensajes)
+LISTA, OBJETO = 6, 7
+
+
+def cuerpo_binario(carga):
+    return PREFIJO_BINARIO + base64.b64encode(bytes((VERSION, 0)) + bytes(carga)).decode('ascii')
+
+
+CLAVE_LISTA = cuerpo_binario([OBJETO, 1, LISTA, 0, 0])  # {[]: None}
+ANIDADO = cuerpo_binario([LISTA, 1] * 100_000 + [LISTA, 0])  # [[[...]]]
+
+
+@pytest.mark.parametrize('cuerpo', [CLAVE_LISTA, ANIDADO], ids=['clave-lista', 'anidado'])
+def test_binario_mal_formado_es_error_codec(cuerpo):
+    codec = CodecMensajes('binario')
+    with pytest.raises(ErrorCodec):
+        codec.decodificar(cuerpo)
+    assert codec.leer_cabecera(cuerpo) is None
+
+
+def test_json_muy_anidado_es_error_codec():
+    with pytest.raises(ErrorCodec):
+        CodecMensajes().decodificar('[' * 100_000 + ']' * 100_000)
+
+
+@pytest.mark.parametrize('modo', ['json', 'binario'])
+def test_ida_y_vuelta(modo):
+    codec = CodecMensajes(modo)
+    mensaje = {"type": "send_routing", "from": "A", "to": "C", "data": {"x": [1, [2.5, None]]}, "hops": 1}
+    cuerpo = codec.codificar(mensaje)
+    assert codec.decodificar(cuerpo) == mensaje
+    cabecera, carga = codec.leer_cabecera(cuerpo)
+    assert codec.decodificar(codec.recomponer(cabecera, carga)) == mensaje
+
+
+@pytest.mark.parametrize('modo', ['json', 'binario'])
+@pytest.mark.parametrize('nodos', [None, ['A', 'C']], ids=['sin-internar', 'internado'])
+def test_cabecera_modificada_conserva_la_carga(modo, nodos):
+    codec = CodecMensajes(modo, nodos=nodos, umbral_compresion=None)
+    datos = {"A": [1, "dos"], "texto": "ñandú"}
+    cuerpo = codec.codificar({"type": "send_routing", "from": "A", "to": "C", "data": datos, "hops": 0})
+    cabecera, carga = codec.leer_cabecera(cuerpo)
+    assert cabecera == {"type": "send_routing", "from": "A", "to": "C", "hops": 0}
+
+    recompuesto = codec.recomponer(dict(cabecera, hops=1, ttl=4), carga)
+    assert codec.leer_cabecera(recompuesto) == ({"type": "send_routing", "from": "A", "to": "C",
+                                                 "hops": 1, "ttl": 4}, carga)
+    assert codec.decodificar(recompuesto) == {"type": "send_routing", "from": "A", "to": "C",
+                                              "hops": 1, "ttl": 4, "data": datos}
+
+
+def test_sin_data_no_hay_camino_rapido():
+    codec = CodecMensajes()
+    assert codec.leer_cabecera(codec.codificar({"type": "echo", "from": "A"})) is None
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from RedSimulada import RedSimulada
+from Flooding import DifusionAlgoritmo, arbol_bfs
+
+
+def grilla(lado):
+    # Grilla lado x lado: tiene ciclos, así que inundar costaría más de N - 1
+    topologia = {}
+    for fila in range(lado):
+        for columna in range(lado):
+            vecinos = topologia.setdefault(f"n{fila}{columna}@x", set())
+            if fila + 1 < lado:
+                vecinos.add(f"n{fila + 1}{columna}@x")
+            if columna + 1 < lado:
+                vecinos.add(f"n{fila}{columna + 1}@x")
+    for nodo, vecinos in list(topologia.items()):
+        for vecino in vecinos:
+            topologia[vecino].add(nodo)
+    return topologia
+
+
+def armar_red(modo, topologia):
+    red = RedSimulada()
+    nodos = {}
+    entregas = {}
+    for jid in topologia:
+        nodos[jid] = DifusionAlgoritmo(jid, None, transporte=red.agregar_nodo(jid), modo=modo, topologia=topologia)
+        nodos[jid].al_entregar = lambda origen, contenido, jid=jid: entregas.setdefault(jid, []).append(contenido)
+        for vecino in topologia[jid]:
+            red.conectar(jid, vecino, bidireccional=False)
+    return red, nodos, entregas
+
+
+@pytest.mark.parametrize('modo', ['arbol', 'rpf'])
+@pytest.mark.parametrize('originador', ['n00@x', 'n11@x', 'n22@x'])
+def test_difusion_por_arbol_cuesta_n_menos_1(modo, originador):
+    topologia = grilla(3)
+
+    async def escenario():
+        red, nodos, entregas = armar_red(modo, topologia)
+        await red.iniciar()
+        nodos[originador].difundir("hola")
+        await red.esperar_inactividad()
+        return red, entregas
+
+    red, entregas = asyncio.run(escenario())
+    assert red.mensajes_enviados == len(topologia) - 1
+    assert entregas == {jid: ["hola"] for jid in topologia if jid != originador}
+
+
+def test_inundacion_cuesta_mas_en_una_red_con_ciclos():
+    topologia = grilla(3)
+
+    async def escenario():
+        red, nodos, entregas = armar_red('inundacion', topologia)
+        await red.iniciar()
+        nodos['n00@x'].difundir("hola")
+        await red.esperar_inactividad()
+        return red, entregas
+
+    red, entregas = asyncio.run(escenario())
+    assert red.mensajes_enviados > len(topologia) - 1
+    assert len(entregas) == len(topologia) - 1
+
+
+def test_rpf_descarta_copias_fuera_del_camino_inverso():
+    topologia = grilla(3)
+    red = RedSimulada()
+    entregas = []
+    nodo = DifusionAlgoritmo('n11@x', None, transporte=red.agregar_nodo('n11@x'), modo='rpf', topologia=topologia)
+    nodo.al_entregar = lambda origen, contenido: entregas.append(origen)
+    padre = arbol_bfs(topologia, 'n00@x')['n11@x']
+    otro = next(vecino for vecino in sorted(topologia['n11@x']) if vecino != padre)
+
+    nodo.recibir_mensaje(otro, 'm1', "hola", saltos=2, originador='n00@x')
+    assert entregas == []
+    assert 'm1' not in nodo.mensajes_recibidos
+    nodo.recibir_mensaje(padre, 'm1', "hola", saltos=2, originador='n00@x')
+    assert entregas == [padre]
+
+
+def test_modos_que_necesitan_topologia():
+    with pytest.raises(ValueError):
+        DifusionAlgoritmo('a@x', None, transporte=RedSimulada().agregar_nodo('a@x'), modo='arbol')
@@ -0,0 +1,58 @@
+import math
+import random
+
+import pytest
+
+from Dijkstra import dijkstra, CompactGraph, np
+
+
+def grafo_aleatorio(aleatorio, n, densidad):
+    nodos = [f"N{i}" for i in range(n)]
+    return {a: {b: aleatorio.randint(1, 9) for b in nodos if b != a and aleatorio.random() < densidad}
+            for a in nodos}
+
+
+def por_nombre(compacto, fila):
+    return {nodo: float(fila[i]) for i, nodo in enumerate(compacto.nodes)}
+
+
+def metodos():
+    return ['heap', pytest.param('numpy', marks=pytest.mark.skipif(np is None, reason="numpy no está instalado"))]
+
+
+@pytest.mark.parametrize('metodo', metodos())
+def test_todos_los_caminos_coinciden_con_dijkstra(metodo):
+    aleatorio = random.Random(3)
+    for _ in range(20):
+        grafo = grafo_aleatorio(aleatorio, aleatorio.randint(1, 12), aleatorio.choice([0.1, 0.3, 0.7]))
+        compacto = CompactGraph.from_dict(grafo)
+        distancias, _ = compacto.all_pairs(metodo)
+        for i, origen in enumerate(compacto.nodes):
+            esperadas = dijkstra(grafo, origen)
+            assert por_nombre(compacto, compacto.shortest_paths(origen)[0]) == esperadas
+            assert por_nombre(compacto, distancias[i]) == esperadas
+
+
+@pytest.mark.parametrize('metodo', metodos())
+def test_predecesores_forman_caminos_minimos(metodo):
+    grafo = grafo_aleatorio(random.Random(5), 10, 0.3)
+    compacto = CompactGraph.from_dict(grafo)
+    distancias, previos = compacto.all_pairs(metodo)
+    for i in range(len(compacto)):
+        for j in range(len(compacto)):
+            anterior = int(previos[i][j])
+            if i == j or math.isinf(distancias[i][j]):
+                assert anterior == -1
+                continue
+            peso = grafo[compacto.nodes[anterior]][compacto.nodes[j]]
+            assert distancias[i][anterior] + peso == distancias[i][j]
+
+
+def test_cambio_de_peso_en_sitio():
+    grafo = {'A': {'B': 1, 'C': 5}, 'B': {'C': 1}, 'C': {}}
+    compacto = CompactGraph.from_dict(grafo)
+    compacto.set_weight('B', 'C', 10)
+    grafo['B']['C'] = 10
+    assert por_nombre(compacto, compacto.shortest_paths('A')[0]) == dijkstra(grafo, 'A') == {'A': 0, 'B': 1, 'C': 5}
+    with pytest.raises(KeyError):
+        compacto.set_weight('C', 'A', 1)
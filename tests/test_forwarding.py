@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from ForwardingTable import ForwardingTable
+from Dijkstra import equal_cost_first_hops
+
+
+@pytest.mark.parametrize('multipath', [None, 'ecmp'])
+def test_actualizacion_incremental_igual_a_reconstruccion(multipath):
+    aleatorio = random.Random(7)
+    nodos = [f"N{i}" for i in range(15)]
+    grafo = {a: {b: aleatorio.randint(1, 3) for b in nodos if b != a and aleatorio.random() < 0.3} for a in nodos}
+    tabla = ForwardingTable('N0', multipath)
+    tabla.rebuild(grafo)
+    for _ in range(200):
+        nodo = aleatorio.choice(nodos)
+        anteriores = grafo[nodo]
+        nuevos = {b: aleatorio.randint(1, 3) for b in nodos if b != nodo and aleatorio.random() < 0.3}
+        grafo[nodo] = nuevos
+        tabla.update_node(grafo, nodo, anteriores)
+
+        # Con empates el árbol puede elegir otro padre: se comparan costos y
+        # conjuntos de saltos, no el primer salto
+        referencia = ForwardingTable('N0', multipath)
+        referencia.rebuild(grafo)
+        assert tabla.distances == referencia.distances
+        assert {destino: costo for destino, (_, costo) in tabla.entries.items()} == \
+            {destino: costo for destino, (_, costo) in referencia.entries.items()}
+        primeros_saltos = equal_cost_first_hops(grafo, 'N0', referencia.distances)
+        for destino in referencia.entries:
+            if multipath == 'ecmp':
+                assert set(tabla.next_hops(destino)) == set(referencia.next_hops(destino))
+            elif destino != 'N0':
+                assert tabla.next_hop(destino) in primeros_saltos[destino]
+
+
+def bidireccional(enlaces):
+    grafo = {}
+    for a, b, costo in enlaces:
+        grafo.setdefault(a, {})[b] = costo
+        grafo.setdefault(b, {})[a] = costo
+    return grafo
+
+
+def test_lfa_en_triangulo():
+    # B llega a A sin volver a pasar por S: 1 < 2 + 1
+    tabla = ForwardingTable('S', loop_free_alternates=True)
+    tabla.rebuild(bidireccional([('S', 'A', 1), ('S', 'B', 2), ('A', 'B', 1)]))
+    tabla.mark_down('A')
+    assert tabla.next_hop('A') == 'B'
+    assert tabla.next_hops('A') == ('B',)
+
+
+def test_lfa_en_cuadrado_exige_desigualdad_estricta():
+    # Desde B, ir a A por S o por C cuesta lo mismo (2 == 1 + 1): B no es respaldo
+    tabla = ForwardingTable('S', loop_free_alternates=True)
+    tabla.rebuild(bidireccional([('S', 'A', 1), ('A', 'C', 1), ('C', 'B', 1), ('B', 'S', 1)]))
+    tabla.mark_down('A')
+    assert 'A' not in tabla.backups
+    assert tabla.next_hop('A') is None
+    assert tabla.next_hops('A') == ()
+
+
+def test_mark_up_restaura_el_primario():
+    tabla = ForwardingTable('S', loop_free_alternates=True)
+    tabla.rebuild(bidireccional([('S', 'A', 1), ('S', 'B', 2), ('A', 'B', 1)]))
+    tabla.mark_down('A')
+    assert tabla.next_hop('A') == 'B'
+    tabla.mark_up('A')
+    assert tabla.next_hop('A') == 'A'
+    assert tabla.next_hops('A') == ('A',)
+
+
+def test_next_hops_no_calcula_respaldos():
+    # Tras un SPF los respaldos quedan sin calcular hasta compute_backups()
+    grafo = bidireccional([('S', 'A', 1), ('S', 'B', 2), ('A', 'B', 1)])
+    tabla = ForwardingTable('S', loop_free_alternates=True)
+    tabla.rebuild(grafo)
+    tabla.mark_down('A')
+    tabla.rebuild(grafo)
+    assert tabla.backups is None
+    assert tabla.next_hops('A') == ()
+    assert tabla.backups is None
+    tabla.compute_backups()
+    assert tabla.next_hops('A') == ('B',)
@@ -0,0 +1,83 @@
+import pytest
+
+from Metricas import Registro, percentil, tamano_utf8, DURACION_MANEJO
+from RedSimulada import RedSimulada
+
+
+def test_texto_prometheus():
+    registro = Registro()
+    mensajes = registro.contador('mensajes_total', "Mensajes.", ('nodo', 'tipo'))
+    cola = registro.medidor('cola', "Cola.", ('nodo',))
+    duracion = registro.histograma('duracion_segundos', "Duración.", ('nodo',), limites=(0.1, 1.0))
+    mensajes.inc('a"b\\c', 'echo')
+    mensajes.inc('a"b\\c', 'echo', n=2)
+    cola.observar_con(lambda: 7, 'a')
+    for valor in (0.05, 0.1, 0.5, 3.0):
+        duracion.observar(valor, 'a')
+
+    assert registro.texto_prometheus() == (
+        '# HELP mensajes_total Mensajes.\n'
+        '# TYPE mensajes_total counter\n'
+        'mensajes_total{nodo="a\\"b\\\\c",tipo="echo"} 3\n'
+        '# HELP cola Cola.\n'
+        '# TYPE cola gauge\n'
+        'cola{nodo="a"} 7\n'
+        '# HELP duracion_segundos Duración.\n'
+        '# TYPE duracion_segundos histogram\n'
+        'duracion_segundos_bucket{nodo="a",le="0.1"} 2\n'
+        'duracion_segundos_bucket{nodo="a",le="1.0"} 3\n'
+        'duracion_segundos_bucket{nodo="a",le="+Inf"} 4\n'
+        'duracion_segundos_sum{nodo="a"} 3.65\n'
+        'duracion_segundos_count{nodo="a"} 4\n'
+    )
+
+
+def test_instantanea_estima_percentiles_por_cubeta():
+    registro = Registro()
+    duracion = registro.histograma('duracion_segundos', "Duración.", ('nodo',), limites=(0.1, 1.0))
+    for valor in (0.05, 0.5, 0.5, 2.0):
+        duracion.observar(valor, 'a')
+    serie, = registro.instantanea()['duracion_segundos']
+    assert serie == {'nodo': 'a', 'total': 4, 'suma': 3.05, 'p50': 1.0, 'p95': float('inf'), 'p99': float('inf')}
+
+
+def test_volcar_reemplaza_el_archivo_de_forma_atomica(tmp_path, monkeypatch):
+    registro = Registro()
+    registro.contador('mensajes_total', "Mensajes recibidos por vecino.").inc()
+    ruta = tmp_path / 'metricas.prom'
+    registro.volcar(str(ruta))
+    contenido = ruta.read_text(encoding='utf-8')
+    assert contenido == registro.texto_prometheus()
+    assert [archivo.name for archivo in tmp_path.iterdir()] == ['metricas.prom']
+
+    # Si falla al generar el texto, el archivo anterior queda intacto
+    def fallar():
+        raise RuntimeError("falla")
+    monkeypatch.setattr(registro, 'texto_prometheus', fallar)
+    with pytest.raises(RuntimeError):
+        registro.volcar(str(ruta))
+    assert ruta.read_text(encoding='utf-8') == contenido
+
+
+def test_duracion_de_manejo_se_registra_aunque_falle_el_manejador():
+    class Fallido:
+        def recibir_mensaje(self, *argumentos, **opciones):
+            raise RuntimeError("falla")
+
+    transporte = RedSimulada().agregar_nodo('manejo@x', Fallido())
+    with pytest.raises(RuntimeError):
+        transporte.recibir('b@x', 'm1', '{"type":"send_routing","from":"b@x","to":"manejo@x","data":"x"}')
+    assert DURACION_MANEJO.muestras()[('manejo@x', 'send_routing')][2] == 1
+
+
+def test_percentil_interpola():
+    assert percentil([], 50) is None
+    assert percentil([5], 99) == 5
+    assert percentil([4, 1, 3, 2], 50) == 2.5
+    assert percentil(list(range(1, 101)), 95) == pytest.approx(95.05)
+    assert percentil([1, 2], 100) == 2
+
+
+def test_tamano_utf8():
+    assert tamano_utf8("hola") == 4
+    assert tamano_utf8("ñandú") == 7
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from NetConfig import NetConfig
+from RedSimulada import RedSimulada
+from LinkStateRouting import RoutingLSR, flow_key
+from ForwardingTable import ForwardingTable
+from Dijkstra import dijkstra
+
+
+def crear_rombo():
+    # A llega a D por B o por C con el mismo costo
+    config = NetConfig(topo_map={'A': ['B', 'C'], 'B': ['A', 'D'], 'C': ['A', 'D'], 'D': ['B', 'C']},
+                       node_map={nodo: f"{nodo.lower()}@x" for nodo in 'ABCD'})
+    nodo = RoutingLSR('a@x', None, config, transport=RedSimulada().agregar_nodo('a@x'), interactive=False)
+    # Sin event loop los temporizadores corren de inmediato
+    nodo.install_table('B', {'A': 1.0, 'D': 1.0}, 1)
+    nodo.install_table('C', {'A': 1.0, 'D': 1.0}, 1)
+    nodo.install_table('D', {'B': 1.0, 'C': 1.0}, 1)
+    assert nodo.forwarding.next_hops('D') == ('B', 'C')
+    return nodo
+
+
+def test_un_flujo_siempre_usa_el_mismo_salto():
+    nodo = crear_rombo()
+    for flujo in range(50):
+        clave = flow_key('A', 'D', flujo)
+        saltos = {nodo.get_next_hop('D', clave) for _ in range(20)}
+        assert len(saltos) == 1
+
+
+def test_los_flujos_se_reparten_entre_los_saltos_de_igual_costo():
+    nodo = crear_rombo()
+    usos = {}
+    for flujo in range(200):
+        salto = nodo.get_next_hop('D', flow_key('A', 'D', flujo))
+        usos[salto] = usos.get(salto, 0) + 1
+    assert set(usos) == {'B', 'C'}
+    assert min(usos.values()) > 50
+    # Sin clave de flujo se usa siempre el salto principal
+    assert nodo.get_next_hop('D') == nodo.forwarding.next_hop('D')
+
+
+def bidireccional(enlaces):
+    grafo = {}
+    for a, b, costo in enlaces:
+        grafo.setdefault(a, {})[b] = costo
+        grafo.setdefault(b, {})[a] = costo
+    return grafo
+
+
+@pytest.mark.parametrize('costo_c_d, incluido', [(1.5, True), (2, False), (3, False)])
+def test_k_shortest_exige_acercarse_al_destino(costo_c_d, incluido):
+    # Camino principal A-B-D (2); A-C-D entra por estiramiento (<= 3) solo si
+    # C está más cerca de D que A
+    tabla = ForwardingTable('A', 'k-shortest', k_paths=3, max_stretch=1.5)
+    tabla.rebuild(bidireccional([('A', 'B', 1), ('B', 'D', 1), ('A', 'C', 1), ('C', 'D', costo_c_d)]))
+    assert tabla.next_hop('D') == 'B'
+    assert ('C' in tabla.next_hops('D')) == incluido
+
+
+def test_k_shortest_nunca_devuelve_un_vecino_mas_lejos():
+    aleatorio = random.Random(11)
+    for _ in range(10):
+        nodos = [f"N{i}" for i in range(10)]
+        enlaces = [(a, b, aleatorio.randint(1, 4)) for i, a in enumerate(nodos) for b in nodos[i + 1:]
+                   if aleatorio.random() < 0.35]
+        grafo = bidireccional(enlaces)
+        distancias = {nodo: dijkstra(grafo, nodo) for nodo in grafo}
+        for fuente in grafo:
+            tabla = ForwardingTable(fuente, 'k-shortest', k_paths=4, max_stretch=2.0)
+            tabla.rebuild(grafo)
+            for destino in tabla.entries:
+                if destino == fuente:
+                    continue
+                for salto in tabla.next_hops(destino):
+                    assert distancias[salto][destino] < distancias[fuente][destino]
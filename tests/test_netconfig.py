@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+import NetConfig as modulo
+from NetConfig import NetConfig
+
+NOMBRES = '{"type": "names", "config": {"A": "a@x", "B": "b@x", "C": "c@x"}}'
+
+
+def escribir(ruta, contenido):
+    ruta.write_text(contenido, encoding='utf-8')
+    return str(ruta)
+
+
+@pytest.mark.parametrize('topologia', [
+    '{"type": "topo", "config": {"A": ["B", "C"], "B": ["A", "C"], "C": ["A", "B"]}}',
+    "{'type':'topo', 'config':{'A': ['B', 'C'], 'B': ['A', 'C'], 'C': ['A', 'B']}}",
+    "# Triángulo\nA: B, C\nB: A\n\nC A  # enlace en ambos sentidos\nB C\n",
+])
+def test_from_files_lee_cada_formato(tmp_path, topologia):
+    config = NetConfig.from_files(escribir(tmp_path / 'topo.txt', topologia),
+                                  escribir(tmp_path / 'names.txt', NOMBRES), strict=True)
+    assert {nodo: set(vecinos) for nodo, vecinos in config.topo_map.items()} == {
+        'A': {'B', 'C'}, 'B': {'A', 'C'}, 'C': {'A', 'B'}}
+    assert config.jid_map == {'a@x': 'A', 'b@x': 'B', 'c@x': 'C'}
+    assert config.node_names == ['A', 'B', 'C']
+    assert sorted(config.neighbor_ids(0)) == [1, 2]
+
+
+def test_linea_de_texto_invalida(tmp_path):
+    with pytest.raises(ValueError):
+        NetConfig.from_files(escribir(tmp_path / 'topo.txt', "A B C\n"), escribir(tmp_path / 'names.txt', NOMBRES))
+
+
+@pytest.mark.parametrize('topo_map, problema', [
+    ({'A': ['B'], 'B': ['A', 'C'], 'C': []}, 'one-way'),
+    ({'A': ['B'], 'B': ['A'], 'C': []}, 'components'),
+])
+def test_strict_rechaza_topologias_invalidas(caplog, topo_map, problema):
+    nombres = {'A': 'a@x', 'B': 'b@x', 'C': 'c@x'}
+    with pytest.raises(ValueError, match=problema):
+        NetConfig(topo_map, nombres, strict=True)
+    # Sin strict solo se avisa
+    NetConfig(topo_map, nombres)
+    assert problema in caplog.text
+
+
+def test_cache_se_reutiliza_y_se_invalida(tmp_path, monkeypatch):
+    topo = escribir(tmp_path / 'topo.txt', "A: B, C\nB C\n")
+    nombres = escribir(tmp_path / 'names.txt', NOMBRES)
+    cache = str(tmp_path / 'config.cache')
+    lecturas = []
+    leer_topologia = modulo.read_topology
+    monkeypatch.setattr(modulo, 'read_topology', lambda ruta: lecturas.append(ruta) or leer_topologia(ruta))
+
+    original = NetConfig.from_files(topo, nombres, cache)
+    copia = NetConfig.from_files(topo, nombres, cache)
+    assert len(lecturas) == 1
+    for atributo in ('topo_map', 'node_map', 'jid_map', 'node_names', 'node_index',
+                     'neighbor_offsets', 'neighbor_targets', 'neighbor_sets', 'jid_index', 'index_jid'):
+        assert getattr(copia, atributo) == getattr(original, atributo)
+
+    # Mismo tamaño, otra fecha de modificación
+    estado = os.stat(topo)
+    os.utime(topo, ns=(estado.st_atime_ns, estado.st_mtime_ns + 1_000_000_000))
+    NetConfig.from_files(topo, nombres, cache)
+    assert len(lecturas) == 2
+
+    # Otro tamaño
+    escribir(tmp_path / 'topo.txt', "A: B, C\nB C\nC D\n")
+    config = NetConfig.from_files(topo, nombres, cache)
+    assert len(lecturas) == 3
+    assert config.topo_map['D'] == ['C']
+    assert NetConfig.from_files(topo, nombres, cache).topo_map == config.topo_map
+    assert len(lecturas) == 3
+
+
+@pytest.mark.parametrize('contenido', [b'', b'[1, 2]\n', b'{"version": 2}\n', b'\x80\x05basura', b'{roto\n'])
+def test_cache_danada_se_ignora(tmp_path, contenido):
+    ruta = tmp_path / 'config.cache'
+    ruta.write_bytes(contenido)
+    assert NetConfig.load_cache(str(ruta)) is None
+
+
+def test_cache_truncada_se_ignora(tmp_path):
+    ruta = str(tmp_path / 'config.cache')
+    NetConfig({'A': ['B'], 'B': ['A']}, {'A': 'a@x', 'B': 'b@x'}).save_cache(ruta, ('firma',))
+    assert NetConfig.load_cache(ruta, ('firma',)) is not None
+    assert NetConfig.load_cache(ruta, ('otra',)) is None
+    with open(ruta, 'rb+') as archivo:
+        archivo.truncate(os.path.getsize(ruta) - 1)
+    assert NetConfig.load_cache(ruta, ('firma',)) is None
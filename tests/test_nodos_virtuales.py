@@ -0,0 +1,155 @@
+import asyncio
+import logging
+
+import pytest
+
+from Benchmark import TOPOLOGIAS
+from NetConfig import NetConfig
+from RedSimulada import RedSimulada
+from LinkStateRouting import RoutingLSR
+from DistanVR import DistanceVectorRouting
+from Flooding import topologia_por_jid
+from SimulacionDistribuida import SONDEO_UNICO, particionar
+from NodosVirtuales import HostNodos, envolver, desenvolver
+
+
+class Registro:
+    def __init__(self):
+        self.recibidos = []
+
+    def recibir_cuerpo(self, origen, mensaje_id, cuerpo):
+        self.recibidos.append((origen, cuerpo))
+
+
+@pytest.mark.parametrize('cuerpo', ['{"type":"echo"}', 'línea 1\nlínea 2', '>a b\nanidado', ''])
+def test_sobre_ida_y_vuelta(cuerpo):
+    sobre = envolver('a@x', 'b@x', cuerpo)
+    assert sobre.startswith('>a@x b@x\n')
+    assert desenvolver(sobre) == ('a@x', 'b@x', cuerpo)
+
+
+@pytest.mark.parametrize('cuerpo', ['{"type":"echo"}', '>a@x b@x', '>a@x\nhola', '>a b c\nhola', '>\nhola'])
+def test_cuerpos_sin_sobre_valido(cuerpo):
+    assert desenvolver(cuerpo) is None
+
+
+def armar_hosts():
+    """
+    Dos hosts en una RedSimulada más un cliente común fuera del directorio;
+    h0 atiende a a@x y b@x, h1 a c@x.
+    """
+    red = RedSimulada()
+    directorio = {'a@x': 'h0@x', 'b@x': 'h0@x', 'c@x': 'h1@x'}
+    hosts = [HostNodos(transporte=red.agregar_nodo(jid), directorio=directorio) for jid in ('h0@x', 'h1@x')]
+    cliente = Registro()
+    red.agregar_nodo('cliente@x', cliente)
+    registros = {}
+    for host, jids in zip(hosts, (('a@x', 'b@x'), ('c@x',))):
+        for jid in jids:
+            registros[jid] = Registro()
+            host.agregar_nodo(jid).algoritmo = registros[jid]
+    return red, hosts, registros, cliente
+
+
+def test_entre_nodos_del_mismo_host_no_pasa_por_la_red():
+    async def escenario():
+        red, hosts, registros, _ = armar_hosts()
+        hosts[0].nodos['a@x'].enviar('b@x', 'hola')
+        assert hosts[0].trabajo_pendiente()
+        await red.esperar_inactividad()
+        return red, registros
+
+    red, registros = asyncio.run(escenario())
+    assert registros['b@x'].recibidos == [('a@x', 'hola')]
+    assert red.mensajes_enviados == 0
+
+
+def test_a_otro_host_viaja_en_sobre():
+    async def escenario():
+        red, hosts, registros, _ = armar_hosts()
+        cuerpos = []
+        transmitir = red.transmitir
+        red.transmitir = lambda origen, destino, cuerpo: cuerpos.append((origen, destino, cuerpo)) or \
+            transmitir(origen, destino, cuerpo)
+        hosts[0].nodos['b@x'].enviar('c@x', 'hola')
+        await red.esperar_inactividad()
+        return cuerpos, registros
+
+    cuerpos, registros = asyncio.run(escenario())
+    assert cuerpos == [('h0@x', 'h1@x', envolver('b@x', 'c@x', 'hola'))]
+    assert registros['c@x'].recibidos == [('b@x', 'hola')]
+
+
+def test_clientes_fuera_del_directorio_reciben_el_cuerpo_sin_sobre(caplog):
+    async def escenario():
+        red, hosts, registros, cliente = armar_hosts()
+        hosts[0].nodos['a@x'].enviar('cliente@x', 'hola')
+        await red.esperar_inactividad()
+        # Lo que llega sin sobre es para la cuenta del host, que no es un nodo virtual
+        with caplog.at_level(logging.DEBUG, logger='NodosVirtuales'):
+            red.transmitir('cliente@x', 'h0@x', 'respuesta')
+            await red.esperar_inactividad()
+        return cliente, registros
+
+    cliente, registros = asyncio.run(escenario())
+    assert cliente.recibidos == [('h0@x', 'hola')]
+    assert all(registro.recibidos == [] for registro in registros.values())
+    assert "no lo atiende" in caplog.text
+
+
+def test_la_cuenta_del_host_puede_ser_un_nodo_virtual():
+    red = RedSimulada()
+    host = HostNodos(transporte=red.agregar_nodo('a@x'))
+    registro = Registro()
+    host.agregar_nodo('a@x').algoritmo = registro
+    host.recibir_cuerpo('cliente@x', 'm1', 'hola')
+    assert registro.recibidos == [('cliente@x', 'hola')]
+
+
+@pytest.mark.parametrize('algoritmo', ['lsr', 'dvr'])
+@pytest.mark.parametrize('agrupar', [False, True], ids=['sin-agrupar', 'agrupando'])
+def test_dos_hosts_con_dieciseis_nodos(algoritmo, agrupar):
+    topologia = TOPOLOGIAS['grid'](16, semilla=0)
+    nombres = {nodo: f"{nodo.lower()}@x" for nodo in topologia}
+    config = NetConfig(topo_map=topologia, node_map=nombres)
+    partes = particionar(config, 2)
+    hosts_jid = ['h0@x', 'h1@x']
+    directorio = {nombres[nodo]: hosts_jid[parte] for nodo, parte in partes.items()}
+
+    async def escenario():
+        red = RedSimulada(0.001)
+        hosts = []
+        for jid in hosts_jid:
+            transporte = red.agregar_nodo(jid)
+            if agrupar:
+                transporte.usar_planificador(ventana_agrupacion=0.002)
+            hosts.append(HostNodos(transporte=transporte, directorio=directorio, vecinos=topologia_por_jid(config)))
+        red.conectar(*hosts_jid)
+        nodos, entregados = {}, []
+        for nodo, parte in partes.items():
+            transporte = hosts[parte].agregar_nodo(nombres[nodo])
+            if algoritmo == 'lsr':
+                nodos[nodo] = RoutingLSR(nombres[nodo], None, config, transport=transporte, interactive=False,
+                                         probe=SONDEO_UNICO)
+                nodos[nodo].on_message = lambda origen, datos, nodo=nodo: entregados.append((nodo, datos))
+            else:
+                nodos[nodo] = DistanceVectorRouting(nombres[nodo], None, transporte=transporte,
+                                                    intervalo_refresco=None, sondeo=SONDEO_UNICO)
+        await red.iniciar()
+        await red.esperar_inactividad(0.05)
+
+        if algoritmo == 'lsr':
+            orden = sorted(topologia)
+            esperados = []
+            for indice in range(20):
+                origen, destino = orden[indice % 16], orden[(indice * 7 + 3) % 16]
+                nodos[origen].send_data(destino, f"p{indice}")
+                esperados.append((destino, f"p{indice}"))
+            await red.esperar_inactividad(0.05)
+            assert sorted(entregados) == sorted(esperados)
+        else:
+            assert all(len(nodo.tabla_rutas) == 16 for nodo in nodos.values())
+        # Cada host usa una sola conexión física
+        assert set(red.nodos) == set(hosts_jid)
+
+    asyncio.run(escenario())
@@ -0,0 +1,69 @@
+import asyncio
+
+from PlanificadorEnvio import PlanificadorEnvio, DATOS, CONTROL
+
+
+def correr(escenario):
+    return asyncio.run(escenario())
+
+
+def test_tasa_por_destino_espacia_los_envios():
+    async def escenario():
+        loop = asyncio.get_running_loop()
+        horas = []
+        planificador = PlanificadorEnvio(lambda destino, cuerpo: horas.append(loop.time()), list,
+                                         tasa_por_destino=100, rafaga_por_destino=1, max_por_envio=1)
+        for indice in range(5):
+            planificador.encolar('b', f"m{indice}")
+        await asyncio.sleep(0.1)
+        return horas
+
+    horas = correr(escenario)
+    assert len(horas) == 5
+    # Una ficha cada 10 ms después de la primera
+    assert all(siguiente - anterior >= 0.009 for anterior, siguiente in zip(horas, horas[1:]))
+    assert horas[-1] - horas[0] >= 0.039
+
+
+def test_datos_salen_antes_que_control():
+    async def escenario():
+        enviados = []
+        planificador = PlanificadorEnvio(lambda destino, cuerpo: enviados.append(cuerpo), list, max_por_envio=1)
+        planificador.encolar('b', 'c1', CONTROL)
+        planificador.encolar('b', 'c2', CONTROL)
+        planificador.encolar('b', 'd1', DATOS)
+        await asyncio.sleep(0.01)
+        return enviados
+
+    assert correr(escenario) == ['d1', 'c1', 'c2']
+
+
+def test_sobre_la_capacidad_se_descarta_el_control_mas_antiguo():
+    async def escenario():
+        enviados = []
+        planificador = PlanificadorEnvio(lambda destino, cuerpo: enviados.append(cuerpo), list,
+                                         capacidad=3, max_por_envio=10)
+        for cuerpo, prioridad in (('c1', CONTROL), ('d1', DATOS), ('c2', CONTROL), ('c3', CONTROL)):
+            planificador.encolar('b', cuerpo, prioridad)
+        await asyncio.sleep(0.01)
+        return enviados, planificador.descartados
+
+    enviados, descartados = correr(escenario)
+    assert descartados == 1
+    assert enviados == [['d1', 'c2', 'c3']]
+
+
+def test_contrapresion_en_los_umbrales():
+    async def escenario():
+        avisos = []
+        planificador = PlanificadorEnvio(lambda destino, cuerpo: None, list, umbral_alto=3, umbral_bajo=1,
+                                         al_cambiar_contrapresion=avisos.append)
+        planificador.encolar('b', 'm1')
+        planificador.encolar('b', 'm2')
+        assert avisos == []
+        planificador.encolar('c', 'm3')
+        assert avisos == [True]
+        await asyncio.sleep(0.01)
+        return avisos
+
+    assert correr(escenario) == [True, False]
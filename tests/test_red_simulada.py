@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from RedSimulada import RedSimulada
+
+
+class Registro:
+    """
+    Algoritmo mínimo: anota cada cuerpo recibido con la hora del loop.
+    """
+
+    def __init__(self):
+        self.recibidos = []
+        self.desconectados = []
+
+    def recibir_cuerpo(self, origen, mensaje_id, cuerpo):
+        self.recibidos.append((asyncio.get_running_loop().time(), origen, cuerpo))
+
+    def eliminar_vecino(self, vecino):
+        self.desconectados.append(vecino)
+
+
+def armar_red(*jids, **opciones):
+    red = RedSimulada(**opciones)
+    registros = {jid: Registro() for jid in jids}
+    for jid, registro in registros.items():
+        red.agregar_nodo(jid, registro)
+    return red, registros
+
+
+def test_latencia_por_sentido():
+    async def escenario():
+        red, registros = armar_red('a', 'b')
+        red.conectar('a', 'b', latencia=0.05, bidireccional=False)
+        red.conectar('b', 'a', latencia=0.01, bidireccional=False)
+        inicio = asyncio.get_running_loop().time()
+        red.transmitir('a', 'b', 'ida')
+        red.transmitir('b', 'a', 'vuelta')
+        await red.esperar_inactividad()
+        return inicio, registros
+
+    inicio, registros = asyncio.run(escenario())
+    (llegada_ida, _, _), = registros['b'].recibidos
+    (llegada_vuelta, _, _), = registros['a'].recibidos
+    assert llegada_ida - inicio == pytest.approx(0.05, abs=0.01)
+    assert llegada_vuelta - inicio == pytest.approx(0.01, abs=0.01)
+
+
+def test_perdida_por_sentido():
+    async def escenario():
+        red, registros = armar_red('a', 'b', semilla=1)
+        red.conectar('a', 'b', perdida=1.0, bidireccional=False)
+        red.conectar('b', 'a', perdida=0.5, bidireccional=False)
+        for indice in range(200):
+            red.transmitir('a', 'b', f"ida{indice}")
+            red.transmitir('b', 'a', f"vuelta{indice}")
+        await red.esperar_inactividad()
+        return red, registros
+
+    red, registros = asyncio.run(escenario())
+    assert registros['b'].recibidos == []
+    assert 50 < len(registros['a'].recibidos) < 150
+    assert red.mensajes_enviados == 400
+    assert red.mensajes_entregados + red.mensajes_perdidos == 400
+    assert red.mensajes_entregados == len(registros['a'].recibidos)
+
+
+def test_ancho_de_banda_serializa_los_envios():
+    async def escenario():
+        red, registros = armar_red('a', 'b')
+        red.conectar('a', 'b', ancho_banda=1000, bidireccional=False)
+        inicio = asyncio.get_running_loop().time()
+        red.transmitir('a', 'b', 'x' * 100)
+        red.transmitir('a', 'b', 'y' * 100)
+        await red.esperar_inactividad()
+        return inicio, registros
+
+    inicio, registros = asyncio.run(escenario())
+    llegadas = [hora - inicio for hora, _, _ in registros['b'].recibidos]
+    assert llegadas == pytest.approx([0.1, 0.2], abs=0.02)
+
+
+def test_desconectar_avisa_a_ambos_extremos():
+    async def escenario():
+        red, registros = armar_red('a', 'b', latencia_defecto=0.02)
+        red.conectar('a', 'b', latencia=0.2)
+        red.desconectar('a', 'b')
+        assert red.enlaces == {}
+        assert red.vecinos == {'a': set(), 'b': set()}
+        # Sin enlace declarado se entrega con el enlace por defecto, como el servidor XMPP
+        inicio = asyncio.get_running_loop().time()
+        red.transmitir('a', 'b', 'hola')
+        red.transmitir('a', 'nadie', 'hola')
+        await red.esperar_inactividad()
+        return inicio, red, registros
+
+    inicio, red, registros = asyncio.run(escenario())
+    assert registros['a'].desconectados == ['b']
+    assert registros['b'].desconectados == ['a']
+    (llegada, origen, cuerpo), = registros['b'].recibidos
+    assert (origen, cuerpo) == ('a', 'hola')
+    assert llegada - inicio == pytest.approx(0.02, abs=0.01)
+    assert red.mensajes_perdidos == 1
@@ -0,0 +1,56 @@
+import pytest
+
+from Benchmark import TOPOLOGIAS, ejecutar_benchmark
+from NetConfig import NetConfig
+from SimulacionDistribuida import particionar, enlaces_cortados
+
+
+def configurar(topologia):
+    return NetConfig(topo_map=topologia, node_map={nodo: f"{nodo.lower()}@x" for nodo in topologia})
+
+
+def tamanos(asignacion, partes):
+    cuenta = [0] * partes
+    for parte in asignacion.values():
+        cuenta[parte] += 1
+    return cuenta
+
+
+# Cortes de referencia: en un anillo el óptimo es un enlace por parte (arcos
+# contiguos); en una malla de lado L, cortar en franjas cuesta L por frontera
+@pytest.mark.parametrize('nombre, n, partes, corte_maximo', [
+    ('ring', 20, 4, 4),
+    ('ring', 2000, 16, 16),
+    ('grid', 16, 2, 6),
+    ('grid', 64, 4, 24),
+    ('grid', 2500, 5, 250),
+])
+def test_particionar_balancea_y_corta_poco(nombre, n, partes, corte_maximo):
+    config = configurar(TOPOLOGIAS[nombre](n, semilla=0))
+    asignacion = particionar(config, partes)
+    assert set(asignacion) == set(config.topo_map)
+    assert max(tamanos(asignacion, partes)) - min(tamanos(asignacion, partes)) <= 1
+    assert enlaces_cortados(config, asignacion) <= corte_maximo
+
+
+def test_componentes_separadas_no_cortan_enlaces():
+    config = configurar({'A': ['B'], 'B': ['A', 'C'], 'C': ['B'], 'D': ['E'], 'E': ['D', 'F'], 'F': ['E']})
+    asignacion = particionar(config, 2)
+    assert tamanos(asignacion, 2) == [3, 3]
+    assert enlaces_cortados(config, asignacion) == 0
+
+
+def test_particionar_con_mas_partes_que_nodos():
+    config = configurar({'A': ['B'], 'B': ['A']})
+    assert sorted(particionar(config, 5).values()) == [0, 1]
+    assert particionar(config, 1) == {'A': 0, 'B': 0}
+
+
+def test_dos_procesos_igual_que_uno():
+    local = ejecutar_benchmark('lsr', 'ring', 8, paquetes=10, procesos=1)
+    distribuido = ejecutar_benchmark('lsr', 'ring', 8, paquetes=10, procesos=2)
+    assert distribuido['procesos'] == 2
+    assert distribuido['enlaces_cortados'] == 2
+    for campo in ('nodos', 'enlaces', 'paquetes_enviados', 'paquetes_perdidos', 'mensajes_control'):
+        assert distribuido[campo] == local[campo]
+    assert distribuido['paquetes_perdidos'] == 0
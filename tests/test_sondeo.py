@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from SondeoEnlaces import SondeoEnlaces
+
+
+def test_echo_dentro_de_la_espera_no_cuenta_como_perdido():
+    # El vecino contesta después del intervalo pero dentro de la espera
+    async def escenario():
+        loop = asyncio.get_running_loop()
+        perdidos = []
+
+        def enviar_echo(vecino, secuencia):
+            loop.call_later(0.015, sondeo.recibir_respuesta, vecino, secuencia)
+
+        sondeo = SondeoEnlaces(enviar_echo, lambda vecino, costo: None, intervalo=0.01, espera=0.02,
+                               fluctuacion=0.0, al_perder_vecino=perdidos.append)
+        sondeo.agregar_vecino('b')
+        await asyncio.sleep(0.1)
+        estadisticas = sondeo.estadisticas()['b']
+        sondeo.detener()
+        return perdidos, estadisticas
+
+    perdidos, estadisticas = asyncio.run(escenario())
+    assert perdidos == []
+    assert estadisticas['perdidos'] == 0
+    assert estadisticas['enviados'] >= 3
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def crear_sondeo(**opciones):
+    # Fuera de un event loop no hay temporizadores: cada sondeo se dispara a mano
+    reloj = Reloj()
+    echos, costos, perdidos = [], [], []
+    sondeo = SondeoEnlaces(lambda vecino, secuencia: echos.append(secuencia),
+                           lambda vecino, costo: costos.append(costo),
+                           al_perder_vecino=perdidos.append, reloj=reloj, **opciones)
+    return sondeo, reloj, echos, costos, perdidos
+
+
+def medir(sondeo, reloj, echos, rtt):
+    sondeo.sondear('b')
+    reloj.ahora += rtt
+    return sondeo.recibir_respuesta('b', echos[-1])
+
+
+def test_srtt_y_rttvar_como_rfc_6298():
+    sondeo, reloj, echos, _, _ = crear_sondeo(umbral=0.0)
+    sondeo.agregar_vecino('b')
+    reloj.ahora += 0.1
+    assert sondeo.recibir_respuesta('b', echos[-1]) == pytest.approx(0.1)
+    estado = sondeo.estadisticas()['b']
+    assert (estado['srtt'], estado['rttvar']) == pytest.approx((0.1, 0.05))
+
+    assert medir(sondeo, reloj, echos, 0.3) == pytest.approx(0.3)
+    estado = sondeo.estadisticas()['b']
+    # rttvar = 3/4 * 0.05 + 1/4 * |0.1 - 0.3|; srtt = 7/8 * 0.1 + 1/8 * 0.3
+    assert estado['rttvar'] == pytest.approx(0.0875)
+    assert estado['srtt'] == pytest.approx(0.125)
+
+
+def test_respuestas_tardias_o_duplicadas_se_ignoran():
+    sondeo, reloj, echos, _, _ = crear_sondeo(espera=1.0)
+    sondeo.agregar_vecino('b')
+    primera = echos[-1]
+    reloj.ahora += 0.1
+    assert sondeo.recibir_respuesta('b', primera) is not None
+    assert sondeo.recibir_respuesta('b', primera) is None  # Duplicada
+
+    reloj.ahora += 5.0
+    sondeo.sondear('b')
+    segunda = echos[-1]
+    reloj.ahora += 2.0
+    sondeo.sondear('b')  # Vence la segunda sin respuesta y sale una tercera
+    assert sondeo.recibir_respuesta('b', segunda) is None  # Tardía
+    assert sondeo.recibir_respuesta('c', echos[-1]) is None  # De otro vecino
+    reloj.ahora += 0.2
+    assert sondeo.recibir_respuesta('b', echos[-1]) == pytest.approx(0.2)
+    assert sondeo.estadisticas()['b']['perdidos'] == 1
+
+
+def test_histeresis_no_publica_cambios_menores_al_umbral():
+    sondeo, reloj, echos, costos, _ = crear_sondeo(umbral=0.2)
+    sondeo.agregar_vecino('b')
+    reloj.ahora += 0.1
+    sondeo.recibir_respuesta('b', echos[-1])
+    assert costos == pytest.approx([0.1])
+
+    medir(sondeo, reloj, echos, 0.2)  # srtt 0.1125: +12.5%
+    assert costos == pytest.approx([0.1])
+    assert sondeo.costo_de('b') == pytest.approx(0.1)
+
+    medir(sondeo, reloj, echos, 0.3)  # srtt 0.1359: +35.9% respecto de lo publicado
+    assert costos == pytest.approx([0.1, 0.1359375])
+
+
+def test_vecino_perdido_tras_perdidas_maximas():
+    sondeo, reloj, echos, _, perdidos = crear_sondeo(espera=1.0, perdidas_maximas=3)
+    sondeo.agregar_vecino('b')
+    for _ in range(2):
+        reloj.ahora += 2.0
+        sondeo.sondear('b')
+    assert perdidos == []
+
+    # Dentro de la espera no se cuenta ni se reemplaza el echo en curso
+    enviados = len(echos)
+    reloj.ahora += 0.5
+    sondeo.sondear('b')
+    assert len(echos) == enviados
+
+    reloj.ahora += 1.0
+    sondeo.sondear('b')
+    assert perdidos == ['b']
+    assert sondeo.estadisticas()['b']['perdidos'] == 3
+
+    # Una respuesta reinicia la cuenta de pérdidas seguidas: el echo siguiente
+    # y dos más tienen que vencer para volver a perder al vecino
+    reloj.ahora += 0.1
+    sondeo.recibir_respuesta('b', echos[-1])
+    for _ in range(3):
+        reloj.ahora += 2.0
+        sondeo.sondear('b')
+    assert perdidos == ['b']
+    reloj.ahora += 2.0
+    sondeo.sondear('b')
+    assert perdidos == ['b', 'b']
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from Throttle import ThrottleTimer
+
+
+class LoopFalso:
+    """
+    Lo mínimo del event loop que usa ThrottleTimer, con un reloj que solo
+    avanza a mano.
+    """
+
+    def __init__(self):
+        self.ahora = 0.0
+        self.programados = []  # [hora, callback, cancelado]
+
+    def time(self):
+        return self.ahora
+
+    def call_later(self, retardo, callback):
+        programado = [self.ahora + retardo, callback, False]
+        self.programados.append(programado)
+
+        class Handle:
+            def cancel(self):
+                programado[2] = True
+        return Handle()
+
+    def avanzar(self, hasta):
+        while True:
+            pendientes = sorted((p for p in self.programados if not p[2] and p[0] <= hasta), key=lambda p: p[0])
+            if not pendientes:
+                break
+            programado = pendientes[0]
+            self.programados.remove(programado)
+            self.ahora = programado[0]
+            programado[1]()
+        self.ahora = hasta
+
+
+@pytest.fixture
+def loop(monkeypatch):
+    loop = LoopFalso()
+    monkeypatch.setattr(asyncio, 'get_running_loop', lambda: loop)
+    return loop
+
+
+def evento_en(loop, temporizador, hora):
+    loop.avanzar(hora)
+    temporizador.schedule()
+
+
+def test_espera_se_duplica_hasta_el_maximo(loop):
+    ejecuciones = []
+    temporizador = ThrottleTimer(lambda: ejecuciones.append(loop.ahora),
+                                 initial_delay=0.05, hold_time=0.2, max_wait=0.8)
+    evento_en(loop, temporizador, 0.0)
+    # Cada evento llega mientras corre el tiempo de espera anterior
+    for hora in (0.1, 0.3, 0.7, 1.5):
+        evento_en(loop, temporizador, hora)
+    loop.avanzar(3.0)
+    assert ejecuciones == pytest.approx([0.05, 0.25, 0.65, 1.45, 2.25])
+    assert temporizador.current_hold == 0.8
+
+
+def test_dos_esperas_tranquilas_vuelven_al_inicio(loop):
+    ejecuciones = []
+    temporizador = ThrottleTimer(lambda: ejecuciones.append(loop.ahora),
+                                 initial_delay=0.05, hold_time=0.2, max_wait=0.8)
+    for hora in (0.0, 0.1, 0.3):
+        evento_en(loop, temporizador, hora)
+    loop.avanzar(1.0)
+    assert ejecuciones[-1] == pytest.approx(0.65)
+    assert temporizador.current_hold == 0.8
+
+    # Menos de dos esperas (1.6 s) después de la última ejecución: la espera
+    # ya pasó, pero no vuelve a hold_time
+    evento_en(loop, temporizador, 2.15)
+    assert temporizador.current_hold == 0.8
+    loop.avanzar(3.0)
+    assert ejecuciones[-1] == pytest.approx(2.2)
+
+    # Dos esperas tranquilas: vuelve a initial_delay y hold_time
+    evento_en(loop, temporizador, 3.9)
+    assert temporizador.current_hold == 0.2
+    loop.avanzar(5.0)
+    assert ejecuciones[-1] == pytest.approx(3.95)
+
+
+def test_eventos_durante_la_espera_se_agrupan(loop):
+    ejecuciones = []
+    temporizador = ThrottleTimer(lambda: ejecuciones.append(loop.ahora), initial_delay=0.05)
+    for hora in (0.0, 0.01, 0.02):
+        evento_en(loop, temporizador, hora)
+    assert temporizador.pending
+    loop.avanzar(1.0)
+    assert ejecuciones == pytest.approx([0.05])
+    assert temporizador.coalesced == 2
+    assert not temporizador.pending
+
+
+def test_from_config():
+    temporizador = ThrottleTimer.from_config(print, (0.1, 1.0, 10.0))
+    assert (temporizador.initial_delay, temporizador.hold_time, temporizador.max_wait) == (0.1, 1.0, 10.0)
+    temporizador = ThrottleTimer.from_config(print, {'max_wait': 2.0})
+    assert (temporizador.initial_delay, temporizador.max_wait) == (0.05, 2.0)
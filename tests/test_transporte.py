@@ -0,0 +1,73 @@
+import logging
+
+import pytest
+
+from NetConfig import NetConfig
+from CodecMensajes import CodecMensajes
+from RedSimulada import RedSimulada
+from DistanVR import DistanceVectorRouting
+from LinkStateRouting import RoutingLSR
+from Metricas import ERRORES_DECODIFICACION
+
+
+def test_dv_acepta_cabecera_de_difusion():
+    transporte = RedSimulada().agregar_nodo('a@x')
+    nodo = DistanceVectorRouting('a@x', None, transporte=transporte, intervalo_refresco=None, medir_costos=False)
+    transporte.recibir('b@x', 'm1', '{"type":"send_routing","from":"b@x","to":"a@x",'
+                                    '"data":{"tabla_rutas":{"c@x":[1,"c@x"]}},'
+                                    '"hops":3,"ttl":5,"origin":"c@x"}')
+    assert nodo.tabla_rutas['c@x'] == (2, 'b@x')
+    assert 'm1' in nodo.mensajes_recibidos
+
+
+def crear_lsr_de_transito(codec=None):
+    """
+    B en el camino A-B-C, con las tablas de A y C instaladas; devuelve el nodo y
+    la lista donde quedan los cuerpos que envía.
+    """
+    config = NetConfig(topo_map={'A': ['B'], 'B': ['A', 'C'], 'C': ['B']},
+                       node_map={'A': 'a@x', 'B': 'b@x', 'C': 'c@x'})
+    transporte = RedSimulada().agregar_nodo('b@x', codec=codec)
+    enviados = []
+    transporte.enviar = lambda destino, cuerpo: enviados.append((destino, cuerpo))
+    nodo = RoutingLSR('b@x', None, config, transport=transporte, interactive=False)
+    # Sin event loop los temporizadores corren de inmediato
+    nodo.install_table('A', {'B': 1.0}, 1)
+    nodo.install_table('C', {'B': 1.0}, 1)
+    assert nodo.forwarding.next_hop('C') == 'C'
+    enviados.clear()
+    return nodo, enviados
+
+
+def test_lsr_descarta_campos_invalidos_por_el_camino_lento(caplog):
+    nodo, enviados = crear_lsr_de_transito()
+    # Sin "v" el cuerpo no admite el camino rápido
+    with caplog.at_level(logging.WARNING):
+        nodo.recibir_cuerpo('a@x', 'm1', '{"type":"send_routing","from":"A","to":"C","data":"x","hops":null}')
+    assert enviados == []
+    assert "no está correctamente formateado" in caplog.text
+
+
+@pytest.mark.parametrize('modo', ['json', 'binario'])
+def test_transito_reenvia_la_carga_sin_tocarla(modo):
+    codec = CodecMensajes(modo, umbral_compresion=None)
+    nodo, enviados = crear_lsr_de_transito(codec)
+    datos = {"texto": "hola", "lista": [1, 2.5, None, "ñ"]}
+    cuerpo = codec.codificar({"type": "send_routing", "from": "A", "to": "C", "data": datos, "hops": 2})
+    nodo.recibir_cuerpo('a@x', 'm1', cuerpo)
+
+    assert [destino for destino, _ in enviados] == ['c@x']
+    reenviado = enviados[0][1]
+    cabecera, carga = codec.leer_cabecera(reenviado)
+    assert cabecera == {"type": "send_routing", "from": "A", "to": "C", "hops": 3}
+    assert carga == codec.leer_cabecera(cuerpo)[1]
+    assert codec.decodificar(reenviado)['data'] == datos
+
+
+def test_lote_mal_formado_se_cuenta_y_descarta():
+    transporte = RedSimulada().agregar_nodo('a@x')
+    DistanceVectorRouting('a@x', None, transporte=transporte, intervalo_refresco=None)
+    antes = ERRORES_DECODIFICACION.muestras().get(('a@x',), 0)
+    for cuerpo in ('[1,2]', '[bad'):
+        transporte.recibir('b@x', 'm1', cuerpo)
+    assert ERRORES_DECODIFICACION.muestras().get(('a@x',), 0) == antes + 2
@@ -0,0 +1,51 @@
+import pytest
+
+from Metricas import percentil
+from Trazas import AgregadorTrazas, nueva_traza, llegada, salida
+
+
+def traza(*saltos):
+    """
+    Traza con tiempos en microsegundos: saltos (nodo, entrada, salida, espera)
+    y el último (nodo, entrada).
+    """
+    return {"t0": 0.0, "h": [list(salto) for salto in saltos]}
+
+
+def test_agregador_usa_los_mismos_percentiles_que_metricas():
+    agregador = AgregadorTrazas()
+    estancias, esperas, enlaces, extremos = [], [], [], []
+    for i in range(1, 21):
+        estancia, espera, enlace = 10 * i, i, 100 + 7 * i % 13
+        agregador.agregar(traza(('A', 0, estancia, espera), ('B', estancia + enlace)))
+        estancias.append(estancia / 1e6)
+        esperas.append(espera / 1e6)
+        enlaces.append(enlace / 1e6)
+        extremos.append((estancia + enlace) / 1e6)
+
+    reporte = agregador.reporte()
+    assert reporte['trazas'] == 20
+    for seccion, clave, muestras in (('nodos', 'A', estancias), ('esperas', 'A', esperas),
+                                     ('enlaces', 'A->B', enlaces), ('extremos', 'A->B', extremos)):
+        resumen = reporte[seccion][clave]
+        assert resumen['n'] == 20
+        assert resumen['max'] == max(muestras)
+        for p in (50, 95, 99):
+            assert resumen[f"p{p}"] == pytest.approx(percentil(muestras, p))
+    # Con valores 10, 20, ..., 200 µs el p50 interpola entre 100 y 110
+    assert reporte['nodos']['A']['p50'] == pytest.approx(105e-6)
+
+
+def test_agregador_conserva_las_ultimas_muestras():
+    agregador = AgregadorTrazas(max_muestras=3)
+    for estancia in (1, 2, 3, 4, 5):
+        agregador.agregar(traza(('A', 0, estancia, 0), ('B', estancia + 1)))
+    assert agregador.reporte()['nodos']['A'] == {'n': 3, 'p50': 4e-6, 'p95': pytest.approx(4.9e-6),
+                                                  'p99': pytest.approx(4.98e-6), 'max': 5e-6}
+
+
+def test_registro_de_saltos():
+    recorrido = nueva_traza('A', ahora=100.0)
+    recorrido = salida(recorrido, 0.002, ahora=100.003)
+    recorrido = llegada(recorrido, 'B', ahora=100.005)
+    assert recorrido == {"t0": 100.0, "h": [['A', 0, 3000, 2000], ['B', 5000]]}
@@ -0,0 +1,109 @@
+import asyncio
+
+from RedSimulada import RedSimulada
+from DistanVR import DistanceVectorRouting
+
+
+def armar_red(enlaces):
+    red = RedSimulada()
+    nodos = {}
+    for a, b in enlaces:
+        for jid in (a, b):
+            if jid not in nodos:
+                nodos[jid] = DistanceVectorRouting(jid, None, transporte=red.agregar_nodo(jid),
+                                                   intervalo_refresco=None, medir_costos=False,
+                                                   retardo_actualizacion=0.001)
+        red.conectar(a, b)
+    return red, nodos
+
+
+def cortar(red, a, b):
+    # Sin enlace declarado la red entregaría con el enlace por defecto
+    red.desconectar(a, b)
+    red.conectar(a, b, perdida=1.0)
+
+
+async def esperar(red):
+    await asyncio.wait_for(red.esperar_inactividad(silencio=0.01), 5)
+
+
+def test_reconverge_por_el_camino_alternativo():
+    async def escenario():
+        red, nodos = armar_red([('a', 'b'), ('b', 'c'), ('c', 'd'), ('d', 'a')])
+        await red.iniciar()
+        await esperar(red)
+        assert nodos['a'].tabla_rutas['b'] == (1, 'b')
+        assert nodos['a'].tabla_rutas['c'][0] == 2
+
+        cortar(red, 'a', 'b')
+        await esperar(red)
+        assert nodos['a'].tabla_rutas['b'] == (3, 'd')
+        assert nodos['b'].tabla_rutas['a'] == (3, 'c')
+        assert nodos['a'].tabla_rutas['c'] == (2, 'd')
+
+    asyncio.run(escenario())
+
+
+def test_destino_perdido_llega_a_infinito_sin_contar():
+    async def escenario():
+        red, nodos = armar_red([('a', 'b'), ('b', 'c')])
+        await red.iniciar()
+        await esperar(red)
+        assert nodos['a'].tabla_rutas['c'] == (2, 'b')
+
+        enviados = red.mensajes_enviados
+        cortar(red, 'b', 'c')
+        await esperar(red)
+        infinito = nodos['a'].infinito
+        assert nodos['a'].tabla_rutas['c'] == (infinito, None)
+        assert nodos['b'].tabla_rutas['c'] == (infinito, None)
+        # Contar hasta infinito necesitaría miles de anuncios
+        assert red.mensajes_enviados - enviados < 10
+
+    asyncio.run(escenario())
+
+
+def test_poison_reverse_anuncia_infinito_al_siguiente_salto():
+    async def escenario():
+        red, nodos = armar_red([('a', 'b'), ('b', 'c')])
+        await red.iniciar()
+        await esperar(red)
+        return nodos
+
+    nodos = asyncio.run(escenario())
+    # 'a' llega a 'c' por 'b', así que a 'b' se lo anuncia con costo infinito
+    assert nodos['a'].tabla_rutas['c'] == (2, 'b')
+    assert nodos['b'].tablas_vecinos['a']['c'] == nodos['a'].infinito
+    assert nodos['b'].tablas_vecinos['c']['a'] == nodos['c'].infinito
+    assert nodos['b'].tablas_vecinos['a']['a'] == 0
+
+
+def test_cambios_seguidos_salen_en_un_solo_anuncio_parcial():
+    async def escenario():
+        red = RedSimulada()
+        nodo = DistanceVectorRouting('a', None, transporte=red.agregar_nodo('a'), intervalo_refresco=None,
+                                     medir_costos=False, retardo_actualizacion=0.05)
+        enviados = []
+        nodo.transporte.enviar_mensaje = lambda destino, mensaje: enviados.append((destino, mensaje))
+        nodo.agregar_vecino('b')
+        nodo.agregar_vecino('c')
+        nodo.actualizar_tabla('c', {'w': (1, 'w')})
+        await asyncio.sleep(0.1)
+        enviados.clear()
+
+        # Tres anuncios dentro de la misma ventana; el de 'w' no cambia nada
+        nodo.actualizar_tabla('b', {'x': (1, 'x')}, completa=False)
+        nodo.actualizar_tabla('b', {'y': (2, 'y')}, completa=False)
+        nodo.actualizar_tabla('b', {'x': (3, 'x')}, completa=False)
+        nodo.actualizar_tabla('c', {'w': (1, 'w')}, completa=False)
+        assert enviados == []
+        await asyncio.sleep(0.1)
+        return nodo, enviados
+
+    nodo, enviados = asyncio.run(escenario())
+    anuncios = {destino: mensaje['data'] for destino, mensaje in enviados}
+    assert len(enviados) == len(anuncios) == 2
+    assert anuncios['c']['tabla_rutas'] == {'x': (4, 'b'), 'y': (3, 'b')}
+    assert anuncios['b']['tabla_rutas'] == {'x': (nodo.infinito, 'b'), 'y': (nodo.infinito, 'b')}
+    assert not anuncios['b']['completa'] and not anuncios['c']['completa']
+    assert anuncios['b']['version'] == nodo.version_tabla